@@ -1,9 +1,77 @@
+import argparse
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
 
-from src.appUI import ECGApp
+from src import config
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="ECG monitor")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="replay a recorded session (.ecg), WFDB (.hea) or CSV file")
+    parser.add_argument("--speed", default="1",
+                        help="replay speed: 1, 10, ... or 'max'")
+    parser.add_argument("--simulate", action="store_true",
+                        help="synthetic 6-lead ECG instead of the ESP32")
+    parser.add_argument("--perf", action="store_true",
+                        help="enable hot-path instrumentation and the overlay")
+    parser.add_argument("--async-serial", action="store_true",
+                        help="asyncio serial backend (one event loop for all ports)")
+    parser.add_argument("--port", action="append", metavar="PORT",
+                        help="serial port for --async-serial (repeat for several devices)")
+    parser.add_argument("--multiprocess", action="store_true",
+                        help="run acquisition and analysis in a separate process")
+    parser.add_argument("--headless", action="store_true",
+                        help="no GUI: stream samples and events over TCP")
+    parser.add_argument("--listen", default=f"{config.STREAM_HOST}:{config.STREAM_PORT}",
+                        metavar="HOST:PORT", help="address of the --headless stream")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    if args.perf:
+        # Antes de crear la app: los locks se instrumentan al construirse
+        from src.instrumentation import PERF
+        PERF.enable()
+
+    if args.multiprocess and not args.headless:
+        from src.appUI import ECGApp
+        from src.acquisition_process import ProcessLink
+        if args.replay:
+            speed = None if args.speed.lower() == "max" else float(args.speed)
+            spec = {"kind": "replay", "path": args.replay, "speed": speed}
+        else:
+            spec = {"kind": "fake" if args.simulate else "serial"}
+            if args.async_serial:
+                spec.update(backend="asyncio", ports=args.port)
+        print("=== 📊 MONITOR ECG CON INTERFAZ TKINTER ===")
+        app = ECGApp(link=ProcessLink(spec))
+        app.mainloop()
+        sys.exit(0)
+
+    reader_factory = None
+    if args.replay:
+        from src.replay import ReplayReader
+        speed = None if args.speed.lower() == "max" else float(args.speed)
+        reader_factory = lambda app_state: ReplayReader(app_state, args.replay, speed)
+    elif args.simulate:
+        from src.fake_serial import FakeSerialReader
+        reader_factory = FakeSerialReader
+    elif args.async_serial or config.SERIAL_BACKEND == "asyncio":
+        from src.async_serial import AsyncSerialReader
+        reader_factory = lambda app_state: AsyncSerialReader(app_state, args.port)
+
+    if args.headless:
+        # Sin Tk: ni tkinter ni matplotlib se importan
+        from src.headless import run_headless
+        print("=== 📡 MONITOR ECG SIN PANTALLA ===")
+        host, port = args.listen.rsplit(":", 1)
+        run_headless(reader_factory, host, int(port))
+        sys.exit(0)
+
+    from src.appUI import ECGApp
     print("=== 📊 MONITOR ECG CON INTERFAZ TKINTER ===")
-    app = ECGApp()
-    app.mainloop()
\ No newline at end of file
+    app = ECGApp(reader_factory)
+    app.mainloop()
@@ -0,0 +1,685 @@
+"""
+Acquisition and signal processing in a separate process.
+
+The child process runs the reader (SerialReader, FakeSerialReader or
+ReplayReader), the AnalysisWorker and the RhythmMonitor, so the serial parse
+loop, the filters and pacing never compete with matplotlib for the GIL.
+It writes into one multiprocessing.shared_memory block:
+
+    header    control/status written by the child (write indices, MUX
+              state, connection flags, BPM, rhythm state, HRV, metrics),
+              guarded by a sequence counter (odd while the child is writing)
+    command   written by the GUI: MUX requests, detection parameters,
+              operation mode, stop flag; guarded the same way (odd while
+              the GUI is writing)
+    raw       per-lead raw ring buffers      (RingBuffer storage, mirrored)
+    filtered  per-lead filtered ring buffers
+    peaks     last MAX_PEAK_EVENTS R-peak indices per lead
+
+The GUI process maps the same block with read-only views of the data and
+uses ProcessLink's adapters in place of the reader, the analysis worker and
+the rhythm monitor, so ECGApp runs unchanged on top of it.
+
+Crash recovery: the child publishes a heartbeat; if it dies or stops
+beating, the GUI starts a new child on the same block, which resumes from
+the published indices (buffers and traces are kept).
+
+Usage:
+    python main.py --multiprocess [--simulate | --replay FILE]
+"""
+
+import atexit
+import multiprocessing as mp
+import os
+import time
+from multiprocessing import shared_memory
+from types import MappingProxyType
+
+import numpy as np
+
+from . import config
+from .ring_buffer import RingBuffer
+from .analysis import AnalysisSnapshot, AnalysisParams, MAX_PEAK_EVENTS
+from .hrv import EPISODE_KINDS
+from .peak_detection import PEAK_DETECTORS
+
+
+MAGIC = 0x45434731              # "ECG1"
+N_LEADS = config.TOTAL_DERIVATIONS
+
+RHYTHM_STATES = ("NO SIGNAL", "NORMAL", "BRADYCARDIA", "ASYSTOLE")
+DETECTOR_KINDS = tuple(PEAK_DETECTORS)
+MODES = (config.MODE_MANUAL, config.MODE_AUTO)
+HRV_METRICS = ("n", "mean_nn_ms", "sdnn_ms", "rmssd_ms", "pnn50", "mean_hr")
+HRV_COUNTS = ("beats", "normal", "ectopic", "artifacts")
+
+# Child loop period and liveness limits (seconds)
+CHILD_PERIOD = 0.005
+HEARTBEAT_TIMEOUT = 3.0
+STARTUP_TIMEOUT = 20.0          # spawn + imports before the first heartbeat
+CHECK_INTERVAL = 0.5
+MAX_RESTARTS = 5
+
+# Sequence-counter reads: attempts (yielding in between) before giving up
+READ_RETRIES = 100
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "<i8"),
+    ("seq", "<i8"),
+    ("heartbeat", "<f8"),
+    ("pid", "<i8"),
+    ("esp32_connected", "<i8"),
+    ("mux_state", "<i8"),
+    ("cmd_ack", "<i8"),
+    ("sample_count", "<i8"),
+    ("version", "<i8"),
+    ("raw_ends", "<i8", (N_LEADS,)),
+    ("ends", "<i8", (N_LEADS,)),
+    ("bpm", "<f8", (N_LEADS,)),
+    ("peak_counts", "<i8", (N_LEADS,)),
+    ("rhythm_state", "<i8"),
+    ("paces", "<i8"),
+    ("beat_p95_ms", "<f8"),
+    ("pacing_enabled", "<i8"),
+    ("queue_depth", "<i8"),
+    ("max_queue_depth", "<i8"),
+    ("dropped_samples", "<i8"),
+    ("total_ms", "<f8"),
+    ("cache_hits", "<i8"),
+    ("cache_misses", "<i8"),
+    ("hrv_counts", "<i8", (len(HRV_COUNTS),)),
+    ("hrv_instant_hr", "<f8"),
+    ("hrv_windows", "<f8", (len(config.HRV_WINDOWS), len(HRV_METRICS))),
+    ("hrv_episodes", "<i8", (len(EPISODE_KINDS),)),
+    ("hrv_ongoing", "<i8"),
+])
+
+COMMAND_DTYPE = np.dtype([
+    ("write_seq", "<i8"),
+    ("cmd_seq", "<i8"),
+    ("mux_request", "<i8"),
+    ("stop", "<i8"),
+    ("mode", "<i8"),
+    ("last_manual", "<f8"),
+    ("threshold", "<f8"),
+    ("distance", "<i8"),
+    ("gain", "<f8"),
+    ("window", "<i8"),
+    ("detector", "<i8"),
+])
+
+
+def _align(n, to=64):
+    return -(-n // to) * to
+
+
+def _layout(capacity):
+    """
+    (name, dtype, shape, offset) of each region and the total size in bytes.
+    """
+    regions = [
+        ("header", HEADER_DTYPE, ()),
+        ("command", COMMAND_DTYPE, ()),
+        ("raw", np.dtype(np.float64), (N_LEADS, 2 * capacity)),
+        ("filtered", np.dtype(np.float64), (N_LEADS, 2 * capacity)),
+        ("peaks", np.dtype(np.int64), (N_LEADS, MAX_PEAK_EVENTS)),
+    ]
+    layout, offset = [], 0
+    for name, dtype, shape in regions:
+        layout.append((name, dtype, shape, offset))
+        offset += _align(dtype.itemsize * int(np.prod(shape)))
+    return layout, offset
+
+
+class SharedBuffers:
+    """
+    NumPy views of the shared block. readonly=True (GUI) makes the header
+    and data views read-only; only the command block stays writable.
+    """
+
+    def __init__(self, buf, capacity, readonly=False):
+        self.capacity = capacity
+        layout, self.size = _layout(capacity)
+        for name, dtype, shape, offset in layout:
+            array = np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset)
+            if readonly and name != "command":
+                array.flags.writeable = False
+            setattr(self, name, array)
+
+    @staticmethod
+    def nbytes(capacity):
+        return _layout(capacity)[1]
+
+    def lead_buffers(self):
+        """
+        (raw, filtered) dicts of RingBuffer over the shared storage.
+        """
+        return tuple(
+            {lead: RingBuffer(self.capacity, np.float64, storage=data[lead]) for lead in range(N_LEADS)}
+            for data in (self.raw, self.filtered)
+        )
+
+    def read_header(self, retries=READ_RETRIES):
+        """
+        Consistent copy of the header and peak arrays (sequence-counter
+        read), or None if the child was writing on every attempt.
+        """
+        return _seqlock_read(self.header, "seq", retries, self.peaks)
+
+    def read_command(self, retries=READ_RETRIES):
+        """
+        Consistent copy of the command block, or None (GUI writing).
+        """
+        copies = _seqlock_read(self.command, "write_seq", retries)
+        return None if copies is None else copies[0]
+
+    def write_command(self, **fields):
+        """
+        Writes command fields as one update (single writer: the GUI).
+        """
+        command = self.command
+        command["write_seq"] += 1
+        for name, value in fields.items():
+            command[name] = value
+        command["write_seq"] += 1
+
+
+def _seqlock_read(block, seq_field, retries, *extra):
+    """
+    Copies `block` (and the `extra` arrays) while block[seq_field] is even
+    and unchanged. Returns the copies, or None after `retries` attempts.
+    """
+    for _ in range(retries):
+        seq = int(block[seq_field])
+        if not seq & 1:
+            copies = (block.copy(),) + tuple(array.copy() for array in extra)
+            if int(block[seq_field]) == seq:
+                return copies
+        # Escritura en curso en el otro proceso: se cede la CPU
+        time.sleep(0)
+    return None
+
+
+# =========================================================
+# ---------------- CHILD PROCESS --------------------------
+# =========================================================
+
+def _build_reader(app_state, spec):
+    kind = spec.get("kind", "serial")
+    if kind == "fake":
+        from .fake_serial import FakeSerialReader
+        return FakeSerialReader(app_state)
+    if kind == "replay":
+        from .replay import ReplayReader
+        return ReplayReader(app_state, spec["path"], spec.get("speed", 1.0))
+
+    if spec.get("backend", config.SERIAL_BACKEND) == "asyncio":
+        from .async_serial import AsyncSerialReader
+        return AsyncSerialReader(app_state, spec.get("ports"))
+
+    from .serial_handler import SerialReader
+    reader = SerialReader(app_state)
+    reader.connect()
+    return reader
+
+
+def _child_main(shm_name, capacity, spec, parent_pid):
+    """
+    Entry point of the acquisition process.
+    """
+    from .data_model import AppState, Progress
+    from .analysis import AnalysisWorker
+    from .rhythm_monitor import RhythmMonitor
+    from .serial_handler import SerialReader
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    shared = SharedBuffers(shm.buf, capacity)
+    header, command = shared.header, shared.command
+
+    app_state = AppState(lead_buffers=shared.lead_buffers())
+
+    # Resume after a crash: indices continue from what was published
+    raw_ends = {lead: int(header["raw_ends"][lead]) for lead in range(N_LEADS)}
+    ends = {lead: int(header["ends"][lead]) for lead in range(N_LEADS)}
+    for lead in range(N_LEADS):
+        app_state.lead_raw[lead].write_index = raw_ends[lead]
+        app_state.lead_filtered[lead].write_index = ends[lead]
+    app_state.progress = Progress(int(header["sample_count"]), raw_ends, dict(app_state.lead_arrival))
+    app_state.current_mux_state = int(header["mux_state"])
+
+    reader = _build_reader(app_state, spec)
+    monitor = RhythmMonitor(reader)
+    analysis = AnalysisWorker(app_state, rhythm_monitor=monitor)
+    analysis.resume(ends)
+    if spec.get("kind") == "replay":
+        # Modo "max": la reproducción espera al análisis
+        reader.analysis = analysis
+
+    if int(header["seq"]) & 1:
+        # The previous child died in the middle of a status write
+        header["seq"] += 1
+    header["pid"] = os.getpid()
+    header["magic"] = MAGIC
+    if not isinstance(reader, SerialReader):
+        reader.start()
+    monitor.start()
+    analysis.start()
+
+    state = {"cmd_seq": int(header["cmd_ack"]), "version": None, "connect_at": time.monotonic()}
+
+    try:
+        # Parado por la GUI, o la GUI terminó sin avisar
+        while not int(command["stop"]) and os.getppid() == parent_pid:
+            values = shared.read_command()
+            if values is not None:
+                _apply_commands(app_state, reader, analysis, values, state)
+            if isinstance(reader, SerialReader):
+                _keep_connected(reader, state)
+            _publish_status(app_state, monitor, analysis, shared, state)
+            time.sleep(CHILD_PERIOD)
+    finally:
+        reader.stop()
+        analysis.stop()
+        monitor.stop()
+        header["pid"] = 0
+
+
+def _keep_connected(reader, state):
+    """
+    Retries SerialReader.connect() every SERIAL_RECONNECT_DELAY while the
+    port is closed (failed at start, or closed after a read error).
+    """
+    if reader.serial_port is not None:
+        return
+    now = time.monotonic()
+    if now - state["connect_at"] >= config.SERIAL_RECONNECT_DELAY:
+        state["connect_at"] = now
+        reader.connect()
+
+
+def _apply_commands(app_state, reader, analysis, command, state):
+    if int(command["cmd_seq"]) != state["cmd_seq"]:
+        state["cmd_seq"] = int(command["cmd_seq"])
+        mux = int(command["mux_request"])
+        with app_state.mux_lock:
+            app_state.current_mux_state = mux
+        reader.send_mux_command(mux)
+
+    # Modo y última acción manual los decide la GUI
+    mode = MODES[int(command["mode"])]
+    if app_state.settings.operation_mode != mode:
+        app_state.operation_mode.set(mode)
+    app_state.last_manual_action_time = float(command["last_manual"])
+
+    if float(command["gain"]) > 0:
+        params = AnalysisParams(
+            threshold=float(command["threshold"]),
+            distance=int(command["distance"]),
+            gain=float(command["gain"]),
+            window=int(command["window"]),
+            detector=DETECTOR_KINDS[int(command["detector"])],
+        )
+        if params != analysis.params:
+            analysis.params = params
+
+
+def _publish_status(app_state, monitor, analysis, shared, state):
+    """
+    Writes the child's status to the header (odd seq = write in progress).
+    """
+    header = shared.header
+    snapshot = analysis.latest
+    progress = app_state.progress
+    status = monitor.status()
+    metrics = analysis.metrics()
+
+    header["seq"] += 1
+    header["heartbeat"] = time.time()
+    header["esp32_connected"] = int(bool(app_state.esp32_connected))
+    header["mux_state"] = app_state.current_mux_state
+    header["cmd_ack"] = state["cmd_seq"]
+    header["sample_count"] = progress.total
+    header["raw_ends"] = [progress.ends[lead] for lead in range(N_LEADS)]
+    if snapshot is not None and snapshot.version != state["version"]:
+        # Counter kept in the header: it keeps growing across restarts
+        state["version"] = snapshot.version
+        header["version"] += 1
+        header["ends"] = [snapshot.ends[lead] for lead in range(N_LEADS)]
+        header["bpm"] = [snapshot.bpm[lead] for lead in range(N_LEADS)]
+        for lead in range(N_LEADS):
+            events = snapshot.peaks[lead]
+            shared.peaks[lead, :len(events)] = events
+            header["peak_counts"][lead] = len(events)
+    header["rhythm_state"] = RHYTHM_STATES.index(status["state"])
+    header["paces"] = status["paces"]
+    header["beat_p95_ms"] = status["beat_latency"].get("p95_ms", 0.0)
+    header["pacing_enabled"] = int(status["pacing_enabled"])
+    header["queue_depth"] = metrics["queue_depth"]
+    header["max_queue_depth"] = metrics["max_queue_depth"]
+    header["dropped_samples"] = metrics["dropped_samples"]
+    header["total_ms"] = metrics.get("total_ms", 0.0)
+    header["cache_hits"] = metrics["cache_hits"]
+    header["cache_misses"] = metrics["cache_misses"]
+    hrv = status["hrv"]
+    header["hrv_counts"] = [hrv[name] for name in HRV_COUNTS]
+    header["hrv_instant_hr"] = hrv["instant_hr"]
+    header["hrv_windows"] = [
+        [hrv["windows"][seconds][name] for name in HRV_METRICS] for seconds in config.HRV_WINDOWS
+    ]
+    header["hrv_episodes"] = [hrv["episodes"][kind] for kind in EPISODE_KINDS]
+    header["hrv_ongoing"] = EPISODE_KINDS.index(hrv["ongoing"]) if hrv["ongoing"] else -1
+    header["seq"] += 1
+
+
+# =========================================================
+# ---------------- GUI-SIDE ADAPTERS ----------------------
+# =========================================================
+
+class ProcessLink:
+    """
+    Owns the shared block and the child process; its adapters stand in
+    for the reader (reader), the AnalysisWorker (analysis) and the
+    RhythmMonitor (monitor) inside ECGApp.
+    """
+
+    def __init__(self, spec=None, capacity=config.MAX_BUFFER_SIZE):
+        self.spec = dict(spec or {"kind": "serial"})
+        self.capacity = capacity
+
+        size = SharedBuffers.nbytes(capacity)
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        np.ndarray((size,), dtype=np.uint8, buffer=self.shm.buf)[:] = 0
+        self.shared = SharedBuffers(self.shm.buf, capacity, readonly=True)
+        self.shared.write_command(last_manual=time.time())
+        atexit.register(self.close)
+
+        self.context = mp.get_context("spawn")
+        self.process = None
+        self.restarts = 0
+        self.stopping = False
+        self._last_check = 0.0
+
+        self.app_state = None
+        self.reader = RemoteReader(self)
+        self.analysis = RemoteAnalysis(self)
+        self.monitor = RemoteMonitor(self)
+
+    def attach_app_state(self):
+        """
+        GUI AppState whose lead buffers are read-only views of the shared
+        block.
+        """
+        from .data_model import AppState
+        self.app_state = AppState(lead_buffers=self.shared.lead_buffers())
+        return self.app_state
+
+    # ---- child lifecycle ----
+
+    def start_child(self):
+        self.shared.write_command(stop=0)
+        self.process = self.context.Process(
+            target=_child_main,
+            args=(self.shm.name, self.capacity, self.spec, os.getpid()),
+            daemon=True,
+            name="ecg-acquisition",
+        )
+        self.process.start()
+        self._started = time.time()
+
+    def check(self):
+        """
+        Restarts the child if it died or stopped sending heartbeats
+        (throttled; called from the GUI loop).
+        """
+        now = time.time()
+        if self.stopping or self.process is None or now - self._last_check < CHECK_INTERVAL:
+            return
+        self._last_check = now
+
+        heartbeat = float(self.shared.header["heartbeat"])
+        alive = self.process.is_alive()
+        if heartbeat < self._started:
+            stale = now - self._started > STARTUP_TIMEOUT
+        else:
+            stale = now - heartbeat > HEARTBEAT_TIMEOUT
+        if alive and not stale:
+            return
+
+        if self.restarts >= MAX_RESTARTS:
+            if alive:
+                return
+            print("Acquisition process stopped; restart limit reached")
+            self.process = None
+            return
+
+        print(f"Acquisition process {'hung' if alive else 'died'} "
+              f"(exit code {self.process.exitcode}); restarting")
+        if alive:
+            self.process.terminate()
+            self.process.join(1.0)
+        self.restarts += 1
+        self.start_child()
+
+    def stop_child(self, timeout=2.0):
+        self.stopping = True
+        self.shared.write_command(stop=1)
+        if self.process is not None:
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join(timeout)
+            self.process = None
+
+    def close(self):
+        """
+        Stops the child and releases the shared block (idempotent).
+        """
+        if self.shm is None:
+            return
+        self.stop_child()
+        self.shared = None
+        if self.app_state is not None:
+            # Las vistas del GUI deben soltarse antes de cerrar el bloque
+            self.app_state.lead_raw.clear()
+            self.app_state.lead_filtered.clear()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        try:
+            self.shm.close()
+        except BufferError:
+            # Quedan vistas vivas: el bloque se libera al salir del proceso
+            pass
+        self.shm = None
+
+    # ---- commands ----
+
+    def send_command(self, **fields):
+        self.shared.write_command(**fields)
+
+    def sync(self):
+        """
+        Copies child status into the GUI AppState and GUI mode into the
+        command block. Returns (header, peaks), or None if no consistent
+        header could be read this time.
+        """
+        self.check()
+        copies = self.shared.read_header()
+        if copies is None:
+            return None
+        header, peaks = copies
+        app_state = self.app_state
+        if app_state is not None:
+            app_state.esp32_connected = bool(header["esp32_connected"])
+            app_state.serial_connected = app_state.esp32_connected
+            app_state.sample_count = int(header["sample_count"])
+            for lead in range(N_LEADS):
+                app_state.lead_raw[lead].write_index = int(header["raw_ends"][lead])
+                app_state.lead_filtered[lead].write_index = int(header["ends"][lead])
+
+            # MUX changes made by the child (AUTO) once our requests are applied
+            command = self.shared.command
+            if int(header["cmd_ack"]) == int(command["cmd_seq"]):
+                app_state.current_mux_state = int(header["mux_state"])
+
+            self.shared.write_command(
+                mode=MODES.index(app_state.settings.operation_mode),
+                last_manual=app_state.last_manual_action_time,
+            )
+        return header, peaks
+
+
+class RemoteReader:
+    """
+    Reader interface (start / stop / send_*_command) for the child process.
+    """
+
+    def __init__(self, link):
+        self.link = link
+
+    def start(self):
+        self.link.start_child()
+
+    def stop(self):
+        self.link.close()
+
+    def send_mux_command(self, state):
+        # ECGApp.update_gui pasa "STATE_n"
+        state = int(str(state).rsplit("_", 1)[-1])
+        shared = self.link.shared
+        shared.write_command(mux_request=state, cmd_seq=int(shared.command["cmd_seq"]) + 1)
+
+    def send_pace_command(self):
+        # Pacing is decided and sent by the monitor inside the child
+        return False
+
+
+class RemoteAnalysis:
+    """
+    AnalysisWorker interface: latest snapshot, set_params, metrics.
+    Reading `latest` also syncs the mirrored AppState fields.
+    """
+
+    def __init__(self, link):
+        self.link = link
+        self.params = AnalysisParams()
+        self.recorder = None
+        self._snapshot = None
+        self._header = None
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def set_params(self, **changes):
+        values = {
+            "threshold": changes.get("threshold", self.params.threshold),
+            "distance": changes.get("distance", self.params.distance),
+            "gain": changes.get("gain", self.params.gain),
+            "window": changes.get("window", self.params.window),
+            "detector": changes.get("detector", self.params.detector),
+        }
+        self.params = AnalysisParams(**values)
+        values["detector"] = DETECTOR_KINDS.index(values["detector"])
+        self.link.send_command(**values)
+
+    @property
+    def latest(self):
+        if self.link.shared is None:
+            return self._snapshot
+
+        copies = self.link.sync()
+        if copies is None:
+            return self._snapshot
+        header, peaks = copies
+        self._header = header
+        version = int(header["version"])
+        if version == 0 or (self._snapshot is not None and self._snapshot.version == version):
+            return self._snapshot
+
+        leads = range(N_LEADS)
+        peak_arrays = {}
+        for lead in leads:
+            events = peaks[lead, :int(header["peak_counts"][lead])]
+            events.flags.writeable = False
+            peak_arrays[lead] = events
+
+        self._snapshot = AnalysisSnapshot(
+            version=version,
+            timestamp=float(header["heartbeat"]),
+            params=self.params,
+            ends=MappingProxyType({lead: int(header["ends"][lead]) for lead in leads}),
+            peaks=MappingProxyType(peak_arrays),
+            bpm=MappingProxyType({lead: float(header["bpm"][lead]) for lead in leads}),
+            cardiac=MappingProxyType({lead: MappingProxyType({}) for lead in leads}),
+        )
+        return self._snapshot
+
+    def metrics(self):
+        header = self._header
+        if header is None:
+            return {"queue_depth": 0, "max_queue_depth": 0, "dropped_samples": 0,
+                    "cache_hits": 0, "cache_misses": 0}
+        return {
+            "queue_depth": int(header["queue_depth"]),
+            "max_queue_depth": int(header["max_queue_depth"]),
+            "dropped_samples": int(header["dropped_samples"]),
+            "total_ms": float(header["total_ms"]),
+            "cache_hits": int(header["cache_hits"]),
+            "cache_misses": int(header["cache_misses"]),
+            "restarts": self.link.restarts,
+        }
+
+
+class RemoteMonitor:
+    """
+    RhythmMonitor interface (status) backed by the child's header.
+    """
+
+    def __init__(self, link):
+        self.link = link
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def status(self):
+        header = self.link.analysis._header
+        if header is None:
+            return {
+                "state": "NO SIGNAL", "paces": 0, "bpm": 0,
+                "pacing_enabled": config.ENABLE_PACING, "beat_latency": {}, "pace_latency": {},
+                "hrv": None,
+            }
+        return {
+            "state": RHYTHM_STATES[int(header["rhythm_state"])],
+            "paces": int(header["paces"]),
+            "bpm": 0,
+            "pacing_enabled": bool(header["pacing_enabled"]),
+            "beat_latency": {"p95_ms": float(header["beat_p95_ms"])},
+            "pace_latency": {},
+            "hrv": _hrv_summary(header),
+        }
+
+
+def _hrv_summary(header):
+    """
+    HRVEngine.summary() rebuilt from the header fields.
+    """
+    summary = {name: int(value) for name, value in zip(HRV_COUNTS, header["hrv_counts"])}
+    summary["instant_hr"] = float(header["hrv_instant_hr"])
+    summary["windows"] = {
+        seconds: {name: float(value) for name, value in zip(HRV_METRICS, row)}
+        for seconds, row in zip(config.HRV_WINDOWS, header["hrv_windows"])
+    }
+    for metrics in summary["windows"].values():
+        metrics["n"] = int(metrics["n"])
+    summary["episodes"] = {kind: int(n) for kind, n in zip(EPISODE_KINDS, header["hrv_episodes"])}
+    ongoing = int(header["hrv_ongoing"])
+    summary["ongoing"] = EPISODE_KINDS[ongoing] if ongoing >= 0 else None
+    return summary
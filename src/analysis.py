@@ -0,0 +1,364 @@
+"""
+Signal analysis worker.
+
+Runs off the Tk main thread. For every derivation it consumes the raw
+samples that arrived since the last pass, and runs:
+    filtering -> streaming R-peak detection -> BPM / cardiac cycle analysis
+
+Results are published as an immutable AnalysisSnapshot; the GUI only reads
+the latest snapshot and renders it.
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, replace
+from types import MappingProxyType
+
+import numpy as np
+
+from . import config
+from .ecg_filters import ECGFilters
+from .peak_detection import create_peak_detector, calculate_bpm, analyze_cardiac_cycle
+from .instrumentation import PERF
+
+
+STAGES = ("filter", "detect", "analyze", "total")
+
+# Peak events kept per derivation
+MAX_PEAK_EVENTS = 512
+
+
+@dataclass(frozen=True)
+class AnalysisParams:
+    """
+    Detection parameters, pushed by the GUI (plain values, no Tk access
+    from the worker thread).
+    """
+    threshold: float = config.DEFAULT_R_THRESHOLD
+    distance: int = config.DEFAULT_R_DISTANCE
+    gain: float = config.DEFAULT_GAIN
+    window: int = config.DEFAULT_WINDOW_SIZE
+    detector: str = config.PEAK_DETECTOR
+
+
+class ResultCache:
+    """
+    Bounded LRU map of per-lead results. Keys identify everything the
+    result depends on (the lead's peak events and the part of them inside
+    the display window), so entries never need invalidation; the least
+    recently used are evicted.
+    """
+
+    def __init__(self, size=config.ANALYSIS_CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        result = self.entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "cache_evictions": self.evictions,
+            "cache_hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def _first_in_window(events, first):
+    """
+    Oldest peak event >= first (None if none), walking back from the
+    newest: only the peaks inside the window are visited.
+    """
+    found = None
+    for peak in reversed(events):
+        if peak < first:
+            break
+        found = peak
+    return found
+
+
+@dataclass(frozen=True)
+class AnalysisSnapshot:
+    """
+    Results of one analysis pass (read-only).
+
+    ends:    {lead: samples analysed}, valid end index for get_lead_signal()
+    peaks:   {lead: recent R-peak indices (read-only array)}
+    bpm:     {lead: BPM over the display window}
+    cardiac: {lead: analyze_cardiac_cycle() result}
+    """
+    version: int
+    timestamp: float
+    params: AnalysisParams
+    ends: MappingProxyType
+    peaks: MappingProxyType
+    bpm: MappingProxyType
+    cardiac: MappingProxyType
+
+
+class AnalysisWorker(threading.Thread):
+
+    def __init__(self, app_state, params=None, rhythm_monitor=None):
+        super().__init__(daemon=True)
+        self.app_state = app_state
+        self.running = True
+
+        # Receives new beats directly (pacing path does not wait for the GUI)
+        self.rhythm_monitor = rhythm_monitor
+
+        # Optional SessionRecorder (set/cleared by the GUI)
+        self.recorder = None
+
+        self.params = params or AnalysisParams()
+        self.filters = ECGFilters()
+
+        self.leads = list(app_state.mux_state_label)
+        self.detectors = {}
+        self.peak_events = {lead: deque(maxlen=MAX_PEAK_EVENTS) for lead in self.leads}
+        self.processed_index = {lead: 0 for lead in self.leads}
+        self._create_detectors()
+
+        self.latest = None
+        self._version = 0
+
+        # (peaks, bpm, cardiac) per lead, reused while nothing changed
+        self.cache = ResultCache()
+
+        # Metrics
+        self.stage_times = {stage: deque(maxlen=200) for stage in STAGES}
+        self.stage_totals = dict.fromkeys(STAGES, 0.0)
+        self.passes = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.dropped_samples = 0
+
+    # =========================================================
+    # ---------------- CONTROL --------------------------------
+    # =========================================================
+
+    def set_params(self, **changes):
+        """
+        Updates detection parameters (called from the GUI thread).
+        The new parameters apply from the next pass.
+        """
+        self.params = replace(self.params, **changes)
+
+    def stop(self):
+        self.running = False
+        self.app_state.new_data.set()
+
+    def resume(self, ends):
+        """
+        Continues from {lead: analysed index} instead of 0 (buffers that
+        outlived a previous worker, e.g. after an acquisition restart).
+        Call before start().
+        """
+        self.processed_index.update(ends)
+        self._create_detectors()
+
+    def run(self):
+        timeout = config.REFRESH_INTERVAL / 1000
+        while self.running:
+            self.app_state.new_data.wait(timeout)
+            self.app_state.new_data.clear()
+            if self.running:
+                self.process_once()
+
+    # =========================================================
+    # ---------------- PIPELINE -------------------------------
+    # =========================================================
+
+    def _create_detectors(self):
+        self._detector_kind = self.params.detector
+        for lead in self.leads:
+            detector = create_peak_detector(self._detector_kind)
+            detector.reset(self.processed_index[lead])
+            self.detectors[lead] = detector
+            self.peak_events[lead].clear()
+
+    def process_once(self):
+        """
+        Analyses all new samples and publishes a new snapshot.
+        """
+        t_start = time.perf_counter()
+        params = self.params
+
+        if params.detector != self._detector_kind:
+            self._create_detectors()
+
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.note_mux(self.app_state.current_mux_state)
+
+        ends, arrivals = self.app_state.get_lead_progress()
+        self.queue_depth = sum(ends[lead] - self.processed_index[lead] for lead in self.leads)
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+        # Detection runs on the unscaled signal: y * gain > thr  <=>  y > thr / gain
+        threshold = params.threshold / params.gain if params.gain > 0 else params.threshold
+
+        t_filter = t_detect = 0.0
+        for lead in self.leads:
+            end = ends[lead]
+            new = end - self.processed_index[lead]
+            if new <= 0:
+                continue
+
+            raw_buffer = self.app_state.lead_raw[lead]
+            n = min(new, raw_buffer.capacity)
+            skipped = new - n
+            self.dropped_samples += skipped
+            if skipped:
+                PERF.count("analysis.dropped_samples", skipped)
+            chunk = raw_buffer.latest(n, end)
+
+            t0 = time.perf_counter()
+            filtered = self.filters.process_block(chunk, lead)
+
+            # Lock-free read: if the writer lapped us while filtering,
+            # the oldest samples of the chunk are not trustworthy
+            lost = min(raw_buffer.overwritten(end - n), n)
+            if lost:
+                self.dropped_samples += lost
+                PERF.count("analysis.overwritten_samples", lost)
+                # Se descartan como un hueco más; el estado del filtro
+                # vio muestras corruptas y se reinicia
+                n -= lost
+                skipped += lost
+                chunk = chunk[lost:]
+                self.filters.reset(lead)
+                filtered = self.filters.process_block(chunk, lead)
+            start = end - n
+            self.app_state.append_filtered(lead, filtered, skipped)
+            if recorder is not None:
+                recorder.record(lead, start, chunk, filtered, skipped)
+            t1 = time.perf_counter()
+
+            detector = self.detectors[lead]
+            detector.set_params(threshold, params.distance)
+            source = filtered if config.USE_FILTERED_SIGNAL else chunk
+            new_peaks = detector.feed(source, start)
+            self.peak_events[lead].extend(new_peaks.tolist())
+            if self.rhythm_monitor is not None and len(new_peaks):
+                self.rhythm_monitor.post_beats(lead, new_peaks, end, arrivals[lead])
+            if recorder is not None and len(new_peaks):
+                recorder.record_peaks(lead, new_peaks, end)
+            t2 = time.perf_counter()
+
+            t_filter += t1 - t0
+            t_detect += t2 - t1
+            self.processed_index[lead] = end
+
+        if self.rhythm_monitor is not None:
+            latest_arrival = max(arrivals.values())
+            if latest_arrival > 0:
+                self.rhythm_monitor.post_progress(latest_arrival)
+
+        t0 = time.perf_counter()
+        peaks, bpm, cardiac = {}, {}, {}
+        latest = self.latest
+        changed = (latest is None or latest.params != params
+                   or any(latest.ends[lead] != self.processed_index[lead] for lead in self.leads))
+        for lead in self.leads:
+            events = self.peak_events[lead]
+            first = self.processed_index[lead] - params.window
+            # Los eventos solo se añaden por el final: (número, último, primero
+            # en la ventana) identifican los picos y la ventana analizada.
+            # Entre latidos la clave se repite aunque lleguen muestras.
+            key = (lead, len(events), events[-1] if events else None,
+                   _first_in_window(events, first))
+            result = self.cache.get(key)
+            if result is None:
+                result = self._analyze_lead(lead, first)
+                self.cache.put(key, result)
+                changed = True
+            peaks[lead], bpm[lead], cardiac[lead] = result
+        t_analyze = time.perf_counter() - t0
+
+        # Same snapshot (and version) while no lead and no parameter
+        # changed: consumers skip passes without news
+        if changed:
+            self._publish(params, peaks, bpm, cardiac)
+
+        durations = {
+            "filter": t_filter,
+            "detect": t_detect,
+            "analyze": t_analyze,
+            "total": time.perf_counter() - t_start,
+        }
+        for stage, seconds in durations.items():
+            self.stage_times[stage].append(seconds)
+            self.stage_totals[stage] += seconds
+        self.passes += 1
+
+        if PERF.enabled:
+            for stage, seconds in durations.items():
+                PERF.record("analysis." + stage, seconds)
+            PERF.observe("analysis.queue_depth", self.queue_depth)
+
+        return self.latest
+
+    def _analyze_lead(self, lead, first):
+        """
+        Peaks of one lead, and BPM / cardiac cycle over its peaks from
+        sample `first` on (the display window).
+        """
+        events = np.fromiter(self.peak_events[lead], dtype=np.int64, count=len(self.peak_events[lead]))
+        events.flags.writeable = False
+
+        in_window = events[events >= first]
+        bpm = calculate_bpm(in_window, config.SAMPLE_RATE)
+        cardiac = MappingProxyType(analyze_cardiac_cycle(in_window, config.SAMPLE_RATE))
+        return events, bpm, cardiac
+
+    def _publish(self, params, peaks, bpm, cardiac):
+        self._version += 1
+        self.latest = AnalysisSnapshot(
+            version=self._version,
+            timestamp=time.monotonic(),
+            params=params,
+            ends=MappingProxyType(dict(self.processed_index)),
+            peaks=MappingProxyType(peaks),
+            bpm=MappingProxyType(bpm),
+            cardiac=MappingProxyType(cardiac),
+        )
+
+    # =========================================================
+    # ---------------- METRICS --------------------------------
+    # =========================================================
+
+    def metrics(self):
+        """
+        Queue depth (samples waiting), per-stage latency in ms
+        (mean / max over the recent passes) and result cache counters.
+        """
+        result = {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "dropped_samples": self.dropped_samples,
+        }
+        result.update(self.cache.stats())
+        for stage, times in self.stage_times.items():
+            if times:
+                result[f"{stage}_ms"] = 1e3 * sum(times) / len(times)
+                result[f"{stage}_max_ms"] = 1e3 * max(times)
+        return result
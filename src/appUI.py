@@ -1,33 +1,76 @@
 
 import tkinter as tk
 from tkinter import ttk
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import numpy as np
 import time
 
 from . import config
 from .data_model import AppState
+from .tk_binding import TkStateBinding
 from .serial_handler import SerialReader
-from .peak_detection import detect_r_peaks, calculate_bpm
+from .peak_detection import PEAK_DETECTORS
+from .analysis import AnalysisWorker
+from .rhythm_monitor import RhythmMonitor
+from .recorder import SessionRecorder
+from .replay import ReplayReader
+from .instrumentation import PERF
+from .plot_renderer import ECGPlotView
 
 class ECGApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, reader_factory=None, link=None):
+        """
+        reader_factory: callable(app_state) that builds the acquisition
+        source (default: SerialReader), e.g. a ReplayReader.
+        link: acquisition_process.ProcessLink; acquisition and analysis
+        run in a child process and the GUI reads the shared buffers.
+        """
         super().__init__()
         self.title("ECG Monitor - 6 derivations")
         self.geometry("1300x850")
         self.previous_mux_state = None
+        # Versión de app_state.settings enviada al análisis
+        self.settings_version = None
+        # Última combinación (análisis, derivación, ajustes) dibujada
+        self.frame_key = None
         self.is_running = True
         
-        # Core components
-        self.app_state = AppState()
-        self.serial_reader = SerialReader(self.app_state)
+        self.link = link
         
         # Alerta de marcapasos
         self.pacemaker_alert_active = False
         
+        # Grabación de sesión (None = no se está grabando)
+        self.recorder = None
+        
+        # Core components
+        if link is not None:
+            # Lectura, análisis y monitor de ritmo en otro proceso
+            self.app_state = link.attach_app_state()
+            self.serial_reader = link.reader
+            self.rhythm_monitor = link.monitor
+            self.analysis = link.analysis
+        else:
+            self.app_state = AppState()
+            self.serial_reader = (reader_factory or SerialReader)(self.app_state)
+            
+            # Monitor de ritmo: decide la estimulación sin pasar por la GUI
+            self.rhythm_monitor = RhythmMonitor(self.serial_reader)
+            
+            # Filtrado, detección R y análisis en un hilo aparte;
+            # la GUI solo lee la última instantánea publicada
+            self.analysis = AnalysisWorker(self.app_state, rhythm_monitor=self.rhythm_monitor)
+        if isinstance(self.serial_reader, ReplayReader):
+            # Modo "max": la reproducción espera al análisis
+            self.serial_reader.analysis = self.analysis
+        
+        # Variables Tk de los widgets, enlazadas a los campos de AppState
+        self.vars = TkStateBinding(self, self.app_state)
+        
         self._create_widgets()
         self.serial_reader.start()
+        self.rhythm_monitor.start()
+        self.analysis.start()
         self.update_gui()
         self.previous_mux_state = self.app_state.current_mux_state
         
@@ -51,9 +94,11 @@ class ECGApp(tk.Tk):
         
         self._create_derivation_panel(sidebar_frame)
         self._create_gain_panel(sidebar_frame)
+        self._create_peak_panel(sidebar_frame)
         self._create_mode_panel(sidebar_frame)
         self._create_status_panel(sidebar_frame)
         self._create_pacemaker_panel(sidebar_frame)
+        self._create_recording_panel(sidebar_frame)
         
     # =====================================================
     # ------------------ PLOTS ----------------------------
@@ -61,21 +106,74 @@ class ECGApp(tk.Tk):
     
     def _create_plots(self, parent):
 
-        self.fig, self.ax = plt.subplots(figsize=(9, 6))
+        # Figure sin pyplot: sin estado global ni backend extra al importar
+        self.fig = Figure(figsize=(9, 6))
 
         self.canvas = FigureCanvasTkAgg(self.fig, master=parent)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
-        self.ax.set_title("ECG Signal")
-        self.ax.set_ylabel("Voltage (V)")
-        self.ax.set_xlabel("Samples")
-        self.ax.grid(True, alpha=0.3)
+        self.plot_view = ECGPlotView(self.canvas, self.app_state.mux_state_label)
+        self.renderer = self.plot_view.renderer
+        self._build_panels()
+
+        ttk.Checkbutton(
+            parent,
+            text="Show all 6 leads",
+            variable=self.vars.show_all_leads,
+            command=self._build_panels
+        ).pack(anchor="w")
+
+        # Overlay de rendimiento (solo con instrumentación activa)
+        self.perf_overlay = tk.Label(
+            parent, font=("Courier", 8), justify="left", anchor="nw",
+            bg="black", fg="#00ff66"
+        )
+        self.show_perf_overlay = tk.BooleanVar(value=False)
+        if PERF.enabled:
+            ttk.Checkbutton(
+                parent,
+                text="Performance overlay",
+                variable=self.show_perf_overlay,
+                command=self._toggle_perf_overlay
+            ).pack(anchor="w")
+            self.after(int(config.INSTRUMENTATION_DUMP_INTERVAL * 1000), self._dump_perf)
+
+    def _build_panels(self):
+        settings = self.app_state.settings
+        self.plot_view.build(
+            settings.show_all_leads,
+            self.app_state.current_mux_state,
+            settings.window_size,
+            settings.y_max,
+        )
+
+    # =====================================================
+    # ---------------- PERFORMANCE OVERLAY -----------------
+    # =====================================================
+    def _toggle_perf_overlay(self):
+        if self.show_perf_overlay.get():
+            self.perf_overlay.place(relx=1.0, rely=0.0, anchor="ne")
+            self._update_perf_overlay()
+        else:
+            self.perf_overlay.place_forget()
+
+    def _update_perf_overlay(self):
+        if not self.is_running or not self.show_perf_overlay.get():
+            return
+        
+        header = f"{'stage':<18} {'mean':>7} {'p95':>7} {'max':>8}"
+        self.perf_overlay.config(text="\n".join([header] + PERF.format_lines()))
+        self.after(500, self._update_perf_overlay)
 
-        self.line, = self.ax.plot([], [], linewidth=1.3)
-        self.peaks_line, = self.ax.plot([], [], 'ro', markersize=5)
+    def _dump_perf(self):
+        if not self.is_running:
+            return
+        
+        PERF.dump(config.INSTRUMENTATION_DUMP_FILE)
+        if config.ENABLE_DEBUG_PRINTS:
+            print("\n".join(PERF.format_lines()))
+        self.after(int(config.INSTRUMENTATION_DUMP_INTERVAL * 1000), self._dump_perf)
 
-        self.fig.tight_layout()
-    
     # =====================================================
     # ---------------- PACEMAKER ALERT -------------------
     # =====================================================
@@ -85,13 +183,89 @@ class ECGApp(tk.Tk):
         
         self.pacemaker_label = ttk.Label(panel, text="No Alert", foreground="green", font=("Arial", 12, "bold"))
         self.pacemaker_label.pack()
-
-    def update_pacemaker_alert(self, peaks):
-        if len(peaks) == 0:
-            self.pacemaker_label.config(text="⚠ PACEMAKER ACTIVATED ⚠", foreground="red")
         
+        self.pacing_info_label = ttk.Label(panel, text="")
+        self.pacing_info_label.pack()
+
+        # Tendencia HRV (ventana config.HRV_DISPLAY_WINDOW)
+        self.hrv_label = ttk.Label(panel, text="")
+        self.hrv_label.pack()
+
+    def update_pacemaker_alert(self):
+        """
+        Shows the rhythm monitor state (the decision itself is taken
+        in the monitor thread, not here).
+        """
+        status = self.rhythm_monitor.status()
+        state = status["state"]
+        self.pacemaker_alert_active = state in ("ASYSTOLE", "BRADYCARDIA")
+        
+        if state == "ASYSTOLE":
+            self.pacemaker_label.config(text="⚠ PACEMAKER ACTIVATED ⚠", foreground="red")
+        elif state == "BRADYCARDIA":
+            self.pacemaker_label.config(text="⚠ BRADYCARDIA ⚠", foreground="orange")
+        elif state == "NO SIGNAL":
+            self.pacemaker_label.config(text="No Signal", foreground="gray")
         else:
             self.pacemaker_label.config(text="No Alert", foreground="green")
+        
+        beat_ms = status["beat_latency"].get("p95_ms", 0.0)
+        self.pacing_info_label.config(
+            text=f"paces {status['paces']} | beat p95 {beat_ms:.1f} ms"
+            + ("" if status["pacing_enabled"] else " | pacing off")
+        )
+
+        hrv = status.get("hrv")
+        if hrv is not None:
+            window = hrv["windows"][config.HRV_DISPLAY_WINDOW]
+            self.hrv_label.config(
+                text=f"SDNN {window['sdnn_ms']:.0f} ms | RMSSD {window['rmssd_ms']:.0f} ms | "
+                f"pNN50 {window['pnn50']:.0f}% | ectopic {hrv['ectopic']}"
+                + (f" | {hrv['ongoing']}" if hrv["ongoing"] else "")
+            )
+    
+    # =====================================================
+    # ---------------- RECORDING --------------------------
+    # =====================================================
+    def _create_recording_panel(self, parent):
+        panel = ttk.LabelFrame(parent, text="Recording", padding="10")
+        panel.pack(fill=tk.X, pady=6)
+        
+        self.record_button = ttk.Button(panel, text="Start Recording", command=self.toggle_recording)
+        self.record_button.pack(fill="x", pady=4)
+        
+        self.recording_label = ttk.Label(panel, text="Not recording")
+        self.recording_label.pack(anchor="w")
+
+        if self.link is not None:
+            # Las muestras no pasan por este proceso
+            self.record_button.state(["disabled"])
+            self.recording_label.config(text="Not available in multiprocess mode")
+
+    def toggle_recording(self):
+        if self.recorder is None:
+            self.recorder = SessionRecorder(self.app_state.mux_state_label)
+            self.recorder.start()
+            self.analysis.recorder = self.recorder
+            self.record_button.config(text="Stop Recording")
+            print("Recording to", self.recorder.path)
+        else:
+            self.analysis.recorder = None
+            self.recorder.close()
+            print("Recording saved:", self.recorder.path)
+            self.recorder = None
+            self.record_button.config(text="Start Recording")
+            self.recording_label.config(text="Not recording")
+
+    def update_recording_status(self):
+        if self.recorder is None:
+            return
+        
+        stats = self.recorder.stats()
+        seconds = time.time() - self.recorder.start_time
+        self.recording_label.config(
+            text=f"{seconds:.0f} s | {stats['bytes'] / 1e6:.1f} MB | dropped {stats['dropped_samples']}"
+        )
     
     # =====================================================
     # -------------- DERIVATION PANEL ---------------------
@@ -149,9 +323,7 @@ class ECGApp(tk.Tk):
         )
         self.mode_label.pack()
 
-    def update_mode_display(self):
-
-        mode = self.app_state.operation_mode.get()
+    def update_mode_display(self, mode):
 
         if mode == config.MODE_AUTO:
             self.mode_label.config(text="AUTO", foreground="red")
@@ -172,31 +344,25 @@ class ECGApp(tk.Tk):
         ttk.Scale(
             panel, from_ = 0.5, to = 5.0,
             orient = tk.HORIZONTAL,
-            variable = self.app_state.ecg_gain,
+            variable = self.vars.ecg_gain,
             command = lambda v: self.gain_label.config(text = f'Gain: {float(v):.2f}x')
         ).pack(fill = "x", pady = 4)
-    
-    # =====================================================
-    # -------------- PLOT CONTROL -------------------------
-    # =====================================================
-    
-    def _create_plots(self, parent):
-
-        self.fig, self.ax = plt.subplots(figsize=(9, 6))
-        
-        self.canvas = FigureCanvasTkAgg(self.fig, master=parent)
-        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-        
-        self.ax.set_title("ECG Signal")
-        self.ax.set_ylabel("Voltage (V)")
-        self.ax.set_xlabel("Samples")
-        self.ax.grid(True, alpha=0.3)
         
-        self.line, = self.ax.plot([], [], linewidth=1.3)
-        self.peaks_line, = self.ax.plot([], [], 'ro', markersize=5)
+        self.window_label = ttk.Label(
+            panel,
+            text = f"Window: {self.app_state.settings.window_size / config.SAMPLE_RATE:.1f} s"
+        )
+        self.window_label.pack()
         
-        self.fig.tight_layout()
-
+        # Ventanas largas (hasta MAX_BUFFER_SIZE) se dibujan decimadas (min/max)
+        ttk.Scale(
+            panel, from_ = 200, to = config.MAX_BUFFER_SIZE,
+            orient = tk.HORIZONTAL,
+            variable = self.vars.window_size,
+            command = lambda v: self.window_label.config(
+                text = f'Window: {float(v) / config.SAMPLE_RATE:.1f} s'
+            )
+        ).pack(fill = "x", pady = 4)
     
     # =====================================================
     # -------------- PEAK DETECTION -----------------------
@@ -210,15 +376,25 @@ class ECGApp(tk.Tk):
         ttk.Scale(
             panel, from_= 0.1, to = 3.0,
             orient = tk.HORIZONTAL,
-            variable = self.app_state.r_threshold
+            variable = self.vars.r_threshold
         ).pack(fill = "x")
         
         ttk.Label(panel, text = "Min Distance").pack()
         ttk.Scale(
             panel, from_= 20, to = 1000,
             orient = tk.HORIZONTAL,
-            variable = self.app_state.r_distance
+            variable = self.vars.r_distance
         ).pack(fill = "x")
+        
+        ttk.Label(panel, text = "Detector").pack()
+        detector_box = ttk.Combobox(
+            panel,
+            values = list(PEAK_DETECTORS),
+            textvariable = self.vars.peak_detector_kind,
+            state = "readonly"
+        )
+        detector_box.pack(fill = "x")
+
     
     # =====================================================
     # ---------------- STATUS PANEL -----------------------
@@ -232,12 +408,12 @@ class ECGApp(tk.Tk):
 
         self.status_labels = {}
 
-        for label in ["ESP32", "Samples", "BPM", "Derivation"]:
+        for label in ["ESP32", "Samples", "BPM", "Derivation", "Render", "Analysis", "Cache"]:
             ttk.Label(panel, text=f"{label}:").pack(anchor="w")
             self.status_labels[label] = ttk.Label(panel, text="N/A")
             self.status_labels[label].pack(anchor="w")
 
-    def update_status(self, y_raw):
+    def update_status(self, bpm):
 
         self.status_labels["ESP32"].config(
             text="🟢 Connected" if self.app_state.esp32_connected else "🔴 Disconnected"
@@ -247,14 +423,6 @@ class ECGApp(tk.Tk):
             text=str(self.app_state.sample_count)
         )
 
-        peaks = detect_r_peaks(
-            y_raw,
-            self.app_state.r_threshold.get(),
-            self.app_state.r_distance.get()
-        )
-
-        bpm = calculate_bpm(peaks, config.SAMPLE_RATE)
-
         self.status_labels["BPM"].config(
             text=f"{bpm:.0f}" if bpm > 0 else "Calculating"
         )
@@ -264,8 +432,48 @@ class ECGApp(tk.Tk):
             text=self.app_state.mux_state_label[state]
         )
 
-        return peaks
-    
+        fps, ms_per_frame = self.renderer.stats()
+        self.status_labels["Render"].config(
+            text=f"{fps:.0f} fps | {ms_per_frame:.1f} ms/frame"
+        )
+
+        metrics = self.analysis.metrics()
+        self.status_labels["Analysis"].config(
+            text=f"queue {metrics['queue_depth']} | {metrics.get('total_ms', 0.0):.2f} ms/pass"
+            + (f" | restarts {metrics['restarts']}" if metrics.get("restarts") else "")
+        )
+
+        hits, misses = metrics.get("cache_hits", 0), metrics.get("cache_misses", 0)
+        self.status_labels["Cache"].config(
+            text=f"{hits} hits | {misses} misses"
+            + (f" ({100 * hits / (hits + misses):.0f}%)" if hits + misses else "")
+        )
+
+    # =====================================================
+    # ---------------- RENDER SNAPSHOT --------------------
+    # =====================================================
+
+    def render_snapshot(self, snapshot, win, y_max, gain):
+        """
+        Draws the latest analysis results and refreshes the side panels.
+        """
+        current = self.app_state.current_mux_state
+
+        # Mismo resultado, mismos ajustes y misma derivación: nada que dibujar
+        frame_key = (snapshot.version, current, win, y_max, gain)
+        if frame_key != self.frame_key or self.renderer.needs_full_redraw:
+            self.frame_key = frame_key
+            with PERF.timer("gui.render"):
+                self.plot_view.render_snapshot(
+                    snapshot, self.app_state.get_lead_signal, current, win, y_max, gain
+                )
+
+        with PERF.timer("gui.panels"):
+            if snapshot.ends[current] > 0:
+                self.update_status(snapshot.bpm[current])
+            self.update_pacemaker_alert()
+            self.update_recording_status()
+
     # =====================================================
     # ---------------- MAIN UPDATE ------------------------
     # =====================================================
@@ -275,43 +483,29 @@ class ECGApp(tk.Tk):
         if not self.is_running:
             return
 
-        with self.app_state.data_lock:
-            x = list(self.app_state.time_buffer)
-            y = self.app_state.get_current_signal()
-
-        if len(y) > 0:
-
-            win = self.app_state.window_size.get()
-
-            x = x[-win:]
-            y = y[-win:]
-
-            y = np.array(y) * self.app_state.ecg_gain.get()
-
-            self.line.set_data(x, y)
-
-            self.ax.set_ylim(
-                -self.app_state.y_max.get(),
-                self.app_state.y_max.get()
-            )
-
-            self.ax.set_xlim(x[0], x[-1])
-
-            peaks = detect_r_peaks(
-                y,
-                self.app_state.r_threshold.get(),
-                self.app_state.r_distance.get()
+        t_start = time.perf_counter()
+        # Cambios hechos por otros hilos (p. ej. modo AUTO) a los widgets
+        self.vars.flush()
+        settings = self.app_state.settings
+        win = settings.window_size
+        y_max = settings.y_max
+        gain = settings.ecg_gain
+
+        # Parameters go to the analysis thread as plain values, only
+        # when a setting changed since the last tick
+        if settings.version != self.settings_version:
+            self.analysis.set_params(
+                threshold=settings.r_threshold,
+                distance=settings.r_distance,
+                gain=gain,
+                window=win,
+                detector=settings.peak_detector_kind,
             )
+            self.settings_version = settings.version
 
-            self.peaks_line.set_data(
-                [x[i] for i in peaks],
-                [y[i] for i in peaks]
-            )
-
-            self.canvas.draw()
-
-            peaks = self.update_status(y)
-            self.update_pacemaker_alert(peaks)
+        snapshot = self.analysis.latest
+        if snapshot is not None:
+            self.render_snapshot(snapshot, win, y_max, gain)
 
         # ===== AUTO MODE LOGIC =====
         # Revisar modo automático
@@ -328,8 +522,9 @@ class ECGApp(tk.Tk):
             # Actualizar estado guardado
             self.previous_mux_state = self.app_state.current_mux_state
 
-        self.update_mode_display()
+        self.update_mode_display(self.app_state.settings.operation_mode)
 
+        PERF.record("gui.update", time.perf_counter() - t_start)
         self.after(config.REFRESH_INTERVAL, self.update_gui)
 
     # =====================================================
@@ -338,6 +533,13 @@ class ECGApp(tk.Tk):
 
     def on_closing(self):
         self.is_running = False
+        if PERF.enabled:
+            PERF.dump(config.INSTRUMENTATION_DUMP_FILE)
+        self.analysis.stop()
+        self.rhythm_monitor.stop()
+        if self.recorder is not None:
+            self.analysis.recorder = None
+            self.recorder.close()
         self.serial_reader.stop()
         self.destroy()
         import sys
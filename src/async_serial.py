@@ -0,0 +1,363 @@
+"""
+asyncio serial backend.
+
+One event loop, in one background thread, serves every port:
+    - reads are callbacks on the port's file descriptor (loop.add_reader),
+      so an idle link costs no CPU and no thread blocks in read()
+    - MUX commands and PACE are queued to the loop and written when the
+      descriptor is writable (no write lock, no blocking write)
+    - AUTO derivation switching runs on loop timers (call_later), scheduled
+      for the exact moment the next switch or mode change is due
+    - a port that fails is closed and reopened after SERIAL_RECONNECT_DELAY
+
+Several devices can run at once; each may feed its own AppState. All
+callbacks run on the loop thread, so every AppState still has a single
+producer (the lock-free handoff stays valid).
+
+On platforms without add_reader for serial handles (Windows proactor
+loop) a port falls back to blocking reads in the loop's executor.
+
+Same reader interface as SerialReader (start, stop, send_mux_command,
+send_pace_command, get_stats), so ECGApp and the benchmarks use it
+unchanged. For local testing, point it at a pty_device.PtyDevice.
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+import serial
+
+from . import config
+from .packet_protocol import FrameDecoder, LineDecoder
+from .serial_handler import ReaderStats
+from .instrumentation import PERF
+
+
+READ_SIZE = 65536
+
+
+class SerialDevice:
+    """
+    One port on the loop: non-blocking reads into an AppState and a
+    buffered command writer.
+    """
+
+    def __init__(self, loop, app_state, port, baudrate=config.BAUDRATE, protocol=config.SERIAL_PROTOCOL):
+        self.loop = loop
+        self.app_state = app_state
+        self.port_name = port
+        self.baudrate = baudrate
+        self.protocol = protocol
+
+        self.decoder = FrameDecoder() if protocol == "BINARY" else LineDecoder()
+        self.stats = ReaderStats()
+        self.serial_port = None
+        self.fd = None
+        self._out = bytearray()
+        self._writing = False
+        self._executor_read = None
+        self.errors = 0
+
+    @property
+    def is_open(self):
+        return self.serial_port is not None and self.serial_port.is_open
+
+    # =========================================================
+    # ----------------- CONNECTION ----------------------------
+    # =========================================================
+
+    def open(self):
+        self.serial_port = serial.Serial(port=self.port_name, baudrate=self.baudrate, timeout=0, write_timeout=0)
+        self.decoder.reset()
+        self._out.clear()
+        try:
+            self.fd = self.serial_port.fileno()
+            self.loop.add_reader(self.fd, self._on_readable)
+        except (AttributeError, NotImplementedError):
+            # Sin descriptor legible por el loop: lecturas bloqueantes en el executor
+            self.fd = None
+            self.serial_port.timeout = config.SERIAL_TIMEOUT
+            self._executor_read = self.loop.create_task(self._read_in_executor())
+        print(f"Serial port {self.port_name} open")
+
+    def close(self):
+        if self.fd is not None:
+            self.loop.remove_reader(self.fd)
+            if self._writing:
+                self.loop.remove_writer(self.fd)
+        self._writing = False
+        self.fd = None
+        if self._executor_read is not None:
+            self._executor_read.cancel()
+            self._executor_read = None
+        if self.serial_port is not None:
+            self.serial_port.close()
+
+    # =========================================================
+    # ----------------- READ ----------------------------------
+    # =========================================================
+
+    def _on_readable(self):
+        try:
+            data = os.read(self.fd, READ_SIZE)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._failed(e)
+            return
+        if not data:
+            self._failed(EOFError("port closed"))
+            return
+        self._feed(data)
+
+    async def _read_in_executor(self):
+        while self.is_open:
+            try:
+                data = await self.loop.run_in_executor(None, self.serial_port.read, READ_SIZE)
+            except (serial.SerialException, OSError, TypeError) as e:
+                self._failed(e)
+                return
+            if data:
+                self._feed(data)
+
+    def _feed(self, data):
+        # ASCII no trae derivación: se usa la seleccionada en el MUX
+        with PERF.timer("serial.decode"):
+            volts, mux = self.decoder.feed(data)
+        with PERF.timer("serial.append"):
+            lock_time = self.app_state.append_samples(volts, mux)
+        self.stats.add_chunk(len(data), len(volts), lock_time)
+
+        if PERF.enabled:
+            PERF.count("serial.bytes", len(data))
+
+    # =========================================================
+    # ----------------- WRITE ---------------------------------
+    # =========================================================
+
+    def write(self, data):
+        """
+        Queues bytes for the port (loop thread only).
+        """
+        if not self.is_open:
+            return False
+        self._out += data
+        self._on_writable()
+        return True
+
+    def _on_writable(self):
+        try:
+            n = os.write(self.fd, self._out) if self.fd is not None else self.serial_port.write(self._out)
+        except BlockingIOError:
+            n = 0
+        except (serial.SerialException, OSError) as e:
+            self._failed(e)
+            return
+        del self._out[:n or 0]
+
+        # Resto pendiente: se escribe cuando el puerto lo acepte
+        if self._out and self.fd is not None and not self._writing:
+            self.loop.add_writer(self.fd, self._on_writable)
+            self._writing = True
+        elif not self._out and self._writing:
+            self.loop.remove_writer(self.fd)
+            self._writing = False
+
+    def _failed(self, error):
+        print(f"Serial error on {self.port_name}:", error)
+        self.errors += 1
+        self.close()
+        self.on_failure(self)
+
+    def on_failure(self, device):
+        # Reemplazado por AsyncSerialReader (reconexión)
+        pass
+
+    def get_stats(self):
+        self.stats.update_rates()
+        stats = {
+            "port": self.port_name,
+            "open": self.is_open,
+            "bytes_per_s": self.stats.bytes_per_s,
+            "samples_per_s": self.stats.samples_per_s,
+            "bytes_total": self.stats.bytes_total,
+            "samples_total": self.stats.samples_total,
+            "errors": self.errors,
+        }
+        stats.update(self.decoder.stats())
+        return stats
+
+
+class AsyncSerialReader:
+    """
+    Reader for one or more ports on a single asyncio loop.
+
+    ports: port names (default config.SERIAL_PORTS), or (port, app_state)
+    pairs for devices that feed their own AppState. `app_state` drives
+    the MUX / AUTO logic; commands go to every port.
+    """
+
+    def __init__(self, app_state, ports=None, baudrate=config.BAUDRATE,
+                 protocol=config.SERIAL_PROTOCOL, auto_mode=True):
+        self.app_state = app_state
+        self.ports = [
+            entry if isinstance(entry, tuple) else (entry, app_state)
+            for entry in (ports or config.SERIAL_PORTS)
+        ]
+        self.baudrate = baudrate
+        self.protocol = protocol
+        self.auto_mode = auto_mode
+
+        self.loop = None
+        self.thread = None
+        self.running = False
+        self.devices = []
+        self._auto_timer = None
+        self._last_switch = time.time()
+        self._started = threading.Event()
+
+    # =========================================================
+    # ----------------- READER INTERFACE ----------------------
+    # =========================================================
+
+    def start(self):
+        self.running = True
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, daemon=True, name="async-serial")
+        self.thread.start()
+        self._started.wait()
+
+    def connect(self):
+        # Compatibilidad con SerialReader: start() ya abre los puertos
+        if not self.running:
+            self.start()
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        self.loop.call_soon_threadsafe(self._shutdown)
+        self.thread.join()
+
+    def send_mux_command(self, state):
+        """
+        Sends derivation index (0–5) to every device.
+        """
+        self._send(f"STATE{state}\n".encode())
+
+    def send_pace_command(self):
+        """
+        Queues the pacing command for every device.
+
+        Returns:
+            bool: True if at least one port is open
+        """
+        if not any(device.is_open for device in self.devices):
+            return False
+        self._send(f"{config.PACE_COMMAND}\n".encode())
+        return True
+
+    def send_command(self, command):
+        self._send(f"{command}\n".encode())
+
+    def _send(self, data):
+        if self.running:
+            self.loop.call_soon_threadsafe(self._write_all, data)
+
+    def get_stats(self):
+        """
+        Per-port counters and the totals.
+        """
+        devices = [device.get_stats() for device in self.devices]
+        return {
+            "bytes_per_s": sum(d["bytes_per_s"] for d in devices),
+            "samples_per_s": sum(d["samples_per_s"] for d in devices),
+            "bytes_total": sum(d["bytes_total"] for d in devices),
+            "samples_total": sum(d["samples_total"] for d in devices),
+            "devices": devices,
+        }
+
+    # =========================================================
+    # ----------------- LOOP THREAD ---------------------------
+    # =========================================================
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        for port, app_state in self.ports:
+            device = SerialDevice(self.loop, app_state, port, self.baudrate, self.protocol)
+            device.on_failure = self._schedule_reconnect
+            self.devices.append(device)
+            self._open(device)
+
+        if self.auto_mode:
+            self._schedule_auto()
+        self._started.set()
+
+        self.loop.run_forever()
+        self.loop.close()
+
+    def _shutdown(self):
+        if self._auto_timer is not None:
+            self._auto_timer.cancel()
+        for device in self.devices:
+            device.close()
+        self._update_connected()
+        self.loop.stop()
+
+    def _open(self, device):
+        if not self.running:
+            return
+        try:
+            device.open()
+        except (serial.SerialException, OSError, ValueError) as e:
+            print(f"Connection error on {device.port_name}:", e)
+            self._schedule_reconnect(device)
+        self._update_connected()
+
+    def _schedule_reconnect(self, device):
+        self._update_connected()
+        if self.running:
+            self.loop.call_later(config.SERIAL_RECONNECT_DELAY, self._open, device)
+
+    def _update_connected(self):
+        for _, app_state in self.ports:
+            connected = any(d.is_open for d in self.devices if d.app_state is app_state)
+            app_state.serial_connected = connected
+            app_state.esp32_connected = connected
+
+    def _write_all(self, data):
+        for device in self.devices:
+            device.write(data)
+
+    # =========================================================
+    # ----------------- AUTO MODE TIMERS ----------------------
+    # =========================================================
+
+    def _schedule_auto(self):
+        """
+        Arms one timer for the next AUTO event: the switch to AUTO after
+        AUTO_TIMEOUT without manual actions, or the next derivation change.
+        """
+        manual = self.app_state.last_manual_action_time
+        due = manual + config.AUTO_TIMEOUT
+        if time.time() > due:
+            due = max(due, self._last_switch + config.AUTO_SWITCH_INTERVAL)
+
+        # Reloj de pared a reloj del loop
+        delay = max(0.05, due - time.time())
+        self._auto_timer = self.loop.call_later(delay, self._on_auto_timer)
+
+    def _on_auto_timer(self):
+        app_state = self.app_state
+        app_state.check_auto_mode()
+
+        now = time.time()
+        if (app_state.settings.operation_mode == config.MODE_AUTO
+                and now - self._last_switch >= config.AUTO_SWITCH_INTERVAL):
+            app_state.next_derivation()
+            self._write_all(f"STATE{app_state.current_mux_state}\n".encode())
+            self._last_switch = now
+
+        self._schedule_auto()
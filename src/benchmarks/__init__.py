@@ -0,0 +1,14 @@
+"""
+Micro-benchmarks for the ECG processing code, one module per topic.
+
+Usage:
+    python -m src.benchmarks            # run all
+    python -m src.benchmarks peaks      # run one
+    python -m src.benchmarks.peaks      # run one module on its own
+    python -m src.benchmarks pipeline --seconds 600 --source serial --json out.json
+
+The pipeline benchmark runs the real acquisition -> AppState -> analysis ->
+plot path headless (Agg canvas, no Tk).
+--json writes every result plus the commit and library versions, so runs
+can be compared across commits.
+"""
@@ -0,0 +1,31 @@
+"""
+Runs every benchmark module: python -m src.benchmarks [NAME ...]
+"""
+
+from . import (
+    peaks,
+    filters,
+    decimation,
+    replay,
+    instrumentation,
+    handoff,
+    pipeline,
+    stream_server,
+    startup,
+    hrv,
+)
+from .common import run
+
+
+BENCHMARKS = {}
+for module in (peaks, filters, decimation, replay, instrumentation, handoff,
+               pipeline, stream_server, startup, hrv):
+    BENCHMARKS.update(module.BENCHMARKS)
+
+
+def main(argv=None):
+    run(BENCHMARKS, argv)
+
+
+if __name__ == "__main__":
+    main()
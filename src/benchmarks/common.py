@@ -0,0 +1,146 @@
+"""
+Helpers shared by the benchmark modules, and the command line every one
+of them runs with (see run()).
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+
+from .. import config
+
+
+# =========================================================
+# ---------------- HELPERS --------------------------------
+# =========================================================
+
+def _best_time(fn, repeat=5):
+    """
+    Best wall time of `repeat` runs (seconds).
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _synthetic_signal(n, fs=config.SAMPLE_RATE, bpm=75, noise=0.05, seed=0):
+    """
+    ECG-like test signal: narrow gaussian QRS per beat plus noise.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(n) / fs
+    phase = (t * bpm / 60.0) % 1.0
+    qrs = 1.2 * np.exp(-((phase - 0.5) ** 2) / 0.0008)
+    t_wave = 0.3 * np.exp(-((phase - 0.75) ** 2) / 0.004)
+    return qrs + t_wave + rng.normal(0, noise, n)
+
+
+
+def _percentiles(values):
+    if not values:
+        return {"count": 0}
+    values = np.asarray(values) * 1e3
+    return {
+        "count": len(values),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "max_ms": float(values.max()),
+    }
+
+
+def _thread_cpu(thread):
+    """
+    CPU seconds used by a thread (Linux /proc), None elsewhere.
+    """
+    native_id = getattr(thread, "native_id", None)
+    try:
+        with open(f"/proc/self/task/{native_id}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+    except (OSError, IndexError):
+        return None
+    utime, stime = int(fields[11]), int(fields[12])
+    return (utime + stime) / os.sysconf("SC_CLK_TCK")
+
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# =========================================================
+# ---------------- COMMAND LINE ---------------------------
+# =========================================================
+
+def _metadata():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    import matplotlib
+    import scipy
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "matplotlib": matplotlib.__version__,
+        "platform": platform.platform(),
+    }
+
+
+def _to_json(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+
+def run(benchmarks, argv=None):
+    """
+    Runs the benchmarks named on the command line (all of `benchmarks`
+    when none is given) and optionally writes the results as JSON.
+    """
+    parser = argparse.ArgumentParser(description="ECG processing benchmarks")
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run: {', '.join(benchmarks)}")
+    parser.add_argument("--json", metavar="FILE", help="write the results as JSON")
+    parser.add_argument("--seconds", type=float, default=30, help="pipeline: run time")
+    parser.add_argument("--source", default="fake", help="pipeline: fake, serial, pty, pty-async or a replay file")
+    parser.add_argument("--fs", type=int, default=config.SAMPLE_RATE, help="pipeline: sample rate")
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.names if name not in benchmarks]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    results = {}
+    for name in args.names or benchmarks:
+        if name == "pipeline":
+            results[name] = benchmarks[name](args.seconds, args.source, args.fs)
+        else:
+            results[name] = benchmarks[name]()
+        print()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"meta": _metadata(), "results": results}, f, indent=2, default=_to_json)
+        print("Results written to", args.json)
@@ -0,0 +1,58 @@
+"""
+Sweep panel frame time vs display window (min/max band decimation).
+
+Usage:
+    python -m src.benchmarks.decimation
+"""
+
+import time
+
+from .. import config
+from .common import run, _synthetic_signal
+
+
+def bench_decimation(windows=(1000, 5000, 15000, 30000), frames=30):
+    """
+    Blitted frame time (Agg, no window) vs display window length,
+    with min/max decimation drawn as a filled band: once decimated, the
+    frame time should not grow with the window.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from ..plot_renderer import SweepPanel, BlitRenderer
+
+    per_tick = max(1, config.SAMPLE_RATE * config.REFRESH_INTERVAL // 1000)
+    signal_data = _synthetic_signal(max(windows) + frames * per_tick)
+
+    print("sweep panel frame time (min/max band)")
+    print(f"{'window':>8} {'bucket':>7} {'points':>7} {'ms/frame':>9}")
+
+    results = []
+    for window in windows:
+        fig, ax = plt.subplots(figsize=(9, 6))
+        panel = SweepPanel(ax, window, 2.0)
+        renderer = BlitRenderer(fig.canvas, [panel])
+
+        renderer.render()
+        t0 = time.perf_counter()
+        for k in range(frames):
+            end = window + k * per_tick
+            panel.update(end, signal_data[max(0, end - panel.width):end], source=0)
+            renderer.render([panel])
+        ms = (time.perf_counter() - t0) * 1e3 / frames
+        plt.close(fig)
+
+        results.append({"window": window, "bucket": panel.bucket, "points": len(panel._x), "ms_per_frame": ms})
+        print(f"{window:>8} {panel.bucket:>7} {len(panel._x):>7} {ms:>9.2f}")
+
+    return results
+
+
+BENCHMARKS = {
+    "decimation": bench_decimation,
+}
+
+
+if __name__ == "__main__":
+    run(BENCHMARKS)
@@ -0,0 +1,51 @@
+"""
+Filter bank throughput: per-sample vs block API.
+
+Usage:
+    python -m src.benchmarks.filters
+"""
+
+import time
+
+from .. import config
+from ..ecg_filters import ECGFilters
+from .common import run, _synthetic_signal
+
+
+def bench_filters(n=50000, block_sizes=(15, 100, 1000, 10000)):
+    """
+    Filter bank throughput (samples/s): per-sample API vs block API.
+    """
+    signal_data = _synthetic_signal(n) + 0.5
+
+    per_sample_n = min(n, 10000)
+    filters = ECGFilters()
+    t0 = time.perf_counter()
+    for value in signal_data[:per_sample_n].tolist():
+        filters.process_sample(value)
+    per_sample_rate = per_sample_n / (time.perf_counter() - t0)
+
+    print(f"ECG filter bank ({len(ECGFilters().sos)} SOS sections)")
+    print(f"{'API':>22} {'samples/s':>14}")
+    print(f"{'process_sample':>22} {per_sample_rate:>14,.0f}")
+
+    results = {"process_sample": per_sample_rate}
+    for block in block_sizes:
+        filters = ECGFilters()
+        t0 = time.perf_counter()
+        for start in range(0, n, block):
+            filters.process_block(signal_data[start:start + block], start // block % config.TOTAL_DERIVATIONS)
+        rate = n / (time.perf_counter() - t0)
+        results[f"process_block_{block}"] = rate
+        print(f"{f'process_block({block})':>22} {rate:>14,.0f}")
+
+    return results
+
+
+BENCHMARKS = {
+    "filters": bench_filters,
+}
+
+
+if __name__ == "__main__":
+    run(BENCHMARKS)
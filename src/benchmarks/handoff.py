@@ -0,0 +1,116 @@
+"""
+Producer stall under reader contention on AppState (locked vs
+lock-free handoff).
+
+Usage:
+    python -m src.benchmarks.handoff
+"""
+
+import time
+import numpy as np
+
+from .. import config
+from .common import run, _synthetic_signal
+
+
+def bench_handoff(seconds=2.0, consumers=2, chunk=20, window=5000):
+    """
+    Producer stall under reader contention: one thread appends 6-lead
+    chunks while `consumers` renderer-like threads read the latest window
+    of every lead.
+
+    Schemes:
+        gil        readers spin on pure Python, never touching AppState
+                   (baseline: interpreter scheduling alone)
+        lock+copy  readers copy while holding data_lock (old GUI behaviour)
+        lock       samples published under data_lock, copies outside it
+        spsc       lock-free handoff (published Progress + ring indices)
+
+    Modes:
+        spin    producer and readers loop flat out: every append may wait
+                for the GIL, up to one switch interval per busy reader, so
+                the tail is the same for every scheme (and for "gil")
+        paced   producer appends every ~1 ms, readers read once per
+                REFRESH_INTERVAL (the GUI's rate): what is left is the
+                handoff itself
+    """
+    import sys
+    import threading
+    from ..data_model import AppState
+
+    block = np.tile(_synthetic_signal(chunk), 6)
+    leads = np.repeat(np.arange(6), chunk)
+    frame = config.REFRESH_INTERVAL / 1000
+
+    def run(scheme, paced):
+        app_state = AppState(lock_free=(scheme == "spsc"))
+        stop = threading.Event()
+        latencies = []
+        reads = [0] * consumers
+
+        def producer():
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                app_state.append_samples(block, leads)
+                latencies.append(time.perf_counter() - t0)
+                if paced:
+                    time.sleep(0.001)
+
+        def consumer(k):
+            while not stop.is_set():
+                if scheme == "gil":
+                    total = 0
+                    for i in range(10000):
+                        total += i
+                elif scheme == "lock+copy":
+                    with app_state.data_lock:
+                        ends = app_state.progress.ends
+                        for lead, end in ends.items():
+                            app_state.lead_raw[lead].latest(window, end).copy()
+                else:
+                    ends = app_state.get_lead_write_indices()
+                    for lead, end in ends.items():
+                        app_state.lead_raw[lead].latest(window, end).copy()
+                reads[k] += 1
+                if paced:
+                    time.sleep(frame)
+
+        threads = [threading.Thread(target=producer)]
+        threads += [threading.Thread(target=consumer, args=(k,)) for k in range(consumers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        lat = np.asarray(latencies) * 1e6
+        return {
+            "appends_per_s": len(lat) / seconds,
+            "samples_per_s": len(lat) * len(block) / seconds,
+            "append_p50_us": float(np.percentile(lat, 50)),
+            "append_p99_us": float(np.percentile(lat, 99)),
+            "append_max_us": float(lat.max()),
+            "reads_per_s": sum(reads) / seconds,
+        }
+
+    print(f"producer/consumer handoff ({consumers} readers, {len(block)} samples per append, "
+          f"GIL switch interval {sys.getswitchinterval() * 1e3:.0f} ms)")
+    print(f"{'mode':>6} {'scheme':>10} {'appends/s':>10} {'p50 us':>8} {'p99 us':>8} {'max us':>9} {'reads/s':>8}")
+    results = {}
+    for mode in ("spin", "paced"):
+        results[mode] = {}
+        for scheme in ("gil", "lock+copy", "lock", "spsc"):
+            r = results[mode][scheme] = run(scheme, mode == "paced")
+            print(f"{mode:>6} {scheme:>10} {r['appends_per_s']:>10.0f} {r['append_p50_us']:>8.1f} "
+                  f"{r['append_p99_us']:>8.1f} {r['append_max_us']:>9.0f} {r['reads_per_s']:>8.0f}")
+    return results
+
+
+BENCHMARKS = {
+    "handoff": bench_handoff,
+}
+
+
+if __name__ == "__main__":
+    run(BENCHMARKS)
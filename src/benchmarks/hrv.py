@@ -0,0 +1,161 @@
+"""
+HRV engine: incremental sliding windows vs recomputing every window
+from history, over a synthetic 24 h RR series.
+
+Usage:
+    python -m src.benchmarks.hrv
+"""
+
+import time
+import numpy as np
+
+from .common import run, _best_time
+
+
+def _synthetic_rr(hours=24, seed=3):
+    """
+    RR series (seconds) with a day/night rate cycle, respiratory and
+    low-frequency modulation, plus injected events: premature beats with
+    their compensatory pause, detection artifacts, one tachycardia and
+    one bradycardia run of 5 min, and isolated pauses.
+
+    Returns:
+        (rr array, {event: count injected})
+    """
+    rng = np.random.default_rng(seed)
+    seconds = hours * 3600.0
+    tachy = (3 * 3600.0, 3 * 3600.0 + 300)
+    brady = (10 * 3600.0, 10 * 3600.0 + 300)
+    pauses = set(np.linspace(3600, seconds - 3600, 5).astype(int))
+
+    rr, t = [], 0.0
+    # Las rachas solo existen si la serie llega a su inicio
+    injected = {"ectopic": 0, "artifacts": 0, "tachycardia": int(tachy[0] < seconds),
+                "bradycardia": int(brady[0] < seconds), "pauses": 0}
+    while t < seconds:
+        base = 0.85 + 0.15 * np.sin(2 * np.pi * t / 86400.0)
+        value = (base + 0.04 * np.sin(2 * np.pi * 0.25 * t)
+                 + 0.03 * np.sin(2 * np.pi * 0.1 * t) + rng.normal(0, 0.015))
+        if tachy[0] <= t < tachy[1]:
+            value = 0.46 + rng.normal(0, 0.01)
+        elif brady[0] <= t < brady[1]:
+            value = 1.43 + rng.normal(0, 0.02)
+
+        minute = int(t)
+        if minute in pauses:
+            pauses.discard(minute)
+            beats = [2.6]
+            injected["pauses"] += 1
+        elif rng.random() < 0.005:
+            # Extrasístole + pausa compensadora
+            beats = [0.6 * value, 1.4 * value]
+            injected["ectopic"] += 2
+        elif rng.random() < 0.0005:
+            # Pico espurio: un RR se parte en dos
+            beats = [0.1, value - 0.1]
+            injected["artifacts"] += 1
+        else:
+            beats = [value]
+
+        rr.extend(beats)
+        t += sum(beats)
+    return np.array(rr), injected
+
+
+def _recompute_window(nn_times, nn, diffs, now, seconds):
+    """
+    Reference: window statistics recomputed from the whole NN history.
+    """
+    first = np.searchsorted(nn_times, now - seconds, side="right")
+    window, d = nn[first:], diffs[first:]
+    d = d[~np.isnan(d)]
+    return {
+        "sdnn_ms": 1e3 * window.std(ddof=1) if len(window) > 1 else 0.0,
+        "rmssd_ms": 1e3 * np.sqrt(np.mean(d * d)) if len(d) else 0.0,
+        "pnn50": 100.0 * np.mean(np.abs(d) > 0.05) if len(d) else 0.0,
+    }
+
+
+def bench_hrv(hours=24, checks=2000):
+    """
+    HRVEngine on a synthetic 24 h RR series: cost per beat of the
+    incremental windows vs recomputing them from history, largest
+    difference between both, and detected vs injected events.
+    """
+    from ..hrv import HRVEngine, NORMAL
+
+    rr, injected = _synthetic_rr(hours)
+    times = np.cumsum(rr)
+    rr_list, times_list = rr.tolist(), times.tolist()
+
+    def run():
+        engine = HRVEngine()
+        for value, t in zip(rr_list, times_list):
+            engine.add_rr(value, t)
+        return engine
+
+    incremental = _best_time(run, 3)
+    engine = run()
+
+    # Segunda pasada: en `checks` latidos se compara con el recálculo completo
+    check_at = set(np.linspace(len(rr) // 10, len(rr) - 1, checks).astype(int).tolist())
+    shadow = HRVEngine()
+    probe = shadow.windows[min(shadow.windows)]
+    nn_times, nn, diffs = [], [], []
+    max_error = dict.fromkeys(("sdnn_ms", "rmssd_ms", "pnn50"), 0.0)
+    recompute = 0.0
+    for i, (value, t) in enumerate(zip(rr_list, times_list)):
+        if shadow.add_rr(value, t) == NORMAL:
+            _, nn_value, diff = probe.items[-1]
+            nn_times.append(t)
+            nn.append(nn_value)
+            diffs.append(np.nan if diff is None else diff)
+        if i in check_at:
+            arrays = np.array(nn_times), np.array(nn), np.array(diffs)
+            t0 = time.perf_counter()
+            for seconds, window in shadow.windows.items():
+                expected = _recompute_window(*arrays, t, seconds)
+                got = window.metrics()
+                for key in max_error:
+                    max_error[key] = max(max_error[key], abs(got[key] - expected[key]))
+            recompute += time.perf_counter() - t0
+
+    summary = engine.summary()
+    result = {
+        "hours": hours,
+        "beats": len(rr),
+        "incremental_us_per_beat": 1e6 * incremental / len(rr),
+        "recompute_us_per_beat": 1e6 * recompute / len(check_at),
+        "max_abs_error": max_error,
+        "detected": {
+            "ectopic": summary["ectopic"],
+            "artifacts": summary["artifacts"],
+            "tachycardia": summary["episodes"]["TACHYCARDIA"],
+            "bradycardia": summary["episodes"]["BRADYCARDIA"],
+            "pauses": summary["episodes"]["PAUSE"],
+        },
+        "injected": injected,
+        "windows": summary["windows"],
+    }
+
+    print(f"hrv ({hours} h synthetic RR, {len(rr)} beats, windows {', '.join(str(w) for w in engine.windows)} s)")
+    print(f"  incremental  {result['incremental_us_per_beat']:.2f} us/beat "
+          f"({1e3 * incremental:.0f} ms for the whole series)")
+    print(f"  recompute    {result['recompute_us_per_beat']:.2f} us/beat")
+    print("  max error    " + ", ".join(f"{k} {v:.2e}" for k, v in max_error.items()))
+    print(f"  {'event':<12} {'injected':>9} {'detected':>9}")
+    for key, count in injected.items():
+        print(f"  {key:<12} {count:>9} {result['detected'][key]:>9}")
+    for seconds, metrics in summary["windows"].items():
+        print(f"  {seconds:>5} s      SDNN {metrics['sdnn_ms']:.1f} ms, RMSSD {metrics['rmssd_ms']:.1f} ms, "
+              f"pNN50 {metrics['pnn50']:.1f}%, HR {metrics['mean_hr']:.0f}")
+    return result
+
+
+BENCHMARKS = {
+    "hrv": bench_hrv,
+}
+
+
+if __name__ == "__main__":
+    run(BENCHMARKS)
@@ -0,0 +1,53 @@
+"""
+Cost per call of the instrumentation entry points.
+
+Usage:
+    python -m src.benchmarks.instrumentation
+"""
+
+from .common import run, _best_time
+
+
+def bench_instrumentation(calls=200000):
+    """
+    Cost per call of the instrumentation entry points, disabled vs enabled.
+    """
+    import threading
+    from ..instrumentation import Instrumentation
+
+    def run(perf):
+        lock = perf.instrument_lock(threading.Lock(), "lock")
+
+        def timer():
+            for _ in range(calls):
+                with perf.timer("stage"):
+                    pass
+
+        def record():
+            for _ in range(calls):
+                perf.record("stage", 1e-6)
+
+        def locked():
+            for _ in range(calls):
+                with lock:
+                    pass
+
+        return {name: 1e9 * _best_time(fn, 3) / calls
+                for name, fn in (("timer", timer), ("record", record), ("lock", locked))}
+
+    results = {"disabled": run(Instrumentation(False)), "enabled": run(Instrumentation(True))}
+
+    print("instrumentation cost (ns per call)")
+    print(f"{'':>10} {'timer':>8} {'record':>8} {'lock':>8}")
+    for state, costs in results.items():
+        print(f"{state:>10} {costs['timer']:>8.0f} {costs['record']:>8.0f} {costs['lock']:>8.0f}")
+    return results
+
+
+BENCHMARKS = {
+    "instrumentation": bench_instrumentation,
+}
+
+
+if __name__ == "__main__":
+    run(BENCHMARKS)
@@ -0,0 +1,125 @@
+"""
+Peak detection: vectorized vs loop detect_r_peaks, streaming vs
+rescanning detector per GUI tick, and the Pan-Tompkins engine.
+
+Usage:
+    python -m src.benchmarks.peaks
+"""
+
+import time
+
+from .. import config
+from ..peak_detection import (
+    detect_r_peaks,
+    _detect_r_peaks_loop,
+    StreamingPeakDetector,
+    PanTompkinsDetector,
+)
+from .common import run, _best_time, _synthetic_signal
+
+
+def bench_peak_detection(sizes=(1000, 5000, 50000)):
+    """
+    detect_r_peaks vs the reference loop (equivalence is covered by
+    tests/test_peak_detection.py).
+    """
+    results = []
+    for n in sizes:
+        signal_data = _synthetic_signal(n)
+        as_list = list(signal_data)
+        threshold = config.DEFAULT_R_THRESHOLD
+        distance = config.DEFAULT_R_DISTANCE
+
+        t_loop = _best_time(lambda: _detect_r_peaks_loop(as_list, threshold, distance))
+        t_vec = _best_time(lambda: detect_r_peaks(signal_data, threshold, distance))
+
+        results.append({
+            "samples": n,
+            "loop_ms": t_loop * 1e3,
+            "vectorized_ms": t_vec * 1e3,
+            "speedup": t_loop / t_vec,
+        })
+
+    print("detect_r_peaks")
+    print(f"{'samples':>10} {'loop ms':>10} {'numpy ms':>10} {'speedup':>9}")
+    for r in results:
+        print(f"{r['samples']:>10} {r['loop_ms']:>10.3f} {r['vectorized_ms']:>10.3f} {r['speedup']:>8.1f}x")
+
+    return results
+
+
+def bench_streaming_peaks(window=config.DEFAULT_WINDOW_SIZE, ticks=2000):
+    """
+    Per-GUI-tick cost: rescanning the whole window vs feeding only the
+    samples that arrived during one refresh interval (equivalence is
+    covered by tests/test_peak_detection.py).
+    """
+    per_tick = max(1, config.SAMPLE_RATE * config.REFRESH_INTERVAL // 1000)
+    signal_data = _synthetic_signal(window + ticks * per_tick)
+    threshold = config.DEFAULT_R_THRESHOLD
+    distance = config.DEFAULT_R_DISTANCE
+
+    def rescan():
+        for k in range(ticks):
+            end = window + k * per_tick
+            detect_r_peaks(signal_data[end - window:end], threshold, distance)
+
+    def streaming():
+        detector = StreamingPeakDetector(threshold, distance)
+        detector.feed(signal_data[:window], 0)
+        for k in range(ticks):
+            start = window + k * per_tick
+            detector.feed(signal_data[start:start + per_tick], start)
+
+    t_rescan = _best_time(rescan, repeat=3) / ticks
+    t_stream = _best_time(streaming, repeat=3) / ticks
+
+    print("streaming peak detection")
+    print(f"window={window} samples, {per_tick} new samples per tick")
+    print(f"  rescan window : {t_rescan * 1e6:8.1f} us/tick")
+    print(f"  streaming     : {t_stream * 1e6:8.1f} us/tick")
+
+    return {
+        "window": window,
+        "new_per_tick": per_tick,
+        "rescan_us": t_rescan * 1e6,
+        "streaming_us": t_stream * 1e6,
+    }
+
+
+def bench_pan_tompkins(seconds=120, chunk_sizes=(15, 100, 500)):
+    """
+    CPU time per second of signal for the streaming Pan-Tompkins engine
+    (one lead), fed in GUI-tick sized and larger chunks.
+    """
+    fs = config.SAMPLE_RATE
+    signal_data = _synthetic_signal(seconds * fs)
+
+    print(f"Pan-Tompkins streaming, {seconds} s of signal at {fs} Hz")
+    print(f"{'chunk':>8} {'cpu ms / s signal':>18} {'x real time':>12} {'beats':>6}")
+
+    results = []
+    for chunk in chunk_sizes:
+        detector = PanTompkinsDetector(fs=fs)
+        beats = 0
+        t0 = time.process_time()
+        for start in range(0, len(signal_data), chunk):
+            beats += len(detector.feed(signal_data[start:start + chunk], start))
+        cpu = time.process_time() - t0
+
+        ms_per_s = cpu * 1e3 / seconds
+        results.append({"chunk": chunk, "cpu_ms_per_s": ms_per_s, "beats": beats})
+        print(f"{chunk:>8} {ms_per_s:>18.3f} {1e3 / ms_per_s if ms_per_s else float('inf'):>11.0f}x {beats:>6}")
+
+    return results
+
+
+BENCHMARKS = {
+    "peaks": bench_peak_detection,
+    "streaming": bench_streaming_peaks,
+    "pan_tompkins": bench_pan_tompkins,
+}
+
+
+if __name__ == "__main__":
+    run(BENCHMARKS)
@@ -0,0 +1,243 @@
+"""
+End to end: acquisition -> AppState -> analysis -> plot path headless
+(Agg canvas, no Tk), fed by the fake reader, a loopback serial port, a
+pty device or a replay file.
+
+Usage:
+    python -m src.benchmarks.pipeline --seconds 600 --source serial --json out.json
+"""
+
+import time
+import numpy as np
+
+from .. import config
+from .common import run, _percentiles, _thread_cpu, _rss_bytes
+
+
+class _LoopbackPort:
+    """
+    Serial-port stand-in for SerialReader: binary frames of the synthetic
+    6-lead signal, produced at the real sample rate.
+    """
+
+    def __init__(self, fs, block_seconds=0.02):
+        from ..fake_serial import FakeSerialReader
+        self.generator = FakeSerialReader(None, fs=fs, seed=0)
+        self.fs = fs
+        self.block_seconds = block_seconds
+        self.is_open = True
+        self._pending = b""
+        self._seq = 0
+        self._start = time.monotonic()
+
+    @property
+    def in_waiting(self):
+        return len(self._pending)
+
+    def _produce(self):
+        from ..packet_protocol import encode_block
+
+        k = config.FRAME_SAMPLES
+        owed = int((time.monotonic() - self._start) * self.fs) - self.generator.produced
+        owed -= owed % k
+        if owed <= 0:
+            return False
+
+        data, self._seq = encode_block(self._seq, self.generator.generate(owed))
+        self._pending += data
+        return True
+
+    def read(self, size=1):
+        while self.is_open and not self._pending:
+            if not self._produce():
+                time.sleep(self.block_seconds)
+        data, self._pending = self._pending[:size], self._pending[size:]
+        return data
+
+    def write(self, data):
+        return len(data)
+
+    def close(self):
+        self.is_open = False
+
+
+def bench_pipeline(seconds=30, source="fake", fs=config.SAMPLE_RATE, speed=1.0, show_all=True):
+    """
+    Acquisition -> AppState -> analysis -> plot update, headless.
+
+    source: "fake" (FakeSerialReader), "serial" (SerialReader decoding
+    binary frames from a loopback port), "pty" / "pty-async" (SerialReader /
+    AsyncSerialReader reading a pty_device.PtyDevice) or a file for
+    ReplayReader.
+    Reports sustained samples/s, CPU per thread and per analysis stage,
+    GUI frame time percentiles and memory (RSS) growth.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from ..data_model import AppState
+    from ..analysis import AnalysisWorker
+    from ..rhythm_monitor import RhythmMonitor
+    from ..plot_renderer import ECGPlotView
+
+    app_state = AppState()
+
+    if source == "fake":
+        from ..fake_serial import FakeSerialReader
+        reader = FakeSerialReader(app_state, fs=fs, seed=0)
+    elif source == "serial":
+        from ..serial_handler import SerialReader
+        reader = SerialReader(app_state)
+        reader.protocol = "BINARY"
+        reader.serial_port = _LoopbackPort(fs)
+    elif source in ("pty", "pty-async"):
+        # Lectores reales sobre un pty: mismo camino que con el ESP32
+        import serial
+        from ..pty_device import PtyDevice
+        device = PtyDevice(fs).start()
+        if source == "pty-async":
+            from ..async_serial import AsyncSerialReader
+            reader = AsyncSerialReader(app_state, [device.port], protocol="BINARY", auto_mode=False)
+        else:
+            from ..serial_handler import SerialReader
+            reader = SerialReader(app_state)
+            reader.protocol = "BINARY"
+            reader.serial_port = serial.Serial(device.port, timeout=config.SERIAL_TIMEOUT)
+    else:
+        from ..replay import ReplayReader
+        reader = ReplayReader(app_state, source, speed)
+        fs = reader.source.sample_rate
+
+    monitor = RhythmMonitor(reader)
+    analysis = AnalysisWorker(app_state, rhythm_monitor=monitor)
+
+    fig = plt.figure(figsize=(9, 6))
+    view = ECGPlotView(fig.canvas, app_state.mux_state_label)
+    settings = app_state.settings
+    win, y_max, gain = settings.window_size, settings.y_max, settings.ecg_gain
+    view.build(show_all, app_state.current_mux_state, win, y_max)
+    settings_version = None
+    last_frame = None
+
+    rss_start = _rss_bytes()
+    cpu_start = time.process_time()
+    gui_cpu_start = time.thread_time()
+
+    monitor.start()
+    analysis.start()
+    reader.start()
+    reader_thread = getattr(reader, "thread", reader)
+
+    tick = config.REFRESH_INTERVAL / 1000
+    tick_times, render_times, rss = [], [], []
+    t_start = time.perf_counter()
+    next_tick = t_start
+    next_rss = t_start
+
+    while True:
+        now = time.perf_counter()
+        if now - t_start >= seconds:
+            break
+
+        # Same work as ECGApp.update_gui, without Tk widgets
+        t0 = time.perf_counter()
+        settings = app_state.settings
+        if settings.version != settings_version:
+            analysis.set_params(gain=gain, window=win)
+            settings_version = settings.version
+        snapshot = analysis.latest
+        if snapshot is not None:
+            frame_key = (snapshot.version, app_state.current_mux_state)
+            if frame_key != last_frame or view.renderer.needs_full_redraw:
+                last_frame = frame_key
+                view.render_snapshot(snapshot, app_state.get_lead_signal,
+                                     app_state.current_mux_state, win, y_max, gain)
+                render_times.append(time.perf_counter() - t0)
+        tick_times.append(time.perf_counter() - t0)
+
+        if now >= next_rss:
+            rss.append((now - t_start, _rss_bytes()))
+            next_rss += 1.0
+
+        next_tick += tick
+        time.sleep(max(0.0, next_tick - time.perf_counter()))
+
+    elapsed = time.perf_counter() - t_start
+    cpu = {
+        "process": time.process_time() - cpu_start,
+        "gui": time.thread_time() - gui_cpu_start,
+        "reader": _thread_cpu(reader_thread),
+        "analysis": _thread_cpu(analysis),
+        "monitor": _thread_cpu(monitor),
+    }
+
+    reader.stop()
+    analysis.stop()
+    monitor.stop()
+    plt.close(fig)
+    if source in ("pty", "pty-async"):
+        device.stop()
+
+    ends = app_state.get_lead_write_indices()
+    analysed = sum(analysis.processed_index.values())
+    metrics = analysis.metrics()
+
+    times = np.array([t for t, _ in rss])
+    sizes = np.array([b for _, b in rss]) / 1e6
+    # Pendiente tras el primer cuarto (arranque y cachés excluidos)
+    steady = times >= times[-1] / 4 if len(times) else times
+    growth = float(np.polyfit(times[steady], sizes[steady], 1)[0] * 60) if steady.sum() >= 2 else 0.0
+
+    result = {
+        "source": source,
+        "sample_rate": fs,
+        "seconds": elapsed,
+        "samples": app_state.sample_count,
+        "samples_per_s": app_state.sample_count / elapsed,
+        "analysed_samples": analysed,
+        "lag_samples": sum(ends.values()) - analysed,
+        "dropped_samples": metrics["dropped_samples"],
+        "max_queue_depth": metrics["max_queue_depth"],
+        "cpu_seconds": cpu,
+        "stage_seconds": dict(analysis.stage_totals),
+        "analysis_passes": analysis.passes,
+        "cache": {key: metrics[key] for key in ("cache_hits", "cache_misses", "cache_evictions")},
+        "frame_time": _percentiles(render_times),
+        "tick_time": _percentiles(tick_times),
+        "fps": len(render_times) / elapsed,
+        "memory": {
+            "rss_start_mb": rss_start / 1e6,
+            "rss_end_mb": float(sizes[-1]) if len(sizes) else rss_start / 1e6,
+            "rss_max_mb": float(sizes.max()) if len(sizes) else rss_start / 1e6,
+            "growth_mb_per_min": growth,
+        },
+        "rhythm": {
+            "beat_latency": monitor.beat_latency.summary(),
+            "pace_latency": monitor.pace_latency.summary(),
+        },
+    }
+
+    frames = result["frame_time"]
+    print(f"pipeline ({source}, {fs} Hz, {elapsed:.0f} s)")
+    print(f"  samples/s    {result['samples_per_s']:.0f} (lag {result['lag_samples']}, dropped {result['dropped_samples']})")
+    print("  cpu s        " + ", ".join(
+        f"{name} {value:.2f}" for name, value in cpu.items() if value is not None))
+    print("  stages s     " + ", ".join(f"{k} {v:.2f}" for k, v in result["stage_seconds"].items()))
+    print(f"  cache        {metrics['cache_hits']} hits, {metrics['cache_misses']} misses "
+          f"({100 * metrics['cache_hit_rate']:.0f}%), {analysis.passes} passes, "
+          f"{analysis.latest.version if analysis.latest else 0} snapshots")
+    if frames["count"]:
+        print(f"  frame ms     p50 {frames['p50_ms']:.1f} | p95 {frames['p95_ms']:.1f} | "
+              f"p99 {frames['p99_ms']:.1f} | max {frames['max_ms']:.1f} ({result['fps']:.0f} fps)")
+    print(f"  rss MB       {result['memory']['rss_start_mb']:.0f} -> {result['memory']['rss_end_mb']:.0f} "
+          f"({growth:+.2f} MB/min)")
+    return result
+
+
+BENCHMARKS = {
+    "pipeline": bench_pipeline,
+}
+
+
+if __name__ == "__main__":
+    run(BENCHMARKS)
@@ -0,0 +1,69 @@
+"""
+Replay throughput at maximum speed, analysis included.
+
+Usage:
+    python -m src.benchmarks.replay
+"""
+
+import time
+import numpy as np
+
+from .. import config
+from .common import run, _synthetic_signal
+
+
+def bench_replay(seconds=600, path=None):
+    """
+    Whole-pipeline throughput: a recording (or a synthetic 6-lead one)
+    replayed as fast as the analysis worker keeps up.
+    """
+    from ..data_model import AppState
+    from ..analysis import AnalysisWorker
+    from ..replay import ReplayReader, FrameSource
+
+    if path is None:
+        base = _synthetic_signal(seconds * config.SAMPLE_RATE)
+        frames = np.column_stack([base * g for g in (1.0, 1.3, 0.3, -1.1, 0.35, 0.8)])
+        source = FrameSource("synthetic", frames, range(6), config.SAMPLE_RATE)
+    else:
+        source = path
+
+    app_state = AppState()
+    analysis = AnalysisWorker(app_state)
+    reader = ReplayReader(app_state, source, speed=None, analysis=analysis)
+
+    analysis.start()
+    reader.start()
+    reader.finished.wait()
+
+    # Tiempo hasta que el worker termina la cola
+    ends = app_state.get_lead_write_indices()
+    while any(analysis.processed_index[lead] < ends[lead] for lead in ends):
+        time.sleep(0.001)
+    total = time.perf_counter() - reader.start_time
+    analysis.stop()
+
+    stats = reader.stats()
+    metrics = analysis.metrics()
+    result = {
+        "samples": stats["samples"],
+        "seconds": total,
+        "samples_per_s": stats["samples"] / total,
+        "x_real_time": reader.duration() / total,
+        "dropped_samples": metrics["dropped_samples"],
+        "pass_ms": metrics.get("total_ms", 0.0),
+    }
+    print("replay throughput (max speed, analysis included)")
+    print(f"{result['samples']} samples in {total:.2f} s: "
+          f"{result['samples_per_s'] / 1e3:.0f} k samples/s, "
+          f"{result['x_real_time']:.0f}x real time, dropped {result['dropped_samples']}")
+    return result
+
+
+BENCHMARKS = {
+    "replay": bench_replay,
+}
+
+
+if __name__ == "__main__":
+    run(BENCHMARKS)
@@ -0,0 +1,81 @@
+"""
+Interpreter start + import time of the headless and GUI entry points.
+
+Usage:
+    python -m src.benchmarks.startup
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+from .common import run
+
+
+STARTUP_PATHS = {
+    "headless": "import src.headless",
+    "gui": "import src.appUI",
+}
+
+
+def _import_times(code):
+    """
+    Runs `code` in a fresh interpreter with -X importtime.
+
+    Returns:
+        (wall seconds, import seconds, {root package: self seconds})
+    """
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=root, capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - t0
+
+    total = 0.0
+    packages = {}
+    for line in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        if not name[1:].startswith(" "):           # import de primer nivel
+            total += int(cumulative) / 1e6
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0.0) + int(own) / 1e6
+    return wall, total, packages
+
+
+def bench_startup(repeat=5, top=8):
+    """
+    Interpreter start + imports of the headless and GUI entry points
+    (python -X importtime, best of `repeat` fresh processes): import time
+    per top-level package and whether Tk / matplotlib were loaded.
+    """
+    result = {}
+    for path, code in STARTUP_PATHS.items():
+        runs = [_import_times(code) for _ in range(repeat)]
+        wall, total, packages = min(runs, key=lambda run: run[0])
+        slowest = sorted(packages.items(), key=lambda item: -item[1])[:top]
+        result[path] = {
+            "wall_s": wall,
+            "import_s": total,
+            "packages_s": dict(slowest),
+            "tkinter": "tkinter" in packages or "_tkinter" in packages,
+            "matplotlib": "matplotlib" in packages,
+        }
+
+        print(f"startup {path:9s} {1e3 * wall:6.0f} ms wall, {1e3 * total:6.0f} ms imports "
+              f"(tkinter {result[path]['tkinter']}, matplotlib {result[path]['matplotlib']})")
+        for name, seconds in slowest:
+            print(f"    {name:20s} {1e3 * seconds:6.1f} ms")
+    return result
+
+
+BENCHMARKS = {
+    "startup": bench_startup,
+}
+
+
+if __name__ == "__main__":
+    run(BENCHMARKS)
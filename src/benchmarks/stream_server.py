@@ -0,0 +1,119 @@
+"""
+Stream server throughput with concurrent clients and one stalled client.
+
+Usage:
+    python -m src.benchmarks.stream_server
+"""
+
+import time
+
+from .common import run
+
+
+def bench_stream_server(seconds=10.0, clients=8, fs=2000, decimations=(1, 4, 10), high_water=64 * 1024):
+    """
+    Headless server -> loopback TCP clients: FakeSerialReader at `fs`,
+    `clients` readers with mixed decimation plus one client that never
+    reads (backpressure). Reports received values/s, gaps per client and
+    what the stalled client cost (throttled ticks, dropped samples).
+    """
+    import socket
+    import threading
+    from ..data_model import AppState
+    from ..analysis import AnalysisWorker
+    from ..rhythm_monitor import RhythmMonitor
+    from ..fake_serial import FakeSerialReader
+    from ..stream_server import StreamServer, StreamClient, SAMPLES
+
+    app_state = AppState()
+    reader = FakeSerialReader(app_state, fs=fs, seed=0)
+    monitor = RhythmMonitor(reader)
+    analysis = AnalysisWorker(app_state, rhythm_monitor=monitor)
+    server = StreamServer(app_state, analysis, monitor, "127.0.0.1", 0,
+                          sample_rate=fs, high_water=high_water)
+
+    monitor.start()
+    analysis.start()
+    reader.start()
+    server.start()
+
+    results = [None] * clients
+    stop = threading.Event()
+
+    def consume(k):
+        decimation = decimations[k % len(decimations)]
+        client = StreamClient("127.0.0.1", server.port, decimation)
+        values, covered, gaps, ends = 0, 0, 0, {}
+        while not stop.is_set():
+            message = client.read_message()
+            if message is None:
+                break
+            kind, lead, value = message
+            if kind == SAMPLES:
+                start, d, data = value
+                n = len(data) if d == 1 else len(data) // 2 * d
+                if lead in ends and start != ends[lead]:
+                    gaps += 1
+                ends[lead] = start + n
+                values += len(data)
+                covered += n
+        client.close()
+        results[k] = {"decimation": decimation, "values": values, "samples": covered, "gaps": gaps}
+
+    # Cliente que se conecta y nunca lee: ventana TCP mínima, se llena enseguida
+    stalled = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    stalled.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    stalled.connect(("127.0.0.1", server.port))
+    stalled.sendall(b'{"decimation": 1}\n')
+
+    threads = [threading.Thread(target=consume, args=(k,)) for k in range(clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    stats = server.stats()
+    produced = app_state.sample_count
+
+    server.stop()
+    for thread in threads:
+        thread.join()
+    stalled.close()
+    reader.stop()
+    analysis.stop()
+    monitor.stop()
+
+    slow = max(stats["clients"], key=lambda c: c["throttled_ticks"])
+    result = {
+        "sample_rate": fs,
+        "seconds": seconds,
+        "produced_samples": produced,
+        "clients": results,
+        "values_per_s": sum(r["values"] for r in results) / seconds,
+        "bytes_per_s": sum(c["bytes_sent"] for c in stats["clients"]) / seconds,
+        "tick_ms": stats["tick_ms"],
+        "stalled_client": {
+            "throttled_ticks": slow["throttled_ticks"],
+            "dropped_samples": slow["dropped_samples"],
+            "backlog_bytes": slow["backlog"],
+        },
+    }
+
+    print(f"stream server ({clients} clients + 1 stalled, 6 x {fs} Hz, {seconds:.0f} s)")
+    print(f"  produced     {produced / seconds:.0f} samples/s")
+    for k, r in enumerate(results):
+        print(f"  client {k}     /{r['decimation']:<3} {r['samples'] / seconds:8.0f} samples/s "
+              f"({r['values'] / seconds:.0f} values/s), gaps {r['gaps']}")
+    print(f"  total        {result['values_per_s']:.0f} values/s, {result['bytes_per_s'] / 1e6:.2f} MB/s, "
+          f"tick {result['tick_ms']:.2f} ms")
+    print(f"  stalled      throttled {slow['throttled_ticks']} ticks, dropped {slow['dropped_samples']}, "
+          f"backlog {slow['backlog'] / 1e3:.0f} kB")
+    return result
+
+
+BENCHMARKS = {
+    "server": bench_stream_server,
+}
+
+
+if __name__ == "__main__":
+    run(BENCHMARKS)
@@ -18,6 +18,28 @@ BAUDRATE = 115200
 # Timeout de lectura serial (segundos)
 SERIAL_TIMEOUT = 1
 
+# Lector serie:
+#   "thread"  -> SerialReader (hilo con lecturas bloqueantes)
+#   "asyncio" -> AsyncSerialReader (un event loop para todos los puertos)
+SERIAL_BACKEND = "thread"
+
+# Puertos que abre el backend asyncio (uno o varios dispositivos)
+SERIAL_PORTS = [SERIAL_PORT]
+
+# Espera antes de reabrir un puerto que falló (segundos)
+SERIAL_RECONNECT_DELAY = 2.0
+
+# Protocolo del enlace ESP32:
+#   "ASCII"  -> un valor por línea (firmware antiguo)
+#   "BINARY" -> tramas binarias con CRC (ver packet_protocol.py)
+SERIAL_PROTOCOL = "ASCII"
+
+# Muestras int16 por trama binaria
+FRAME_SAMPLES = 10
+
+# Voltios por LSB de las muestras int16 (el firmware envía mV)
+FRAME_SAMPLE_SCALE = 0.001
+
 
 # =========================================================
 # ---------------- SAMPLING CONFIG ------------------------
@@ -30,8 +52,30 @@ SAMPLE_RATE = 500
 # Intervalo de actualización de la GUI (ms)
 REFRESH_INTERVAL = 30
 
-# Tamaño máximo del buffer circular
-MAX_BUFFER_SIZE = 5000
+# Tamaño máximo del buffer circular (60 s a 500 Hz, por derivación)
+MAX_BUFFER_SIZE = 30000
+
+# Entrega de muestras sin lock (un productor / un consumidor por buffer).
+# False: el hilo serial publica bajo AppState.data_lock
+LOCK_FREE_HANDOFF = True
+
+
+# =========================================================
+# ---------------- FILTER CONFIG --------------------------
+# =========================================================
+
+# Pasa-altos para eliminar la línea base (Hz)
+FILTER_HIGHPASS_HZ = 0.5
+
+# Frecuencia de red para el notch (60 Hz en Colombia, 50 Hz en Europa)
+FILTER_NOTCH_HZ = 60.0
+FILTER_NOTCH_Q = 30.0
+
+# Pasa-bajos (Hz)
+FILTER_LOWPASS_HZ = 40.0
+
+# Mostrar / detectar sobre la señal filtrada en vez de la cruda
+USE_FILTERED_SIGNAL = True
 
 
 # =========================================================
@@ -73,6 +117,111 @@ DEFAULT_R_THRESHOLD = 0.8
 # Distancia mínima entre picos R (samples)
 DEFAULT_R_DISTANCE = 200
 
+# Motor de detección R:
+#   "THRESHOLD"    -> umbral fijo + máximo local (StreamingPeakDetector)
+#   "PAN_TOMPKINS" -> umbrales adaptativos (PanTompkinsDetector)
+PEAK_DETECTOR = "THRESHOLD"
+
+# Resultados por derivación (picos, BPM, ciclo) guardados por el análisis;
+# una derivación sin muestras nuevas reutiliza los suyos
+ANALYSIS_CACHE_SIZE = 64
+
+
+# =========================================================
+# ---------------- RECORDING CONFIG -----------------------
+# =========================================================
+
+# Carpeta de las sesiones grabadas
+RECORDING_DIR = "recordings"
+
+# Espacio preasignado en cada crecimiento del archivo (segundos de señal)
+RECORDING_PREALLOC_SECONDS = 3600
+
+# Escritura a disco en bloques: cada N registros o cada T segundos
+RECORDING_BLOCK_RECORDS = 65536
+RECORDING_FLUSH_INTERVAL = 1.0
+
+# Entrada de tiempo -> registro en el índice cada N segundos
+RECORDING_INDEX_INTERVAL = 1.0
+
+
+# =========================================================
+# ---------------- PACEMAKER CONFIG -----------------------
+# =========================================================
+
+# Enviar realmente el comando de estimulación al ESP32
+# (si es False el monitor solo registra las decisiones)
+ENABLE_PACING = False
+
+# Comando enviado al ESP32 para estimular
+PACE_COMMAND = "PACE"
+
+# Frecuencia mínima: intervalo de escape = 60 / PACING_MIN_BPM segundos
+PACING_MIN_BPM = 50
+
+# Sin latido durante más de este tiempo → asistolia (segundos)
+ASYSTOLE_INTERVAL = 2.0
+
+# Periodo refractario entre latidos (segundos)
+BEAT_REFRACTORY = 0.2
+
+# Sin muestras durante este tiempo → señal perdida, no se estimula (segundos)
+SIGNAL_LOSS_TIMEOUT = 0.5
+
+
+# =========================================================
+# ---------------- HRV / RHYTHM ANALYTICS -----------------
+# =========================================================
+
+# Ventanas deslizantes de SDNN / RMSSD / pNN50 (segundos): 1, 5 y 60 min
+HRV_WINDOWS = (60, 300, 3600)
+
+# Ventana mostrada en la GUI
+HRV_DISPLAY_WINDOW = 300
+
+# RR fisiológicamente posibles (segundos); fuera de rango = artefacto
+HRV_MIN_RR = 0.25
+HRV_MAX_RR = 3.0
+
+# Latido ectópico: RR que se aparta más de esta fracción de la referencia
+HRV_ECTOPIC_TOLERANCE = 0.2
+
+# Tras tantos RR rechazados seguidos se acepta el nuevo ritmo como referencia
+HRV_REFERENCE_RESET_BEATS = 8
+
+# Episodios: taquicardia / bradicardia sostenidas durante N latidos,
+# pausa = un RR mayor que HRV_PAUSE_RR (segundos)
+HRV_TACHY_BPM = 100
+HRV_BRADY_BPM = 50
+HRV_EPISODE_BEATS = 4
+HRV_PAUSE_RR = 2.0
+
+
+# =========================================================
+# ---------------- STREAMING SERVER -----------------------
+# =========================================================
+
+# Modo sin pantalla (main.py --headless): muestras y eventos por TCP
+STREAM_HOST = "127.0.0.1"       # "0.0.0.0" para aceptar visores remotos
+STREAM_PORT = 8765
+
+# Cada cuánto se envía un lote a los clientes (segundos)
+STREAM_INTERVAL = 0.04
+
+# Bytes pendientes por cliente a partir de los cuales no se le envían
+# más muestras (cliente lento o red saturada)
+STREAM_CLIENT_HIGH_WATER = 1 << 20
+
+# Buffer de envío del socket por cliente: pequeño para que un visor
+# lento se note enseguida en vez de acumular segundos en el kernel
+STREAM_SOCKET_SNDBUF = 128 * 1024
+
+# Retraso máximo de un cliente; si lo supera salta al presente (segundos)
+STREAM_MAX_LAG = 2.0
+
+# Estado del ritmo enviado al menos cada tanto (segundos)
+STREAM_STATUS_INTERVAL = 1.0
+
 
 # =========================================================
 # ---------------- SYSTEM MODES ---------------------------
@@ -90,3 +239,11 @@ AUTO_SWITCH_INTERVAL = 5   # cada cuántos segundos cambia derivada en AUTO
 
 ENABLE_DEBUG_PRINTS = False
 
+
+# Instrumentación (temporizadores, tiempos de lock, backlog serial).
+# Desactivada no cuesta casi nada; también se activa con main.py --perf
+ENABLE_INSTRUMENTATION = False
+
+# Volcado periódico de las métricas (una línea JSON por volcado)
+INSTRUMENTATION_DUMP_FILE = "perf_metrics.jsonl"
+INSTRUMENTATION_DUMP_INTERVAL = 10.0
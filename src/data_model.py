@@ -10,25 +10,102 @@ Updated project conditions:
 
 import threading
 import time
-from collections import deque
-import tkinter as tk
+from collections import namedtuple
+import numpy as np
 from . import config
+from .ring_buffer import RingBuffer
+from .instrumentation import PERF
+
+
+# Published acquisition state: replaced as a whole (one reference
+# assignment), never modified, so readers always see a consistent set
+Progress = namedtuple("Progress", ["total", "ends", "arrivals"])
+
+# Published settings: same scheme. `version` grows with every change, so
+# consumers can skip work when it did not move
+Settings = namedtuple("Settings", [
+    "version", "operation_mode", "show_all_leads", "ecg_gain", "window_size",
+    "y_max", "r_threshold", "r_distance", "peak_detector_kind",
+])
+
+
+class StateVar:
+    """
+    Typed value with change callbacks (same get()/set() as the Tk
+    variables, without Tk).
+
+    set() converts to the field's type and, if the value changed, calls
+    every subscriber with the new value, in the calling thread.
+    UI toolkits bind to it (see tk_binding.TkStateBinding); worker
+    threads just call get().
+    """
+
+    def __init__(self, value, kind=None):
+        self.kind = kind or type(value)
+        self._value = self.kind(value)
+        self._callbacks = []
+
+    def get(self):
+        return self._value
+
+    def set(self, value):
+        value = self.kind(value)
+        if value == self._value:
+            return
+        self._value = value
+        for callback in list(self._callbacks):
+            callback(value)
+
+    def subscribe(self, callback):
+        """
+        Calls callback(value) after every change. Returns callback
+        (for unsubscribe).
+        """
+        self._callbacks.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        if callback in self._callbacks:
+            self._callbacks.remove(callback)
 
 
 class AppState:
 
-    def __init__(self):
+    def __init__(self, lock_free=config.LOCK_FREE_HANDOFF, lead_buffers=None):
+        """
+        Pure Python / NumPy state: no Tk needed (the GUI binds the
+        StateVar fields with tk_binding.TkStateBinding).
+
+        lock_free: publish samples without data_lock (SPSC handoff);
+        False keeps the locked scheme (see benchmarks "handoff")
+        lead_buffers: optional (raw, filtered) dicts of RingBuffer per lead,
+        e.g. backed by shared memory (see acquisition_process.py)
+        """
 
         # =====================================================
         # ---------------- DATA BUFFERS -----------------------
         # =====================================================
 
-        self.data_lock = threading.Lock()
+        # Single producer / single consumer per buffer: the writer copies
+        # samples into free slots, moves the buffer's write index and then
+        # publishes a new Progress. Readers only read up to the published
+        # indices, so with lock_free the acquisition thread never waits on
+        # a reader's lock. It still competes for the GIL: with busy readers
+        # an append can wait a whole switch interval, whichever the scheme.
+        self.lock_free = lock_free
+
+        # Plain lock unless instrumentation is on (then wait/hold are timed)
+        self.data_lock = PERF.instrument_lock(threading.Lock(), "data_lock")
 
-        self.voltage_buffer = deque(maxlen=config.MAX_BUFFER_SIZE)
-        self.time_buffer = deque(maxlen=config.MAX_BUFFER_SIZE)
+        # Preallocated ring buffers: the lock is only held to publish
+        # the write index, never while copying samples
+        self.voltage_buffer = RingBuffer(config.MAX_BUFFER_SIZE, np.float64)
+        self.time_buffer = RingBuffer(config.MAX_BUFFER_SIZE, np.int64)
         self.sample_count = 0
 
+        # Set by the acquisition thread whenever samples are published
+        self.new_data = threading.Event()
+
         # =====================================================
         # --------------- CONNECTION STATUS -------------------
         # =====================================================
@@ -52,11 +129,31 @@ class AppState:
         self.current_mux_state = 0
         self.mux_lock = threading.Lock()
 
+        # Per-derivation buffers: each lead has its own write index, so
+        # samples of different leads are never joined into one trace.
+        # lead_raw is written by the acquisition thread, lead_filtered by
+        # the analysis worker (same indices, filtered lags behind).
+        if lead_buffers is None:
+            lead_buffers = tuple(
+                {state: RingBuffer(config.MAX_BUFFER_SIZE, np.float64) for state in self.mux_state_label}
+                for _ in range(2)
+            )
+        self.lead_raw, self.lead_filtered = lead_buffers
+
+        # Time (time.monotonic) each lead's last chunk was published
+        self.lead_arrival = {state: 0.0 for state in self.mux_state_label}
+
+        self.progress = Progress(
+            0,
+            {state: buf.write_index for state, buf in self.lead_raw.items()},
+            dict(self.lead_arrival),
+        )
+
         # =====================================================
         # ----------- MANUAL / AUTO CONTROL MODE -------------
         # =====================================================
 
-        self.operation_mode = tk.StringVar(value=config.MODE_MANUAL)
+        self.operation_mode = StateVar(config.MODE_MANUAL, str)
         
         # Control de tiempo para auto-switch
         self.last_manual_action_time = time.time()
@@ -66,22 +163,165 @@ class AppState:
         # -------- UI VARIABLES (AFFECT PROCESSING) -----------
         # =====================================================
         
-        self.ecg_gain = tk.DoubleVar(value=config.DEFAULT_GAIN)
-        self.window_size = tk.IntVar(value=config.DEFAULT_WINDOW_SIZE)
-        self.y_max = tk.DoubleVar(value=config.DEFAULT_Y_MAX)
+        self.show_all_leads = StateVar(False, bool)
+        self.ecg_gain = StateVar(config.DEFAULT_GAIN, float)
+        self.window_size = StateVar(config.DEFAULT_WINDOW_SIZE, int)
+        self.y_max = StateVar(config.DEFAULT_Y_MAX, float)
+
+        self.r_threshold = StateVar(config.DEFAULT_R_THRESHOLD, float)
+        self.r_distance = StateVar(config.DEFAULT_R_DISTANCE, int)
+        self.peak_detector_kind = StateVar(config.PEAK_DETECTOR, str)
 
-        self.r_threshold = tk.DoubleVar(value=config.DEFAULT_R_THRESHOLD)
-        self.r_distance = tk.IntVar(value=config.DEFAULT_R_DISTANCE)
+        # Snapshot of all the fields above, rebuilt on every change:
+        # render loop and worker threads read plain attributes of
+        # app_state.settings instead of calling get() field by field
+        self.settings_lock = threading.Lock()
+        self.settings = None
+        self._publish_settings()
+        for state_var in self.state_vars().values():
+            state_var.subscribe(lambda _value: self._publish_settings())
 
     # =========================================================
     # ---------------- SIGNAL ACCESS ---------------------------
     # =========================================================
 
-    def get_current_signal(self):
+    def append_samples(self, voltages, leads=None):
+        """
+        Appends a batch of raw ECG samples (single writer thread).
+        Samples are copied into free slots first and published afterwards,
+        without data_lock when lock_free (otherwise under it).
+
+        Args:
+            leads: derivation of each sample (array) or of the whole batch;
+                defaults to the current MUX state
+
+        Returns:
+            float: seconds spent publishing (holding data_lock if locked)
+        """
+        voltages = np.asarray(voltages, dtype=np.float64).reshape(-1)
+        n = len(voltages)
+        if n == 0:
+            return 0.0
+
+        if leads is None:
+            leads = self.current_mux_state
+
+        start = self.sample_count
+        self.voltage_buffer.stage(voltages)
+        self.time_buffer.stage(np.arange(start, start + n, dtype=np.int64))
+
+        touched = []
+        for lead, values in split_by_lead(voltages, leads):
+            if lead in self.lead_raw:
+                self.lead_raw[lead].stage(values)
+                touched.append(lead)
+
+        arrival = time.monotonic()
+        if self.lock_free:
+            t0 = time.perf_counter()
+            self._publish(n, touched, arrival)
+            held = time.perf_counter() - t0
+        else:
+            with self.data_lock:
+                t0 = time.perf_counter()
+                self._publish(n, touched, arrival)
+                held = time.perf_counter() - t0
+
+        self.new_data.set()
+        return held
+
+    def _publish(self, n, touched, arrival):
+        self.voltage_buffer.commit(n)
+        self.time_buffer.commit(n)
+
+        ends = dict(self.progress.ends)
+        for lead in touched:
+            buffer = self.lead_raw[lead]
+            buffer.commit()
+            ends[lead] = buffer.write_index
+            self.lead_arrival[lead] = arrival
+        self.sample_count = self.voltage_buffer.write_index
+
+        # Data and indices first, then the new Progress in one assignment
+        self.progress = Progress(self.sample_count, ends, dict(self.lead_arrival))
+
+    def skip_samples(self, lead, n):
+        """
+        Moves one derivation's write index by n samples without data
+        (a gap in a replayed recording), so later samples keep the lead
+        indices they had when recorded. Same writer as append_samples.
+        """
+        if n <= 0 or lead not in self.lead_raw:
+            return
+        self.lead_raw[lead].advance(n)
+
+        arrival = time.monotonic()
+        if self.lock_free:
+            self._publish(0, [lead], arrival)
+        else:
+            with self.data_lock:
+                self._publish(0, [lead], arrival)
+        self.new_data.set()
+
+    def append_filtered(self, lead, filtered, skipped=0):
+        """
+        Appends filtered samples of one derivation (analysis worker only).
+        `skipped` samples that were lost (worker too far behind) are
+        left as a gap so indices stay aligned with lead_raw.
+        """
+        buffer = self.lead_filtered[lead]
+        if skipped:
+            buffer.advance(skipped)
+        n = buffer.stage(filtered)
+
+        # Readers use the ends of the analysis snapshot, published after this
+        if self.lock_free:
+            buffer.commit(n)
+        else:
+            with self.data_lock:
+                buffer.commit(n)
+
+    def _read_progress(self):
+        if self.lock_free:
+            return self.progress
+        with self.data_lock:
+            return self.progress
+
+    def get_write_index(self):
+        """
+        Returns the published write index (snapshot for latest() reads)
+        """
+        return self._read_progress().total
+
+    def get_lead_write_indices(self):
+        """
+        Returns {lead: write index} for all derivations (one consistent set)
+        """
+        return dict(self._read_progress().ends)
+
+    def get_lead_progress(self):
+        """
+        Returns ({lead: write index}, {lead: arrival time of that index})
+        from the same published Progress
+        """
+        progress = self._read_progress()
+        return dict(progress.ends), dict(progress.arrivals)
+
+    def get_current_signal(self, n=None, end=None):
         """
         Returns current ECG signal (already analog from MUX)
+        as a read-only view of the last n raw samples, in arrival order.
+        """
+        return self.voltage_buffer.latest(n, end)
+
+    def get_lead_signal(self, lead, n=None, end=None):
+        """
+        Last n samples of one derivation's own buffer, filtered or raw
+        depending on config.USE_FILTERED_SIGNAL.
         """
-        return list(self.voltage_buffer)
+        if config.USE_FILTERED_SIGNAL:
+            return self.lead_filtered[lead].latest(n, end)
+        return self.lead_raw[lead].latest(n, end)
 
     # =========================================================
     # ---------------- MUX CONTROL -----------------------------
@@ -124,4 +364,40 @@ class AppState:
 
         if time.time() - self.last_auto_switch_time > config.AUTO_SWITCH_INTERVAL:
             self.next_derivation()
-            self.last_auto_switch_time = time.time()
\ No newline at end of file
+            self.last_auto_switch_time = time.time()
+
+    # =========================================================
+    # ---------------- STATE VARIABLES -------------------------
+    # =========================================================
+
+    def state_vars(self):
+        """
+        {attribute name: StateVar} of the user-facing settings.
+        """
+        return {name: value for name, value in vars(self).items() if isinstance(value, StateVar)}
+
+    def _publish_settings(self):
+        # Fields can change from several threads (GUI, AUTO mode)
+        with self.settings_lock:
+            version = 0 if self.settings is None else self.settings.version + 1
+            values = {name: var.get() for name, var in self.state_vars().items()}
+            self.settings = Settings(version=version, **values)
+
+
+def split_by_lead(values, leads):
+    """
+    Groups a batch by derivation; arrival order is kept within each lead.
+    Interleaved multi-lead frames cost one mask per lead, not one
+    operation per sample.
+
+    Returns:
+        list of (lead, values)
+    """
+    if np.isscalar(leads):
+        return [(int(leads), values)]
+
+    leads = np.asarray(leads)
+    if (leads == leads[0]).all():
+        return [(int(leads[0]), values)]
+
+    return [(int(lead), values[leads == lead]) for lead in np.unique(leads)]
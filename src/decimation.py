@@ -0,0 +1,102 @@
+"""
+Min/max display decimation.
+
+When a display window holds more samples than the plot has pixel columns,
+each column only needs the min and max of the samples it covers: drawing
+that envelope keeps QRS spikes intact while the number of points depends
+on the screen width, not on the window length.
+
+Buckets are aligned to absolute sample indices (bucket k covers samples
+[k * bucket, (k + 1) * bucket)), so a completed bucket never changes and
+its reduction is cached; each frame only reduces the buckets completed
+since the previous frame plus the partial one at the write head.
+"""
+
+import numpy as np
+
+
+def minmax_decimate(values, bucket):
+    """
+    Stateless envelope: (mins, maxs) of consecutive groups of `bucket`
+    samples (the trailing incomplete group is dropped).
+    """
+    values = np.asarray(values)
+    usable = len(values) - len(values) % bucket
+    groups = values[:usable].reshape(-1, bucket)
+    return groups.min(axis=1), groups.max(axis=1)
+
+
+class MinMaxDecimator:
+    """
+    Cached min/max reduction of a stream, bucket by bucket.
+    """
+
+    def __init__(self, max_buckets=4096):
+        self.max_buckets = max_buckets
+        self._bucket = None
+        self._source = None
+        self._keys = np.full(max_buckets, -1, dtype=np.int64)
+        self._mins = np.zeros(max_buckets)
+        self._maxs = np.zeros(max_buckets)
+
+        self.hits = 0
+        self.misses = 0
+
+    def reset(self):
+        self._keys[:] = -1
+
+    def reduce(self, values, end, bucket, source=None):
+        """
+        Reduces the complete buckets of `values` (the samples ending at
+        absolute index `end`) plus the partial bucket at the head.
+
+        Args:
+            source: identifies the stream (e.g. the lead); the cache is
+                dropped when it or the bucket size changes
+
+        Returns:
+            (keys, mins, maxs): bucket numbers and their envelopes,
+            oldest first
+        """
+        if bucket != self._bucket or source != self._source:
+            self._bucket = bucket
+            self._source = source
+            self.reset()
+
+        first = end - len(values)
+        k_first = -(-first // bucket)          # first complete bucket
+        k_head = end // bucket                 # bucket being filled
+
+        keys = np.arange(k_first, k_head, dtype=np.int64)
+        if len(keys) > self.max_buckets:
+            keys = keys[-self.max_buckets:]
+
+        slots = keys % self.max_buckets
+        missing = keys[self._keys[slots] != keys]
+
+        self.misses += len(missing)
+        self.hits += len(keys) - len(missing)
+
+        if len(missing):
+            # Contiguous runs of missing buckets are reduced with one reshape each
+            bounds = np.concatenate(([0], np.flatnonzero(np.diff(missing) != 1) + 1, [len(missing)]))
+            for a, b in zip(bounds[:-1], bounds[1:]):
+                start = int(missing[a]) * bucket - first
+                stop = (int(missing[b - 1]) + 1) * bucket - first
+                mins, maxs = minmax_decimate(values[start:stop], bucket)
+                run_slots = missing[a:b] % self.max_buckets
+                self._mins[run_slots] = mins
+                self._maxs[run_slots] = maxs
+                self._keys[run_slots] = missing[a:b]
+
+        mins = self._mins[slots]
+        maxs = self._maxs[slots]
+
+        # Partial bucket at the head is never cached
+        partial = values[k_head * bucket - first:] if k_head * bucket >= first else values
+        if len(partial):
+            keys = np.append(keys, k_head)
+            mins = np.append(mins, partial.min())
+            maxs = np.append(maxs, partial.max())
+
+        return keys, mins, maxs
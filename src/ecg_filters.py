@@ -0,0 +1,119 @@
+"""
+Streaming ECG filter bank.
+
+Chain (second-order sections, one cascade):
+    - Highpass   baseline wander removal (FILTER_HIGHPASS_HZ)
+    - Notch      power line interference (FILTER_NOTCH_HZ)
+    - Lowpass    EMG / high frequency noise (FILTER_LOWPASS_HZ)
+
+Filter state is kept per derivation, so switching the MUX does not smear
+the transient of one lead into another.
+"""
+
+import numpy as np
+from scipy import signal
+from . import config
+
+
+def design_ecg_sos(fs=config.SAMPLE_RATE,
+                   highpass=config.FILTER_HIGHPASS_HZ,
+                   notch=config.FILTER_NOTCH_HZ,
+                   notch_q=config.FILTER_NOTCH_Q,
+                   lowpass=config.FILTER_LOWPASS_HZ):
+    """
+    Returns the cascade as an (n_sections, 6) SOS array.
+    A stage is skipped if its frequency is None or above Nyquist.
+    """
+    nyquist = fs / 2.0
+    stages = []
+
+    if highpass:
+        stages.append(signal.butter(2, highpass, btype="highpass", fs=fs, output="sos"))
+
+    if notch and notch < nyquist:
+        b, a = signal.iirnotch(notch, notch_q, fs=fs)
+        stages.append(signal.tf2sos(b, a))
+
+    if lowpass and lowpass < nyquist:
+        stages.append(signal.butter(4, lowpass, btype="lowpass", fs=fs, output="sos"))
+
+    return np.vstack(stages)
+
+
+class ECGFilters:
+    """
+    Highpass + notch + lowpass with independent state per derivation.
+
+    Two APIs share the same state:
+        process_sample(value, lead)   one sample (pure Python, low latency)
+        process_block(values, lead)   NumPy block through sosfilt (fast)
+    """
+
+    def __init__(self, fs=config.SAMPLE_RATE, **design):
+        self.fs = fs
+        self.sos = design_ecg_sos(fs, **design)
+        self._coeffs = [tuple(float(c) for c in section) for section in self.sos]
+        self._zi_unit = signal.sosfilt_zi(self.sos)
+        self._zi = {}
+
+    def reset(self, lead=None):
+        """
+        Clears filter state of one derivation (or all).
+        """
+        if lead is None:
+            self._zi.clear()
+        else:
+            self._zi.pop(lead, None)
+
+    def _state(self, lead, first_value):
+        zi = self._zi.get(lead)
+        if zi is None:
+            # Steady state for a constant input: no start-up transient
+            zi = self._zi_unit * first_value
+            self._zi[lead] = zi
+        return zi
+
+    def process_block(self, values, lead=0):
+        """
+        Filters a block of samples, keeping state between calls.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return values.copy()
+
+        zi = self._state(lead, values[0])
+        filtered, self._zi[lead] = signal.sosfilt(self.sos, values, zi=zi)
+        return filtered
+
+    def process_tagged(self, values, leads):
+        """
+        Filters a block whose samples belong to different derivations
+        (leads[i] is the derivation of values[i]).
+        """
+        values = np.asarray(values, dtype=np.float64)
+        leads = np.asarray(leads)
+        if len(values) == 0:
+            return values.copy()
+
+        out = np.empty_like(values)
+        bounds = np.concatenate(([0], np.flatnonzero(np.diff(leads)) + 1, [len(values)]))
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            out[start:stop] = self.process_block(values[start:stop], int(leads[start]))
+        return out
+
+    def process_sample(self, value, lead=0):
+        """
+        Filters one sample (direct form II transposed, same state as
+        process_block).
+        """
+        zi = self._state(lead, value)
+        x = float(value)
+
+        for k, (b0, b1, b2, _, a1, a2) in enumerate(self._coeffs):
+            z0, z1 = zi[k]
+            y = b0 * x + z0
+            zi[k, 0] = b1 * x - a1 * y + z1
+            zi[k, 1] = b2 * x - a2 * y
+            x = y
+
+        return x
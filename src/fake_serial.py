@@ -1,63 +1,300 @@
 import threading
 import time
-import math
-import random
+import warnings
+import numpy as np
+
+
+# Ondas del latido: (centro respecto a R [s], ancho [s], amplitud [mV], eje frontal [grados])
+NORMAL_BEAT = (
+    (-0.20, 0.025, 0.15, 60),     # P
+    (-0.03, 0.010, -0.10, -30),   # Q
+    (0.00, 0.012, 1.20, 60),      # R
+    (0.03, 0.010, -0.25, -120),   # S
+    (0.25, 0.050, 0.30, 45),      # T
+)
+
+# Extrasístole ventricular: sin P, QRS ancho con otro eje, T invertida
+PVC_BEAT = (
+    (0.00, 0.035, 1.40, -60),
+    (0.06, 0.030, -0.60, 120),
+    (0.30, 0.070, -0.40, -60),
+)
+
+# Latido estimulado: espiga del marcapasos + captura ventricular
+PACED_BEAT = (
+    (-0.005, 0.001, 1.50, 90),
+) + PVC_BEAT
+
+BEAT_SHAPES = {"normal": NORMAL_BEAT, "pvc": PVC_BEAT, "paced": PACED_BEAT}
+
+
+def _shape_arrays(shape):
+    centers, widths, amps, angles = np.array(shape, dtype=np.float64).T
+    angles = np.deg2rad(angles)
+    # Proyección del dipolo sobre los ejes de DI (0°) y aVF (90°)
+    return centers, widths, amps * np.cos(angles), amps * np.sin(angles)
+
+
+_SHAPES = {kind: _shape_arrays(shape) for kind, shape in BEAT_SHAPES.items()}
+
+
+def einthoven_leads(x, y):
+    """
+    Frontal-plane dipole components -> the 6 limb leads (I, II, III, aVR, aVL, aVF).
+    """
+    lead_i = x
+    lead_ii = 0.5 * x + (np.sqrt(3) / 2) * y
+    lead_iii = lead_ii - lead_i
+    avr = -(lead_i + lead_ii) / 2
+    avl = lead_i - lead_ii / 2
+    avf = lead_ii - lead_i / 2
+    return np.stack((lead_i, lead_ii, lead_iii, avr, avl, avf), axis=1)
+
 
 class FakeSerialReader:
     """
     Simula un ECG para probar la GUI sin Arduino ni ESP32
+
+    Generates blocks of `block_seconds` for the 6 limb leads at once with
+    NumPy (sum of Gaussian waves per beat, projected with Einthoven's
+    triangle), paced against time.monotonic(): each block produces the
+    samples owed since the start, so the average rate stays exact even when
+    sleep() overshoots.
+
+    Rhythm: `bpm` with `hrv` (relative RR standard deviation). Arrhythmia
+    episodes start at random with the given per-beat probabilities, or on
+    demand with trigger():
+        pause        no beat for `pause_seconds`
+        bradycardia  `brady_bpm` for `brady_seconds`
+        pvc          premature ventricular beat + compensatory pause
+
+    all_leads=False sends only the derivation selected in the MUX, like
+    the real hardware.
+
+    Amplitudes are physiological for a 60° frontal axis, not tuned to the
+    detector: the R wave peaks at about 1.2 mV in II, 0.9 mV in aVF and
+    0.6 mV in I and III, while aVR is negative and aVL nearly flat. With
+    the default R threshold (0.8, positive peaks) only II and aVF show a
+    BPM; lower the threshold to detect I and III.
+
+    ecg_filters is accepted for compatibility with the old
+    FakeSerialReader(app_state, ecg_filters) and ignored: filtering is
+    done by the AnalysisWorker.
     """
-    def __init__(self, app_state, ecg_filters):
+
+    def __init__(self, app_state, ecg_filters=None, fs=500, bpm=60, hrv=0.03, noise=0.02,
+                 all_leads=True, block_seconds=0.02, seed=None,
+                 pause_rate=0.0, pause_seconds=2.5,
+                 brady_rate=0.0, brady_bpm=40, brady_seconds=10.0,
+                 pvc_rate=0.0, wander=0.05, mains=0.0):
         self.app_state = app_state
-        self.ecg_filters = ecg_filters
         self.running = False
-        self.fs = 500              # Frecuencia de muestreo simulada
-        self.bpm = 60              # Ritmo cardíaco
-        self.t = 0
-        self.dt = 1 / self.fs
+        self.fs = fs                  # Frecuencia de muestreo simulada
+        self.bpm = bpm                # Ritmo cardíaco
+        self.hrv = hrv
+        self.noise = noise
+        self.wander = wander          # Deriva de línea base (mV)
+        self.mains = mains            # Interferencia de red (mV)
+        self.all_leads = all_leads
+        self.block_seconds = block_seconds
+
+        self.pause_rate = pause_rate
+        self.pause_seconds = pause_seconds
+        self.brady_rate = brady_rate
+        self.brady_bpm = brady_bpm
+        self.brady_seconds = brady_seconds
+        self.pvc_rate = pvc_rate
+
+        if ecg_filters is not None:
+            warnings.warn("FakeSerialReader no longer filters; ecg_filters is ignored",
+                          DeprecationWarning, stacklevel=2)
+
+        self.rng = np.random.default_rng(seed)
+        # Peticiones de estímulo: llegan desde otro hilo (monitor de ritmo)
+        self._pace_lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.produced = 0             # muestras por derivación generadas
+        self.beats = []               # (tiempo de R, tipo), en orden
+        self._next_beat = 0.3
+        self._brady_until = -1.0
+        self._forced = set()
+        with self._pace_lock:
+            self._pace_requests = 0
+
+        # Metrics
+        self.late_blocks = 0
+        self.skipped_samples = 0
+        self.beat_counts = {kind: 0 for kind in BEAT_SHAPES}
+
+    # =========================================================
+    # ---------------- READER INTERFACE -----------------------
+    # =========================================================
 
     def start(self):
         self.running = True
         self.thread = threading.Thread(target=self._run, daemon=True)
         self.thread.start()
         self.app_state.serial_connected = True
-        self.app_state.arduino_connected = False
+        self.app_state.esp32_connected = True
         print("FakeSerialReader iniciado (modo simulación)")
 
     def stop(self):
         self.running = False
+        self.app_state.serial_connected = False
+        self.app_state.esp32_connected = False
         print("FakeSerialReader detenido")
 
     def send_command(self, command):
         # No hace nada, solo para compatibilidad
         print(f"[FAKE SERIAL] Comando ignorado: {command}")
 
+    def send_mux_command(self, state):
+        # La derivación se lee de app_state en cada bloque
+        pass
+
+    def send_pace_command(self):
+        """
+        Simulated pacemaker: the next block starts with a paced beat.
+        """
+        with self._pace_lock:
+            self._pace_requests += 1
+        return True
+
+    def trigger(self, kind):
+        """
+        Forces an episode ("pause", "bradycardia" or "pvc") at the next beat.
+        """
+        if kind not in ("pause", "bradycardia", "pvc"):
+            raise ValueError(f"unknown episode: {kind}")
+        self._forced.add(kind)
+
+    # =========================================================
+    # ---------------- PACING LOOP ----------------------------
+    # =========================================================
+
     def _run(self):
+        start = time.monotonic()
+        origin = self.produced
+
         while self.running:
-            ecg_value = self._synthetic_ecg(self.t)
-            filtered = self.ecg_filters.process_sample(ecg_value)
+            now = time.monotonic()
+            owed = origin + int((now - start) * self.fs) - self.produced
+
+            if owed > self.fs:
+                # Más de 1 s de retraso (PC suspendido, depurador...): se salta
+                self.skipped_samples += owed
+                origin += owed
+                self.produced += owed
+                self.late_blocks += 1
+                owed = 0
+
+            if owed > 0:
+                self._emit(self.generate(owed))
+
+            # Próximo bloque alineado a la rejilla de block_seconds
+            elapsed = time.monotonic() - start
+            next_tick = (int(elapsed / self.block_seconds) + 1) * self.block_seconds
+            time.sleep(max(0.0, next_tick - elapsed))
 
-            with self.app_state.data_lock:
-                self.app_state.voltage_buffer.append(ecg_value)
-                self.app_state.filtered_buffer.append(filtered)
-                self.app_state.time_buffer.append(self.app_state.sample_count)
-                self.app_state.sample_count += 1
+    def _emit(self, block):
+        if self.all_leads:
+            n, k = block.shape
+            leads = np.tile(np.arange(k), n)
+            self.app_state.append_samples(block.reshape(-1), leads)
+        else:
+            lead = self.app_state.current_mux_state
+            self.app_state.append_samples(block[:, lead], lead)
 
-            self.t += self.dt
-            time.sleep(self.dt)
+    # =========================================================
+    # ---------------- SIGNAL GENERATION ----------------------
+    # =========================================================
 
-    def _synthetic_ecg(self, t):
+    def generate(self, n):
         """
-        ECG sintético con QRS marcado
+        Next n samples of all 6 leads, shape (n, 6).
         """
-        hr_period = 60 / self.bpm
-        phase = (t % hr_period) / hr_period
+        t = (self.produced + np.arange(n)) / self.fs
+        t0, t1 = t[0], t[-1]
+
+        with self._pace_lock:
+            paces, self._pace_requests = self._pace_requests, 0
+        for _ in range(paces):
+            self._add_beat(t0, "paced")
+            self._next_beat = max(self._next_beat, t0 + 60.0 / self.bpm)
+
+        while self._next_beat <= t1 + 0.5:
+            self._schedule_beat()
+
+        # Latidos que pueden tocar este bloque (ondas desde -0.25 s a +0.5 s)
+        self.beats = [b for b in self.beats if b[0] > t0 - 1.0]
+        x = np.zeros(n)
+        y = np.zeros(n)
+        for kind in BEAT_SHAPES:
+            times = np.array([b for b, k in self.beats if k == kind and t0 - 1.0 < b < t1 + 0.5])
+            if len(times) == 0:
+                continue
+            centers, widths, ax, ay = _SHAPES[kind]
+            # (muestras, latidos, ondas)
+            d = (t[:, None, None] - times[None, :, None] - centers) / widths
+            g = np.exp(-0.5 * d * d).sum(axis=1)
+            x += g @ ax
+            y += g @ ay
 
-        # Componentes del ECG
-        p_wave = 0.1 * math.sin(2 * math.pi * (phase - 0.2)) if 0.15 < phase < 0.25 else 0
-        qrs = 1.2 * math.exp(-((phase - 0.5) ** 2) / 0.0008)
-        t_wave = 0.3 * math.sin(2 * math.pi * (phase - 0.7)) if 0.6 < phase < 0.85 else 0
+        block = einthoven_leads(x, y)
 
-        noise = random.uniform(-0.02, 0.02)
+        if self.wander:
+            block += self.wander * np.sin(2 * np.pi * 0.25 * t)[:, None]
+        if self.mains:
+            block += self.mains * np.sin(2 * np.pi * 60.0 * t)[:, None]
+        if self.noise:
+            block += self.rng.normal(0.0, self.noise, block.shape)
 
-        return p_wave + qrs + t_wave + noise
+        self.produced += n
+        return block
+
+    def _add_beat(self, t, kind):
+        self.beats.append((t, kind))
+        self.beats.sort()
+        self.beat_counts[kind] += 1
+
+    def _schedule_beat(self):
+        """
+        Places the next beat at self._next_beat and picks the following RR.
+        """
+        tb = self._next_beat
+        rand = self.rng.random(3)
+
+        if "bradycardia" in self._forced or rand[0] < self.brady_rate:
+            self._forced.discard("bradycardia")
+            self._brady_until = tb + self.brady_seconds
+
+        bpm = self.brady_bpm if tb < self._brady_until else self.bpm
+        base_rr = 60.0 / bpm
+        rr = max(0.3, base_rr * (1.0 + self.hrv * self.rng.standard_normal()))
+
+        self._add_beat(tb, "normal")
+
+        if "pvc" in self._forced or rand[1] < self.pvc_rate:
+            self._forced.discard("pvc")
+            # PVC precoz y pausa compensadora: el siguiente sinusal a 2 RR
+            self._add_beat(tb + 0.6 * base_rr, "pvc")
+            rr = 2 * base_rr
+
+        if "pause" in self._forced or rand[2] < self.pause_rate:
+            self._forced.discard("pause")
+            rr += self.pause_seconds
+
+        self._next_beat = tb + rr
+
+    def stats(self):
+        """
+        Samples generated per lead, catch-up skips and beats by type.
+        """
+        return {
+            "produced": self.produced,
+            "late_blocks": self.late_blocks,
+            "skipped_samples": self.skipped_samples,
+            "beats": dict(self.beat_counts),
+        }
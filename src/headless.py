@@ -0,0 +1,63 @@
+"""
+Headless acquisition server: reader, filters, peak detection and the
+rhythm monitor without Tk, streaming to remote viewers (stream_server).
+
+Usage:
+    python main.py --headless [--simulate | --replay FILE | --async-serial]
+                   [--listen HOST:PORT]
+"""
+
+import time
+
+from . import config
+from .data_model import AppState
+from .analysis import AnalysisWorker
+from .rhythm_monitor import RhythmMonitor
+from .replay import ReplayReader
+from .stream_server import StreamServer
+
+
+def run_headless(reader_factory=None, host=config.STREAM_HOST, port=config.STREAM_PORT,
+                 seconds=None, report_interval=10.0):
+    """
+    Runs until Ctrl+C (or for `seconds`), printing the server stats every
+    report_interval seconds.
+    """
+    app_state = AppState()
+
+    if reader_factory is None:
+        from .serial_handler import SerialReader
+        reader = SerialReader(app_state)
+        reader.connect()
+    else:
+        reader = reader_factory(app_state)
+
+    monitor = RhythmMonitor(reader)
+    analysis = AnalysisWorker(app_state, rhythm_monitor=monitor)
+    if isinstance(reader, ReplayReader):
+        # Modo "max": la reproducción espera al análisis
+        reader.analysis = analysis
+    server = StreamServer(app_state, analysis, monitor, host, port)
+
+    monitor.start()
+    analysis.start()
+    if reader_factory is not None:
+        reader.start()
+    server.start()
+
+    t_start = time.monotonic()
+    try:
+        while seconds is None or time.monotonic() - t_start < seconds:
+            time.sleep(report_interval if seconds is None else min(report_interval, seconds))
+            stats = server.stats()
+            status = monitor.status()
+            print(f"{app_state.sample_count} samples | {status['state']} | "
+                  f"{len(stats['clients'])} clients | tick {stats['tick_ms']:.2f} ms")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        reader.stop()
+        analysis.stop()
+        monitor.stop()
+    return server.stats()
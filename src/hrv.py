@@ -0,0 +1,327 @@
+"""
+Heart-rate variability and rhythm analytics over the RR stream.
+
+HRVEngine is fed one beat (or one RR interval) at a time and keeps, for
+each sliding window in config.HRV_WINDOWS (1, 5 and 60 min by default):
+
+    SDNN    standard deviation of the NN intervals
+    RMSSD   root mean square of successive NN differences
+    pNN50   % of successive NN differences larger than 50 ms
+    mean NN / mean HR
+
+Nothing is recomputed from history: every window holds running sums
+(Welford mean / M2 for SDNN, sum of squared differences and an NN50 count
+for RMSSD / pNN50) that are updated when a beat enters the window and
+when it expires, so each beat costs O(1) amortised per window.
+
+Ectopic rejection: an RR outside [HRV_MIN_RR, HRV_MAX_RR] is an artifact;
+one that deviates more than HRV_ECTOPIC_TOLERANCE from the reference
+(running mean of the accepted RR) is ectopic. Neither enters the
+statistics, and successive differences are never taken across a
+rejected beat. After HRV_REFERENCE_RESET_BEATS rejections in a row the
+new rhythm becomes the reference (a sustained rate change, not ectopy).
+
+Episodes (on every RR, ectopic or not): tachycardia / bradycardia when
+HRV_EPISODE_BEATS consecutive beats are above / below the limits, closed
+after as many beats back in range; pause for a single RR longer than
+HRV_PAUSE_RR.
+
+Updated by one thread (RhythmMonitor); summary() may be read from others.
+"""
+
+import math
+from collections import deque
+from dataclasses import dataclass
+
+from . import config
+
+
+# Episodes kept (the counters keep the totals)
+MAX_EPISODES = 256
+
+# Weight of a new accepted RR in the ectopic reference
+REFERENCE_ALPHA = 0.1
+
+TACHYCARDIA = "TACHYCARDIA"
+BRADYCARDIA = "BRADYCARDIA"
+PAUSE = "PAUSE"
+EPISODE_KINDS = (TACHYCARDIA, BRADYCARDIA, PAUSE)
+
+# Classification of each RR
+NORMAL = "normal"
+ECTOPIC = "ectopic"
+ARTIFACT = "artifact"
+
+
+@dataclass
+class Episode:
+    """
+    One rhythm episode; times are beat times (seconds), rates in BPM.
+    `ongoing` stays True until the episode is closed.
+    """
+    kind: str
+    start: float
+    end: float
+    beats: int
+    min_bpm: float
+    max_bpm: float
+    ongoing: bool = True
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+
+class SlidingWindow:
+    """
+    NN intervals of the last `seconds`, with running statistics.
+
+    Each entry is (beat time, NN, difference to the previous NN or None);
+    a difference leaves the window together with the beat that closes it.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.items = deque()
+
+        # Welford sobre NN (segundos)
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+        # Diferencias sucesivas
+        self.diffs = 0
+        self.diff_sq = 0.0
+        self.nn50 = 0
+
+    def add(self, t, nn, diff):
+        self.items.append((t, nn, diff))
+
+        self.n += 1
+        delta = nn - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (nn - self.mean)
+
+        if diff is not None:
+            self.diffs += 1
+            self.diff_sq += diff * diff
+            self.nn50 += abs(diff) > 0.05
+
+        self.expire(t)
+
+    def expire(self, now):
+        """
+        Drops the beats older than `seconds` before `now`.
+        """
+        limit = now - self.seconds
+        items = self.items
+        while items and items[0][0] <= limit:
+            _, nn, diff = items.popleft()
+
+            # Welford inverso
+            self.n -= 1
+            if self.n == 0:
+                self.mean = self.m2 = 0.0
+            else:
+                delta = nn - self.mean
+                self.mean -= delta / self.n
+                self.m2 = max(0.0, self.m2 - delta * (nn - self.mean))
+
+            if diff is not None:
+                self.diffs -= 1
+                self.diff_sq = max(0.0, self.diff_sq - diff * diff)
+                self.nn50 -= abs(diff) > 0.05
+
+    def metrics(self):
+        """
+        Window statistics in ms / BPM / % (zeros when there is no data).
+        """
+        n, diffs = self.n, self.diffs
+        return {
+            "n": n,
+            "mean_nn_ms": 1e3 * self.mean if n else 0.0,
+            "sdnn_ms": 1e3 * math.sqrt(self.m2 / (n - 1)) if n > 1 else 0.0,
+            "rmssd_ms": 1e3 * math.sqrt(self.diff_sq / diffs) if diffs else 0.0,
+            "pnn50": 100.0 * self.nn50 / diffs if diffs else 0.0,
+            "mean_hr": 60.0 / self.mean if n else 0.0,
+        }
+
+
+class HRVEngine:
+
+    def __init__(self, windows=config.HRV_WINDOWS):
+        self.windows = {seconds: SlidingWindow(seconds) for seconds in windows}
+
+        self.last_beat = None          # tiempo del último latido
+        self.last_nn = None            # último NN aceptado (None tras un rechazo)
+        self.reference = None          # RR de referencia para ectópicos
+        self.rejected_run = 0
+
+        self.instant_hr = 0.0
+        self.counts = {NORMAL: 0, ECTOPIC: 0, ARTIFACT: 0}
+
+        # Episodios
+        self.episodes = deque(maxlen=MAX_EPISODES)
+        self.episode_counts = dict.fromkeys(EPISODE_KINDS, 0)
+        self.current = None            # taqui/bradicardia en curso
+        self._outside = 0
+        self._run_kind = None
+        self._run = None
+
+    # =========================================================
+    # ---------------- INPUT ----------------------------------
+    # =========================================================
+
+    def add_beat(self, t):
+        """
+        New beat at time t (seconds). The first beat after start or gap()
+        only sets the reference point.
+        """
+        if self.last_beat is None:
+            self.last_beat = t
+            return None
+        return self.add_rr(t - self.last_beat, t)
+
+    def add_rr(self, rr, t=None):
+        """
+        New RR interval (seconds) ending at time t (default: previous beat
+        + rr).
+
+        Returns:
+            str: NORMAL, ECTOPIC or ARTIFACT
+        """
+        if t is None:
+            t = (self.last_beat or 0.0) + rr
+        self.last_beat = t
+
+        kind = self._classify(rr)
+        self.counts[kind] += 1
+
+        if kind == NORMAL:
+            diff = rr - self.last_nn if self.last_nn is not None else None
+            for window in self.windows.values():
+                window.add(t, rr, diff)
+            self.last_nn = rr
+        else:
+            # Sin diferencias sucesivas a través de un latido rechazado;
+            # las ventanas avanzan igualmente hasta t
+            self.last_nn = None
+            for window in self.windows.values():
+                window.expire(t)
+
+        if rr >= config.HRV_MIN_RR:
+            self.instant_hr = 60.0 / rr
+            self._track_episodes(t, rr)
+        return kind
+
+    def gap(self):
+        """
+        Signal lost: the next beat starts a new RR chain (no interval,
+        difference or episode spans the gap).
+        """
+        self.last_beat = None
+        self.last_nn = None
+        self._close_current()
+        self._run_kind = self._run = None
+
+    def _classify(self, rr):
+        if not config.HRV_MIN_RR <= rr <= config.HRV_MAX_RR:
+            return ARTIFACT
+
+        reference = self.reference
+        if reference is not None and abs(rr - reference) > config.HRV_ECTOPIC_TOLERANCE * reference:
+            self.rejected_run += 1
+            if self.rejected_run < config.HRV_REFERENCE_RESET_BEATS:
+                return ECTOPIC
+            # Cambio de ritmo sostenido: nueva referencia
+            reference = None
+
+        self.rejected_run = 0
+        if reference is None:
+            self.reference = rr
+        else:
+            self.reference = reference + REFERENCE_ALPHA * (rr - reference)
+        return NORMAL
+
+    # =========================================================
+    # ---------------- EPISODES -------------------------------
+    # =========================================================
+
+    def _track_episodes(self, t, rr):
+        hr = 60.0 / rr
+
+        if rr > config.HRV_PAUSE_RR:
+            self._add_episode(Episode(PAUSE, t - rr, t, 1, hr, hr, ongoing=False))
+
+        if hr > config.HRV_TACHY_BPM:
+            kind = TACHYCARDIA
+        elif hr < config.HRV_BRADY_BPM:
+            kind = BRADYCARDIA
+        else:
+            kind = None
+
+        current = self.current
+        if current is not None:
+            if kind == current.kind:
+                current.end = t
+                current.beats += 1
+                current.min_bpm = min(current.min_bpm, hr)
+                current.max_bpm = max(current.max_bpm, hr)
+                self._outside = 0
+            else:
+                self._outside += 1
+                if self._outside >= config.HRV_EPISODE_BEATS:
+                    self._close_current()
+            return
+
+        # Racha candidata: N latidos seguidos del mismo tipo abren el episodio
+        if kind is None:
+            self._run_kind = self._run = None
+        elif kind != self._run_kind:
+            self._run_kind = kind
+            self._run = Episode(kind, t - rr, t, 1, hr, hr)
+        else:
+            run = self._run
+            run.end = t
+            run.beats += 1
+            run.min_bpm = min(run.min_bpm, hr)
+            run.max_bpm = max(run.max_bpm, hr)
+
+        if self._run is not None and self._run.beats >= config.HRV_EPISODE_BEATS:
+            self.current = self._run
+            self._outside = 0
+            self._add_episode(self.current)
+            self._run_kind = self._run = None
+
+    def _add_episode(self, episode):
+        self.episodes.append(episode)
+        self.episode_counts[episode.kind] += 1
+
+    def _close_current(self):
+        if self.current is not None:
+            self.current.ongoing = False
+            self.current = None
+
+    # =========================================================
+    # ---------------- RESULTS --------------------------------
+    # =========================================================
+
+    def window_metrics(self, seconds):
+        return self.windows[seconds].metrics()
+
+    def summary(self):
+        """
+        Beat counts, instantaneous HR, per-window statistics and episode
+        counters (plain values, JSON-serialisable).
+        """
+        current = self.current
+        return {
+            "beats": sum(self.counts.values()),
+            "normal": self.counts[NORMAL],
+            "ectopic": self.counts[ECTOPIC],
+            "artifacts": self.counts[ARTIFACT],
+            "instant_hr": self.instant_hr,
+            "windows": {seconds: window.metrics() for seconds, window in self.windows.items()},
+            "episodes": dict(self.episode_counts),
+            "ongoing": current.kind if current is not None else None,
+        }
@@ -0,0 +1,294 @@
+"""
+Lightweight timing instrumentation.
+
+LatencyHistogram: constant-memory log-spaced histogram of durations.
+Instrumentation (shared as PERF): named timers, lock wait/hold times,
+counters and gauges for the hot paths, with near-zero cost when disabled.
+"""
+
+import bisect
+import json
+import math
+import threading
+import time
+from collections import deque
+
+from . import config
+
+
+class LatencyHistogram:
+    """
+    Fixed log-spaced histogram of durations (seconds).
+
+    Buckets go from min_s to max_s with `bins_per_decade` buckets per
+    decade, plus an underflow and an overflow bucket. Recording is O(log n)
+    and memory is constant.
+    """
+
+    def __init__(self, min_s=1e-5, max_s=10.0, bins_per_decade=10):
+        decades = math.log10(max_s / min_s)
+        n_edges = int(round(decades * bins_per_decade)) + 1
+        self.edges = [min_s * 10 ** (i / bins_per_decade) for i in range(n_edges)]
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(self.edges) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect.bisect_right(self.edges, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """
+        Upper edge of the bucket holding the q-th percentile (seconds).
+        """
+        if self.count == 0:
+            return 0.0
+
+        target = q / 100.0 * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target and c:
+                return self.edges[i] if i < len(self.edges) else self.max
+        return self.max
+
+    def summary(self):
+        """
+        count, mean and percentiles in milliseconds.
+        """
+        if self.count == 0:
+            return {"count": 0}
+
+        return {
+            "count": self.count,
+            "mean_ms": 1e3 * self.total / self.count,
+            "p50_ms": 1e3 * self.percentile(50),
+            "p95_ms": 1e3 * self.percentile(95),
+            "p99_ms": 1e3 * self.percentile(99),
+            "max_ms": 1e3 * self.max,
+        }
+
+
+# =========================================================
+# ---------------- HOT-PATH METRICS -----------------------
+# =========================================================
+
+class Series:
+    """
+    Recent values in a ring buffer (for live percentiles) plus running
+    totals; durations also go to a cumulative LatencyHistogram.
+    """
+
+    def __init__(self, name, size=1024, histogram=True):
+        self.name = name
+        self.recent = deque(maxlen=size)
+        self.histogram = LatencyHistogram() if histogram else None
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value):
+        self.recent.append(value)
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if self.histogram is not None:
+            self.histogram.record(value)
+
+    def summary(self, scale=1.0):
+        """
+        count / total and recent mean, p50, p95, max (values x scale).
+        """
+        result = {"count": self.count, "total": self.total * scale}
+        if self.recent:
+            recent = sorted(self.recent)
+            n = len(recent)
+            result.update(
+                mean=scale * sum(recent) / n,
+                p50=scale * recent[n // 2],
+                p95=scale * recent[min(n - 1, int(0.95 * n))],
+                max=scale * self.max,
+            )
+        return result
+
+
+class _Timer:
+
+    __slots__ = ("series", "t0")
+
+    def __init__(self, series):
+        self.series = series
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.series.record(time.perf_counter() - self.t0)
+        return False
+
+
+class _NullTimer:
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class InstrumentedLock:
+    """
+    threading.Lock wrapper that records wait (acquire) and hold times.
+    """
+
+    def __init__(self, lock, wait, hold):
+        self._lock = lock
+        self._wait = wait
+        self._hold = hold
+        self._acquired_at = 0.0
+
+    def acquire(self, blocking=True, timeout=-1):
+        t0 = time.perf_counter()
+        ok = self._lock.acquire(blocking, timeout)
+        if ok:
+            # Solo el hilo que tiene el lock escribe aquí
+            self._acquired_at = time.perf_counter()
+            self._wait.record(self._acquired_at - t0)
+        return ok
+
+    def release(self):
+        self._hold.record(time.perf_counter() - self._acquired_at)
+        self._lock.release()
+
+    def locked(self):
+        return self._lock.locked()
+
+    __enter__ = acquire
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+
+class Instrumentation:
+    """
+    Registry of timers, counters and gauges for the hot paths.
+
+    Disabled (the default) every entry point is a flag check: timer()
+    returns a shared no-op context manager, record()/count() return at
+    once and instrument_lock() hands back the plain lock. Callers in tight
+    loops check `enabled` themselves before measuring.
+
+    Names are "<area>.<stage>" (serial.decode, gui.render, data_lock.wait...).
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.series = {}
+        self.counters = {}
+        self.gauges = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def _series(self, name, histogram=True):
+        series = self.series.get(name)
+        if series is None:
+            with self._lock:
+                series = self.series.setdefault(name, Series(name, histogram=histogram))
+        return series
+
+    # ---- recording ----
+
+    def timer(self, name):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self._series(name))
+
+    def record(self, name, seconds):
+        if self.enabled:
+            self._series(name).record(seconds)
+
+    def observe(self, name, value):
+        """
+        Non-duration value (bytes waiting, queue depth...).
+        """
+        if self.enabled:
+            self._series(name, histogram=False).record(value)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        if self.enabled:
+            self.gauges[name] = value
+
+    def instrument_lock(self, lock, name):
+        """
+        Returns `lock` itself when disabled, an InstrumentedLock otherwise.
+        """
+        if not self.enabled:
+            return lock
+        return InstrumentedLock(lock, self._series(name + ".wait"), self._series(name + ".hold"))
+
+    # ---- reporting ----
+
+    def snapshot(self):
+        """
+        Plain dict: timers in ms, observed values, counters and gauges.
+        """
+        result = {"timestamp": time.time(), "uptime": time.time() - self.started}
+        for name, series in list(self.series.items()):
+            scale = 1e3 if series.histogram is not None else 1.0
+            entry = series.summary(scale)
+            if series.histogram is not None:
+                entry["p99_all"] = 1e3 * series.histogram.percentile(99)
+            result[name] = entry
+        result["counters"] = dict(self.counters)
+        result["gauges"] = dict(self.gauges)
+        return result
+
+    def format_lines(self):
+        """
+        Short text for the overlay: one line per timer/series.
+        """
+        lines = []
+        for name, series in sorted(self.series.items()):
+            s = series.summary(1e3 if series.histogram is not None else 1.0)
+            if "mean" not in s:
+                continue
+            unit = "ms" if series.histogram is not None else ""
+            lines.append(f"{name:<18} {s['mean']:7.2f} {s['p95']:7.2f} {s['max']:8.2f} {unit}")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name:<18} {value}")
+        for name, value in sorted(self.gauges.items()):
+            lines.append(f"{name:<18} {value}")
+        return lines
+
+    def dump(self, path):
+        """
+        Appends the current snapshot as one JSON line.
+        """
+        with open(path, "a") as f:
+            f.write(json.dumps(self.snapshot()) + "\n")
+
+
+# Shared registry; enabled by config or main.py --perf before the app starts
+PERF = Instrumentation(config.ENABLE_INSTRUMENTATION)
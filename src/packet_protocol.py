@@ -0,0 +1,304 @@
+"""
+Binary framed packet protocol for the ESP32 link.
+
+Frame layout (little-endian, FRAME_SAMPLES = N):
+
+    offset  size  field
+    0       2     sync word   0xA5 0x5A
+    2       2     sequence    uint16, +1 per frame (wraps)
+    4       1     mux state   uint8 (derivation 0-5)
+    5       1     count       uint8, must equal N
+    6       2N    samples     int16 (volts = raw * FRAME_SAMPLE_SCALE)
+    6+2N    2     crc         CRC-16/CCITT-FALSE over bytes 2 .. 6+2N
+
+Decoding is done on whole batches of frames with np.frombuffer; the CRC
+is computed column-wise, vectorized across all frames of the batch.
+
+LineDecoder handles the legacy ASCII format (one value per line) with the
+same feed() interface.
+"""
+
+import numpy as np
+from . import config
+
+
+SYNC_WORD = b"\xA5\x5A"
+HEADER_SIZE = 6
+CRC_SIZE = 2
+
+
+def frame_dtype(samples_per_frame):
+    """
+    Structured dtype matching one frame on the wire.
+    """
+    return np.dtype([
+        ("sync", "<u2"),
+        ("seq", "<u2"),
+        ("mux", "u1"),
+        ("count", "u1"),
+        ("samples", "<i2", (samples_per_frame,)),
+        ("crc", "<u2"),
+    ])
+
+
+# =========================================================
+# ---------------- CRC-16 / CCITT -------------------------
+# =========================================================
+
+def _make_crc_table():
+    table = np.zeros(256, dtype=np.uint16)
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+        table[i] = crc & 0xFFFF
+    return table
+
+
+_CRC_TABLE = _make_crc_table()
+
+
+def crc16_ccitt(data):
+    """
+    CRC-16/CCITT-FALSE of a bytes-like object.
+    """
+    crc = 0xFFFF
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFF) ^ int(_CRC_TABLE[((crc >> 8) ^ byte) & 0xFF])
+    return crc
+
+
+def crc16_ccitt_rows(rows):
+    """
+    CRC-16/CCITT-FALSE of every row of a 2D uint8 array at once.
+    """
+    crc = np.full(rows.shape[0], 0xFFFF, dtype=np.uint16)
+    for col in range(rows.shape[1]):
+        crc = (crc << 8) ^ _CRC_TABLE[(crc >> 8) ^ rows[:, col]]
+    return crc
+
+
+def encode_frame(seq, mux_state, samples):
+    """
+    Builds one frame (reference for the firmware and for simulators).
+    """
+    samples = np.asarray(samples, dtype="<i2")
+    body = (
+        int(seq & 0xFFFF).to_bytes(2, "little")
+        + bytes((mux_state & 0xFF, len(samples)))
+        + samples.tobytes()
+    )
+    return SYNC_WORD + body + crc16_ccitt(body).to_bytes(2, "little")
+
+
+def encode_block(seq, block, samples_per_frame=None, scale=None):
+    """
+    Frames for a (n, leads) block of volts, all leads of each group of
+    samples_per_frame samples in turn (n must be a multiple of it).
+
+    Returns:
+        (bytes, next sequence number)
+    """
+    k = samples_per_frame or config.FRAME_SAMPLES
+    scale = config.FRAME_SAMPLE_SCALE if scale is None else scale
+    raw = np.round(np.asarray(block) / scale)
+
+    frames = []
+    for a in range(0, len(raw), k):
+        for lead in range(raw.shape[1]):
+            frames.append(encode_frame(seq, lead, raw[a:a + k, lead]))
+            seq += 1
+    return b"".join(frames), seq
+
+
+# =========================================================
+# ---------------- STREAM DECODER -------------------------
+# =========================================================
+
+class FrameDecoder:
+    """
+    Incremental decoder for a byte stream of binary frames.
+
+    feed() accepts whatever bytes arrived (any split), keeps the incomplete
+    tail for the next call and resynchronizes on the sync word after
+    corrupted bytes.
+    """
+
+    def __init__(self, samples_per_frame=None, scale=None):
+        self.samples_per_frame = samples_per_frame or config.FRAME_SAMPLES
+        self.scale = config.FRAME_SAMPLE_SCALE if scale is None else scale
+
+        self.dtype = frame_dtype(self.samples_per_frame)
+        self.frame_size = self.dtype.itemsize
+        self._offsets = np.arange(self.frame_size)
+
+        self._pending = b""
+        self._last_seq = None
+
+        # Contadores
+        self.frames_ok = 0
+        self.crc_errors = 0
+        self.dropped_frames = 0
+        self.discarded_bytes = 0
+
+    def reset(self):
+        self._pending = b""
+        self._last_seq = None
+
+    def stats(self):
+        return {
+            "frames_ok": self.frames_ok,
+            "crc_errors": self.crc_errors,
+            "dropped_frames": self.dropped_frames,
+            "discarded_bytes": self.discarded_bytes,
+        }
+
+    def feed(self, data):
+        """
+        Decodes all complete frames in pending + data.
+
+        Returns:
+            (volts, mux): float64 samples and the mux state of each sample
+        """
+        buf = self._pending + bytes(data)
+        raw = np.frombuffer(buf, dtype=np.uint8)
+        size = self.frame_size
+
+        volts = []
+        mux = []
+        pos = 0
+
+        while len(raw) - pos >= size:
+            window = raw[pos:]
+            candidates = np.flatnonzero(
+                (window[:-1] == SYNC_WORD[0]) & (window[1:] == SYNC_WORD[1])
+            ) + pos
+
+            # Greedy walk over sync candidates only: non-overlapping frame starts
+            starts = []
+            next_free = pos
+            for c in candidates:
+                if c < next_free:
+                    continue
+                if c + size > len(raw):
+                    break
+                starts.append(c)
+                next_free = c + size
+
+            if not starts:
+                break
+
+            starts = np.asarray(starts)
+            if starts[-1] - starts[0] == (len(starts) - 1) * size:
+                rows = raw[starts[0]:starts[0] + len(starts) * size].reshape(-1, size)
+                frames = np.frombuffer(buf, dtype=self.dtype, count=len(starts), offset=int(starts[0]))
+            else:
+                rows = raw[starts[:, None] + self._offsets]
+                frames = rows.view(self.dtype).reshape(-1)
+
+            valid = (
+                (crc16_ccitt_rows(rows[:, 2:-CRC_SIZE]) == frames["crc"])
+                & (frames["count"] == self.samples_per_frame)
+            )
+
+            if valid.all():
+                good = len(starts)
+                resume = int(next_free)
+            else:
+                # Accept frames up to the first bad one and resync one byte after it
+                good = int(np.argmin(valid))
+                resume = int(starts[good]) + 1
+                self.crc_errors += 1
+
+            if good:
+                accepted = frames[:good]
+                self._account_sequence(accepted["seq"])
+                volts.append(accepted["samples"].reshape(-1) * self.scale)
+                mux.append(np.repeat(accepted["mux"], self.samples_per_frame))
+                self.frames_ok += good
+
+            self.discarded_bytes += (resume - pos) - good * size
+            pos = resume
+
+        # Keep the tail: from the next sync candidate, or a lone first sync byte
+        tail = raw[pos:]
+        keep = len(tail)
+        hits = np.flatnonzero((tail[:-1] == SYNC_WORD[0]) & (tail[1:] == SYNC_WORD[1]))
+        if len(hits):
+            keep = int(hits[0])
+        elif len(tail) and tail[-1] == SYNC_WORD[0]:
+            keep = len(tail) - 1
+        self.discarded_bytes += keep
+        self._pending = bytes(tail[keep:])
+
+        if not volts:
+            return np.empty(0, dtype=np.float64), np.empty(0, dtype=np.uint8)
+
+        return np.concatenate(volts), np.concatenate(mux)
+
+    def _account_sequence(self, seq):
+        seq = seq.astype(np.int64)
+        if self._last_seq is not None:
+            seq_ext = np.concatenate(([self._last_seq], seq))
+        else:
+            seq_ext = seq
+        gaps = (np.diff(seq_ext) - 1) % 65536
+        self.dropped_frames += int(gaps.sum())
+        self._last_seq = int(seq[-1])
+
+
+# =========================================================
+# ---------------- ASCII LINE DECODER ---------------------
+# =========================================================
+
+class LineDecoder:
+    """
+    Incremental decoder for the legacy ASCII format (one value per line).
+
+    Only complete lines are parsed; the partial last line is carried over
+    to the next feed() call.
+    """
+
+    def __init__(self):
+        self._pending = b""
+        self.lines_ok = 0
+        self.parse_errors = 0
+
+    def reset(self):
+        self._pending = b""
+
+    def stats(self):
+        return {
+            "lines_ok": self.lines_ok,
+            "parse_errors": self.parse_errors,
+        }
+
+    def feed(self, data):
+        """
+        Parses all complete lines in pending + data.
+
+        Returns:
+            (volts, None): the ASCII format carries no mux state
+        """
+        buf = self._pending + bytes(data)
+        cut = buf.rfind(b"\n") + 1
+        self._pending = buf[cut:]
+
+        tokens = buf[:cut].split()
+        if not tokens:
+            return np.empty(0, dtype=np.float64), None
+
+        try:
+            volts = np.array(tokens, dtype=np.float64)
+        except ValueError:
+            # Slow path only for batches containing garbage
+            values = []
+            for token in tokens:
+                try:
+                    values.append(float(token))
+                except ValueError:
+                    self.parse_errors += 1
+            volts = np.array(values, dtype=np.float64)
+
+        self.lines_ok += len(volts)
+        return volts, None
@@ -1,15 +1,352 @@
 """
 Peak detection and cardiac cycle analysis for ECG signals.
 Includes pacemaker trigger logic.
+
+Two ways to detect R peaks:
+    - detect_r_peaks(): batch detection over a whole window
+    - streaming engines, fed with new chunks only, that emit absolute
+      sample indices (O(new samples) per call):
+        StreamingPeakDetector  fixed threshold + local max
+        PanTompkinsDetector    Pan-Tompkins with adaptive thresholds
+      create_peak_detector() picks one by name (config.PEAK_DETECTOR).
 """
 
 import numpy as np
 import time
+from collections import deque
+from scipy import signal
+from . import config
 
 
 def detect_r_peaks(signal_data, threshold, distance):
     """
     Simple R-peak detector based on threshold and minimum distance.
+
+    Vectorized: local maxima above threshold are found with boolean masks,
+    and the minimum-distance rule is applied greedily over those
+    candidates only.
+
+    Returns:
+        np.ndarray: R-peak indices (int)
+    """
+    signal_data = np.asarray(signal_data, dtype=np.float64)
+    if len(signal_data) < 3:
+        return np.empty(0, dtype=np.intp)
+
+    mid = signal_data[1:-1]
+    candidates = np.flatnonzero(
+        (mid > threshold)
+        & (mid > signal_data[:-2])
+        & (mid > signal_data[2:])
+    ) + 1
+
+    return _enforce_min_distance(candidates, distance, -distance)
+
+
+def _enforce_min_distance(candidates, distance, last_peak):
+    """
+    Greedy left-to-right pass: keeps a candidate only if it is at least
+    `distance` samples after the last kept peak.
+    """
+    if len(candidates) == 0:
+        return candidates
+
+    # Fast path: every candidate already satisfies the distance
+    if candidates[0] - last_peak >= distance and (
+        len(candidates) == 1 or np.diff(candidates).min() >= distance
+    ):
+        return candidates
+
+    keep = []
+    for i in candidates.tolist():
+        if i - last_peak >= distance:
+            keep.append(i)
+            last_peak = i
+
+    return np.asarray(keep, dtype=candidates.dtype)
+
+
+# ==================================================
+# Detector incremental (streaming)
+# ==================================================
+
+class StreamingPeakDetector:
+    """
+    Stateful R-peak detector with the same semantics as detect_r_peaks().
+
+    Only the last two samples (needed by the local-max check on the chunk
+    boundary) and the last peak index (refractory / min distance) are
+    carried between calls, so feeding a stream chunk by chunk yields the
+    same peaks as running detect_r_peaks() over the whole stream.
+    """
+
+    def __init__(self, threshold=config.DEFAULT_R_THRESHOLD, distance=config.DEFAULT_R_DISTANCE):
+        self.threshold = threshold
+        self.distance = distance
+        self.reset()
+
+    def reset(self, start_index=0):
+        """
+        Forgets all context; the next sample fed has index start_index.
+        """
+        self._context = np.empty(0, dtype=np.float64)
+        self.next_index = start_index
+        self.last_peak = start_index - self.distance
+
+    def set_params(self, threshold, distance):
+        self.threshold = threshold
+        self.distance = distance
+
+    def feed(self, samples, start_index=None):
+        """
+        Processes a new chunk of samples.
+
+        Args:
+            samples: new samples, contiguous with the previous chunk
+            start_index: absolute index of samples[0]; if it does not follow
+                the previous chunk (gap or rewind) the detector is reset
+
+        Returns:
+            np.ndarray: absolute indices of the peaks confirmed by this chunk
+        """
+        samples = np.asarray(samples, dtype=np.float64)
+
+        if start_index is not None and start_index != self.next_index:
+            self.reset(start_index)
+
+        ext = np.concatenate((self._context, samples))
+        base = self.next_index - len(self._context)
+
+        self.next_index += len(samples)
+        self._context = ext[-2:]
+
+        if len(ext) < 3:
+            return np.empty(0, dtype=np.intp)
+
+        mid = ext[1:-1]
+        candidates = np.flatnonzero(
+            (mid > self.threshold)
+            & (mid > ext[:-2])
+            & (mid > ext[2:])
+        ) + (base + 1)
+
+        peaks = _enforce_min_distance(candidates, self.distance, self.last_peak)
+        if len(peaks):
+            self.last_peak = int(peaks[-1])
+
+        return peaks
+
+
+class PanTompkinsDetector:
+    """
+    Streaming Pan-Tompkins QRS detector.
+
+    Stages, each keeping its filter state (zi) between chunks:
+        bandpass 5-15 Hz (sosfilt) -> derivative (lfilter) -> squaring
+        -> moving-window integration over 150 ms (lfilter)
+
+    Local maxima of the integrated signal are classified with adaptive
+    signal/noise levels (SPKI / NPKI). If no beat is found within 166% of
+    the average RR, the largest noise peak above the second threshold is
+    taken (search-back). The first LEARNING_TIME seconds initialise the
+    levels. Memory is bounded: filter states, a short bandpassed history and
+    the noise peaks since the last beat.
+
+    Same interface as StreamingPeakDetector; `threshold` is ignored
+    (thresholds are adaptive) and `distance` is the refractory period.
+    """
+
+    LEARNING_TIME = 2.0
+    MAX_NOISE_PEAKS = 64
+
+    def __init__(self, threshold=None, distance=config.DEFAULT_R_DISTANCE, fs=config.SAMPLE_RATE):
+        self.fs = fs
+        self.threshold = threshold
+        self.distance = distance
+
+        self._bp_sos = signal.butter(2, [5, 15], btype="bandpass", fs=fs, output="sos")
+        self._deriv_b = np.array([1.0, 2.0, 0.0, -2.0, -1.0]) * (fs / 8.0)
+        self._mwi_len = max(1, int(round(0.150 * fs)))
+        self._mwi_b = np.full(self._mwi_len, 1.0 / self._mwi_len)
+
+        # Delay of the bandpass (samples), used to map peaks back to the input
+        _, gd = signal.group_delay(signal.sos2tf(self._bp_sos), w=[10.0], fs=fs)
+        self.bp_delay = int(round(gd[0]))
+        self._history_len = self._mwi_len + 2
+
+        self.reset()
+
+    def reset(self, start_index=0):
+        self.next_index = start_index
+
+        self._bp_zi = None
+        self._deriv_zi = np.zeros(len(self._deriv_b) - 1)
+        self._mwi_zi = np.zeros(self._mwi_len - 1)
+        self._bp_history = np.empty(0, dtype=np.float64)
+        self._mwi_context = np.empty(0, dtype=np.float64)
+
+        self._learn_remaining = int(self.LEARNING_TIME * self.fs)
+        self._learn_max = 0.0
+        self._learn_sum = 0.0
+        self._learn_count = 0
+
+        self.spki = 0.0
+        self.npki = 0.0
+        self.last_qrs = None
+        self._last_decay = start_index
+        self._rr_history = deque(maxlen=8)
+        self._noise_peaks = deque(maxlen=self.MAX_NOISE_PEAKS)
+
+    def set_params(self, threshold, distance):
+        self.threshold = threshold
+        self.distance = distance
+
+    @property
+    def threshold1(self):
+        return self.npki + 0.25 * (self.spki - self.npki)
+
+    @property
+    def rr_average(self):
+        if self._rr_history:
+            return sum(self._rr_history) / len(self._rr_history)
+        return self.fs
+
+    def feed(self, samples, start_index=None):
+        """
+        Processes a new chunk of samples.
+
+        Returns:
+            np.ndarray: absolute indices of the R peaks confirmed by this chunk
+        """
+        samples = np.asarray(samples, dtype=np.float64)
+
+        if start_index is not None and start_index != self.next_index:
+            self.reset(start_index)
+
+        n = len(samples)
+        if n == 0:
+            return np.empty(0, dtype=np.intp)
+
+        if self._bp_zi is None:
+            self._bp_zi = signal.sosfilt_zi(self._bp_sos) * samples[0]
+
+        bp, self._bp_zi = signal.sosfilt(self._bp_sos, samples, zi=self._bp_zi)
+        deriv, self._deriv_zi = signal.lfilter(self._deriv_b, 1.0, bp, zi=self._deriv_zi)
+        mwi, self._mwi_zi = signal.lfilter(self._mwi_b, 1.0, deriv * deriv, zi=self._mwi_zi)
+
+        base = self.next_index
+        self.next_index += n
+
+        bp_ext = np.concatenate((self._bp_history, bp))
+        bp_base = base - len(self._bp_history)
+        self._bp_history = bp_ext[-self._history_len:]
+
+        ext = np.concatenate((self._mwi_context, mwi))
+        ext_base = base - len(self._mwi_context)
+        self._mwi_context = ext[-2:]
+
+        # Learning phase: initialise signal / noise levels
+        first_valid = base
+        if self._learn_remaining > 0:
+            k = min(n, self._learn_remaining)
+            self._learn_max = max(self._learn_max, float(mwi[:k].max()))
+            self._learn_sum += float(mwi[:k].sum())
+            self._learn_count += k
+            self._learn_remaining -= k
+            first_valid = base + k
+
+            if self._learn_remaining > 0:
+                return np.empty(0, dtype=np.intp)
+
+            self.spki = self._learn_max / 3.0
+            self.npki = 0.5 * self._learn_sum / self._learn_count
+
+        peaks = []
+
+        if len(ext) >= 3:
+            mid = ext[1:-1]
+            local = np.flatnonzero((mid > ext[:-2]) & (mid >= ext[2:])) + 1
+            local = local[local + ext_base >= first_valid]
+
+            for i in local.tolist():
+                idx = ext_base + i
+                # Sample position of the R wave: largest |bandpass| in the
+                # integration window, shifted back by the bandpass delay
+                lo = max(0, idx - self._mwi_len - bp_base)
+                hi = idx - bp_base + 1
+                r_index = bp_base + lo + int(np.argmax(np.abs(bp_ext[lo:hi]))) - self.bp_delay
+
+                self._search_back(idx, peaks)
+                self._classify(idx, float(ext[i]), r_index, peaks)
+
+        self._search_back(self.next_index - 1, peaks)
+
+        return np.asarray(peaks, dtype=np.intp)
+
+    def _classify(self, idx, value, r_index, peaks):
+        if self.last_qrs is not None and idx - self.last_qrs < self.distance:
+            return
+
+        if value > self.threshold1:
+            self._accept(idx, value, r_index, peaks, 0.125)
+        else:
+            self.npki = 0.125 * value + 0.875 * self.npki
+            self._noise_peaks.append((idx, value, r_index))
+
+    def _search_back(self, now, peaks):
+        """
+        No beat for 1.66 x RR average: take the largest noise peak above
+        threshold2 = threshold1 / 2. If there is none, the signal level is
+        halved so a sudden amplitude drop (gain or lead change) is recovered.
+        """
+        if self.last_qrs is None:
+            return
+        if now - max(self.last_qrs, self._last_decay) <= 1.66 * self.rr_average:
+            return
+
+        if self._noise_peaks:
+            best = max(self._noise_peaks, key=lambda p: p[1])
+            if best[1] > 0.5 * self.threshold1:
+                self._accept(best[0], best[1], best[2], peaks, 0.25)
+                return
+
+        self.spki *= 0.5
+        self._last_decay = now
+
+    def _accept(self, idx, value, r_index, peaks, weight):
+        self.spki = weight * value + (1.0 - weight) * self.spki
+
+        if self.last_qrs is not None:
+            self._rr_history.append(idx - self.last_qrs)
+        self.last_qrs = idx
+
+        # Noise peaks before this beat are no longer search-back candidates
+        while self._noise_peaks and self._noise_peaks[0][0] <= idx:
+            self._noise_peaks.popleft()
+
+        peaks.append(r_index)
+
+
+PEAK_DETECTORS = {
+    "THRESHOLD": StreamingPeakDetector,
+    "PAN_TOMPKINS": PanTompkinsDetector,
+}
+
+
+def create_peak_detector(kind=None, threshold=config.DEFAULT_R_THRESHOLD, distance=config.DEFAULT_R_DISTANCE):
+    """
+    Builds a streaming detector by name (defaults to config.PEAK_DETECTOR).
+    """
+    kind = kind or config.PEAK_DETECTOR
+    if kind not in PEAK_DETECTORS:
+        raise ValueError(f"Unknown peak detector: {kind}")
+    return PEAK_DETECTORS[kind](threshold, distance)
+
+
+def _detect_r_peaks_loop(signal_data, threshold, distance):
+    """
+    Reference pure-Python implementation of detect_r_peaks
+    (kept for equivalence checks and benchmarks).
     """
     if len(signal_data) < 3:
         return []
@@ -0,0 +1,366 @@
+"""
+Blit-based ECG plot rendering.
+
+Each axes shows a monitor-style sweep: the x-axis is a fixed range of
+`window` samples and new data overwrites old data from left to right, with a
+small blank gap after the write head. Since the axis limits never change
+while sweeping, the static part of the figure (axes, grid, ticks, labels)
+is drawn once, cached, and every frame only restores it and redraws the
+trace artists.
+
+A full redraw (and a new cached background) happens only when the figure
+is resized or the window / Y range changes.
+
+Windows longer than the panel's pixel width are drawn as a min/max
+envelope per pixel column (see decimation.py), filled as a band: Agg
+fills a polygon in time proportional to its outline, while stroking the
+min/max zigzag costs the full height of every column, so a long noisy
+window would draw slower than a short one with the same point count.
+
+ECGPlotView lays out the panels (single lead or 3x2 grid) and renders
+analysis snapshots; it is shared by the Tk GUI and the headless benchmarks.
+"""
+
+import time
+from collections import deque
+import numpy as np
+from matplotlib.collections import PolyCollection
+
+from .decimation import MinMaxDecimator
+
+
+# Muestras en blanco delante del cabezal de barrido
+SWEEP_GAP = 20
+
+TRACE_WIDTH = 1.3
+
+
+class SweepPanel:
+    """
+    One axes with a sweeping ECG trace and its R-peak markers.
+    """
+
+    def __init__(self, ax, window, y_max):
+        self.ax = ax
+        self.line, = ax.plot([], [], linewidth=TRACE_WIDTH, animated=True)
+        # Envolvente min/max rellena (ventanas decimadas), del color de la traza
+        self.band = PolyCollection([], facecolors=self.line.get_color(),
+                                   edgecolors="none", linewidths=0, animated=True)
+        ax.add_collection(self.band, autolim=False)
+        self.peaks_line, = ax.plot([], [], 'ro', markersize=5, animated=True)
+
+        self.decimator = MinMaxDecimator()
+        self.window = None
+        self.y_max = None
+        self.bucket = None
+        self.configure(window, y_max)
+
+    def artists(self):
+        return (self.line, self.band, self.peaks_line)
+
+    def configure(self, window, y_max):
+        """
+        Sets the fixed axis ranges and the decimation bucket
+        (samples per pixel column, 1 = no decimation).
+
+        Returns:
+            bool: True if the limits changed (background must be redrawn)
+        """
+        window = max(2, int(window))
+        columns = max(1, int(self.ax.bbox.width))
+        bucket = -(-window // columns)
+        if bucket < 3:
+            # Fewer than ~2 points per column: min/max would not reduce anything
+            bucket = 1
+
+        if window == self.window and y_max == self.y_max and bucket == self.bucket:
+            return False
+
+        self.window = window
+        self.y_max = y_max
+        self.bucket = bucket
+
+        # Sweep width: whole buckets, so bucket k always lands on column k % n_columns
+        self.n_columns = -(-window // bucket)
+        self.width = self.n_columns * bucket
+
+        if bucket == 1:
+            self._x = np.arange(self.width)
+            self._y = np.full(self.width, np.nan)
+        else:
+            # One (min, max) pair per column
+            self._x = np.arange(self.n_columns) * bucket + bucket // 2
+            self._mins = np.full(self.n_columns, np.nan)
+            self._maxs = np.full(self.n_columns, np.nan)
+            # Half the trace width in data units: a flat stretch stays
+            # as thick as the undecimated line
+            height = max(1.0, self.ax.bbox.height)
+            self._pad = TRACE_WIDTH * self.ax.figure.dpi / 72.0 * y_max / height
+
+        self.ax.set_xlim(0, self.width - 1)
+        self.ax.set_ylim(-y_max, y_max)
+        return True
+
+    def update(self, end, values, peak_indices=(), peak_values=(), gain=1.0, source=None):
+        """
+        Places the last len(values) samples, ending at absolute index `end`,
+        at their sweep position (absolute index % width), scaled by gain.
+
+        Args:
+            source: identifies the stream (lead) for the decimation cache
+        """
+        width = self.width
+        n = min(len(values), width)
+        values = values[len(values) - n:]
+
+        # Blank gap ahead of the write head: the oldest samples are hidden
+        hidden = max(0, n - (width - min(SWEEP_GAP, width - 1)))
+
+        if self.bucket == 1:
+            self._y[:] = np.nan
+            if n:
+                self._place_samples(end, values * gain, hidden)
+            self.line.set_data(self._x, self._y)
+            self.band.set_verts([])
+        else:
+            self._mins[:] = np.nan
+            self._maxs[:] = np.nan
+            if n:
+                hidden = -(-hidden // self.bucket) * self.bucket if hidden else 0
+                self._place_envelope(end, values, gain, hidden, source)
+            self.line.set_data([], [])
+            self.band.set_verts(self._band_polygons())
+
+        peak_indices = np.asarray(peak_indices, dtype=np.int64)
+        peak_values = np.asarray(peak_values, dtype=np.float64)
+        visible = peak_indices >= end - n + hidden
+        self.peaks_line.set_data(peak_indices[visible] % width, peak_values[visible])
+
+    def _place_samples(self, end, values, hidden):
+        width = self.width
+        n = len(values)
+        y = self._y
+        head = end % width
+
+        # Samples [end - n, end) occupy positions head - n .. head - 1 (wrapping)
+        first = min(n, head)
+        y[head - first:head] = values[n - first:]
+        if n > first:
+            y[width - (n - first):] = values[:n - first]
+
+        if hidden:
+            y[(head + np.arange(hidden)) % width] = np.nan
+
+    def _place_envelope(self, end, values, gain, hidden, source):
+        keys, mins, maxs = self.decimator.reduce(values, end, self.bucket, source)
+
+        # Drop the oldest buckets that fall in the gap
+        keep = keys * self.bucket >= end - len(values) + hidden
+        keys, mins, maxs = keys[keep], mins[keep] * gain, maxs[keep] * gain
+
+        columns = keys % self.n_columns
+        self._mins[columns] = mins
+        self._maxs[columns] = maxs
+
+    def _band_polygons(self):
+        """
+        One polygon (max edge forward, min edge back) per run of filled
+        columns; the sweep gap splits the band in at most two runs.
+        """
+        valid = ~np.isnan(self._mins)
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], valid.view(np.int8), [0]))))
+        polygons = []
+        for a, b in zip(edges[::2], edges[1::2]):
+            x = self._x[a:b]
+            upper = self._maxs[a:b] + self._pad
+            lower = self._mins[a:b] - self._pad
+            polygons.append(np.concatenate((
+                np.column_stack((x, upper)),
+                np.column_stack((x[::-1], lower[::-1])),
+            )))
+        return polygons
+
+
+class BlitRenderer:
+    """
+    Caches the static background of a figure and redraws only the
+    animated artists of its panels on each frame.
+    """
+
+    def __init__(self, canvas, panels):
+        self.canvas = canvas
+        self.figure = canvas.figure
+        self.panels = list(panels)
+        self._backgrounds = None
+
+        self.frame_durations = deque(maxlen=100)
+        self.frame_times = deque(maxlen=100)
+
+        # Any full draw (first show, resize, limits change) refreshes the cache
+        self._cid = canvas.mpl_connect("draw_event", self._on_draw)
+
+    def _on_draw(self, event):
+        # One background per axes, so panels can be refreshed independently
+        self._backgrounds = [self.canvas.copy_from_bbox(p.ax.bbox) for p in self.panels]
+        for panel in self.panels:
+            self._draw_panel(panel)
+
+    @staticmethod
+    def _draw_panel(panel):
+        for artist in panel.artists():
+            panel.ax.draw_artist(artist)
+
+    def set_panels(self, panels):
+        self.panels = list(panels)
+        self.invalidate()
+
+    @property
+    def needs_full_redraw(self):
+        return self._backgrounds is None
+
+    def invalidate(self):
+        """
+        Forces a full redraw on the next frame (new background).
+        """
+        self._backgrounds = None
+
+    def render(self, dirty=None):
+        """
+        Draws one frame. Only the panels in `dirty` (default: all) are
+        restored, redrawn and blitted; the others keep their pixels.
+        """
+        t0 = time.perf_counter()
+
+        if self._backgrounds is None:
+            # Full redraw; draw_event caches the new backgrounds
+            self.canvas.draw()
+        else:
+            for panel, background in zip(self.panels, self._backgrounds):
+                if dirty is not None and panel not in dirty:
+                    continue
+                self.canvas.restore_region(background)
+                self._draw_panel(panel)
+                self.canvas.blit(panel.ax.bbox)
+
+        t1 = time.perf_counter()
+        self.frame_durations.append(t1 - t0)
+        self.frame_times.append(t1)
+
+    def stats(self):
+        """
+        Returns (frames per second, average ms per frame) over recent frames.
+        """
+        fps = 0.0
+        if len(self.frame_times) > 1:
+            span = self.frame_times[-1] - self.frame_times[0]
+            if span > 0:
+                fps = (len(self.frame_times) - 1) / span
+
+        ms = 0.0
+        if self.frame_durations:
+            ms = 1e3 * sum(self.frame_durations) / len(self.frame_durations)
+
+        return fps, ms
+
+
+class ECGPlotView:
+    """
+    Panel layout of the ECG figure and rendering of analysis snapshots.
+
+    Either one panel that follows the MUX (key None) or a 3x2 grid with a
+    panel per derivation, all sharing one BlitRenderer. Holds no Tk state:
+    the GUI embeds the canvas in Tk, benchmarks use an Agg canvas.
+    """
+
+    def __init__(self, canvas, lead_labels):
+        self.canvas = canvas
+        self.figure = canvas.figure
+        self.lead_labels = dict(lead_labels)
+        self.renderer = BlitRenderer(canvas, [])
+
+        self.lead_panels = {}
+        self.panel_keys = {}
+        self.single_view_lead = None
+        self.ax = None
+
+    def build(self, show_all, current, window, y_max):
+        """
+        Creates either one panel (current derivation) or a 3x2 grid with
+        all derivations, in the same figure and with one shared renderer.
+        """
+        self.figure.clear()
+
+        # lead -> panel; in single view the panel follows the MUX
+        self.lead_panels = {}
+        self.panel_keys = {}
+
+        if show_all:
+            axes = self.figure.subplots(3, 2, sharex=True, sharey=True).ravel()
+            for lead, ax in zip(self.lead_labels, axes):
+                ax.set_title(self.lead_labels[lead], fontsize=9, loc="left")
+                ax.grid(True, alpha=0.3)
+                self.lead_panels[lead] = SweepPanel(ax, window, y_max)
+            self.ax = axes[0]
+        else:
+            self.ax = self.figure.add_subplot(1, 1, 1)
+            self.ax.set_ylabel("Voltage (V)")
+            self.ax.set_xlabel("Samples (sweep)")
+            self.ax.grid(True, alpha=0.3)
+            # Monitor-style sweep: fixed x range, only the traces are blitted
+            self.lead_panels[None] = SweepPanel(self.ax, window, y_max)
+            self.set_single_title(current)
+
+        self.figure.tight_layout()
+        self.renderer.set_panels(self.lead_panels.values())
+
+    def set_single_title(self, current):
+        self.ax.set_title(f"ECG Signal - {self.lead_labels[current]}")
+        self.single_view_lead = current
+
+    @staticmethod
+    def visible_peaks(snapshot, lead, first, end):
+        events = snapshot.peaks[lead]
+        return events[(events >= first) & (events < end)]
+
+    def render_snapshot(self, snapshot, get_signal, current, window, y_max, gain):
+        """
+        Draws the latest analysis results. Samples are zero-copy views of
+        the lead buffers (get_signal(lead, n, end)) up to the indices the
+        snapshot analysed.
+
+        Returns:
+            int: panels redrawn
+        """
+        if None in self.lead_panels and self.single_view_lead != current:
+            # Single view follows the MUX: new title -> new background
+            self.set_single_title(current)
+            self.renderer.invalidate()
+
+        dirty = []
+        for key, panel in self.lead_panels.items():
+            lead = current if key is None else key
+            end = snapshot.ends[lead]
+
+            # Limits only change with the window / Y range controls;
+            # then the cached backgrounds are rebuilt with a full redraw
+            if panel.configure(window, y_max):
+                self.renderer.invalidate()
+
+            # Panels without new data (and same settings) are not redrawn
+            panel_key = (lead, end, gain, window, y_max)
+            if self.panel_keys.get(key) == panel_key:
+                continue
+            self.panel_keys[key] = panel_key
+
+            # Unscaled view; the panel applies the gain (after decimation)
+            y = get_signal(lead, panel.width, end)
+            first = end - len(y)
+            peaks = self.visible_peaks(snapshot, lead, first, end)
+
+            panel.update(end, y, peaks, y[peaks - first] * gain, gain, lead)
+            dirty.append(panel)
+
+        if dirty or self.renderer.needs_full_redraw:
+            self.renderer.render(dirty)
+
+        return len(dirty)
@@ -0,0 +1,164 @@
+"""
+Pseudo-terminal stand-in for the ESP32 (POSIX only).
+
+PtyDevice opens a pty pair and behaves like the acquisition board on the
+slave side: it streams the synthetic 6-lead ECG of FakeSerialReader at the
+real sample rate, as binary frames or as legacy ASCII lines (the lead
+selected with the last STATEn command), and answers the commands the
+firmware understands (STATEn, PACE). Any serial backend can open
+`device.port` as if it were the real port.
+
+Usage:
+    python -m src.pty_device [--fs 500] [--protocol ASCII]
+    python main.py --async-serial --port /dev/pts/N
+"""
+
+import argparse
+import os
+import threading
+import time
+import tty
+
+import numpy as np
+
+from . import config
+from .fake_serial import FakeSerialReader
+from .packet_protocol import encode_block
+
+
+class PtyDevice:
+
+    def __init__(self, fs=config.SAMPLE_RATE, protocol="BINARY", block_seconds=0.02, seed=0):
+        self.fs = fs
+        self.protocol = protocol
+        self.block_seconds = block_seconds
+        self.generator = FakeSerialReader(None, fs=fs, seed=seed)
+
+        self.master, self._slave = os.openpty()
+        # Sin eco ni traducción de fin de línea: bytes tal cual
+        tty.setraw(self._slave)
+        os.set_blocking(self.master, False)
+        self.port = os.ttyname(self._slave)
+
+        self.running = False
+        self.mux_state = 0
+        self.commands = []
+        self._seq = 0
+        self._out = b""
+        self._in = b""
+
+        # Metrics
+        self.bytes_sent = 0
+        self.dropped_bytes = 0
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if getattr(self, "thread", None) is not None:
+            self.thread.join()
+        for fd in (self.master, self._slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # =========================================================
+    # ---------------- DEVICE LOOP ----------------------------
+    # =========================================================
+
+    def _run(self):
+        start = time.monotonic()
+        k = config.FRAME_SAMPLES
+        while self.running:
+            self._read_commands()
+
+            owed = int((time.monotonic() - start) * self.fs) - self.generator.produced
+            owed -= owed % k
+            if owed > 0:
+                self._out += self._encode(self.generator.generate(owed))
+            self._write()
+
+            time.sleep(self.block_seconds)
+
+    def _encode(self, block):
+        if self.protocol == "BINARY":
+            data, self._seq = encode_block(self._seq, block)
+            return data
+        # Firmware antiguo: una línea por muestra de la derivación del MUX
+        lines = np.char.mod("%.4f\n", block[:, self.mux_state])
+        return "".join(lines).encode()
+
+    def _write(self):
+        if not self._out:
+            return
+        try:
+            n = os.write(self.master, self._out)
+        except BlockingIOError:
+            n = 0
+        self.bytes_sent += n
+        self._out = self._out[n:]
+
+        # Nadie lee el puerto: como la UART real, se pierde lo que no cabe
+        limit = int(self.fs * 6 * 16)
+        if len(self._out) > limit:
+            self.dropped_bytes += len(self._out) - limit
+            self._out = self._out[-limit:]
+
+    def _read_commands(self):
+        try:
+            self._in += os.read(self.master, 4096)
+        except (BlockingIOError, OSError):
+            return
+
+        *lines, self._in = self._in.split(b"\n")
+        for line in lines:
+            command = line.decode(errors="replace").strip()
+            if not command:
+                continue
+            self.commands.append(command)
+            if command.startswith("STATE"):
+                # "STATEn" o "STATE_n"; el firmware ignora un número inválido
+                try:
+                    state = int(command.removeprefix("STATE").removeprefix("_"))
+                except ValueError:
+                    continue
+                self.mux_state = state % config.TOTAL_DERIVATIONS
+            elif command == config.PACE_COMMAND:
+                self.generator.send_pace_command()
+
+    def stats(self):
+        return {
+            "port": self.port,
+            "bytes_sent": self.bytes_sent,
+            "dropped_bytes": self.dropped_bytes,
+            "commands": len(self.commands),
+            "mux_state": self.mux_state,
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="pty stand-in for the ESP32")
+    parser.add_argument("--fs", type=int, default=config.SAMPLE_RATE)
+    parser.add_argument("--protocol", default="BINARY", choices=("BINARY", "ASCII"))
+    args = parser.parse_args()
+
+    device = PtyDevice(args.fs, args.protocol).start()
+    print("Device port:", device.port)
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    device.stop()
+    print(device.stats())
@@ -0,0 +1,382 @@
+"""
+Session recording to a memory-mapped binary file.
+
+File layout (<name>.ecg):
+    header   HEADER_SIZE bytes: magic, record count (u64), JSON length (u32),
+             JSON metadata (sample rate, lead map, start time, record dtype)
+    records  RECORD_DTYPE rows, one per sample: raw and filtered value and
+             the derivation it belongs to. Rows of one lead, in order, are
+             that lead's samples from its start index on, minus the gaps
+             listed in the index.
+
+Sidecar index (<name>.idx.jsonl), one JSON object per line:
+    {"type": "start", "t": s, "lead": l, "index": i}  first lead sample index
+    {"type": "time", "t": s, "record": r}            seek points
+    {"type": "peak", "t": s, "lead": l, "index": i}  R peaks (lead sample index)
+    {"type": "mux",  "t": s, "record": r, "state": m, "label": name}
+    {"type": "gap",  "t": s, "lead": l, "index": i, "samples": n}
+Times are seconds since the session start. Lead sample indices are those of
+the live session (recording may start mid-session): a sample's row is found
+from the lead's start index and the gaps before it. The start indices are
+also kept in the header ("lead_starts").
+
+Producers (the analysis worker) only copy blocks into a queue; a
+background thread groups them and writes large blocks to the memmap, so
+acquisition and analysis never wait for the disk. The file grows in steps of
+RECORDING_PREALLOC_SECONDS and the record count in the header is updated on
+every flush, so an interrupted session is still readable.
+"""
+
+import json
+import os
+import queue
+import struct
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from . import config
+from .instrumentation import PERF
+
+
+MAGIC = b"ECGREC\x00\x01"
+HEADER_SIZE = 4096
+_HEADER_FIELDS = struct.Struct("<8sQI")
+
+RECORD_DTYPE = np.dtype([
+    ("raw", "<f4"),
+    ("filtered", "<f4"),
+    ("lead", "<u1"),
+])
+
+_BLOCK = 0
+_PEAKS = 1
+_MUX = 2
+_STOP = 3
+
+
+class SessionRecorder(threading.Thread):
+
+    def __init__(self, lead_labels, name=None, directory=config.RECORDING_DIR,
+                 sample_rate=config.SAMPLE_RATE, max_queue=10000):
+        super().__init__(daemon=True)
+        self.running = True
+        self.sample_rate = sample_rate
+        self.lead_labels = dict(lead_labels)
+
+        self.start_time = time.time()
+        if name is None:
+            name = time.strftime("session_%Y%m%d_%H%M%S", time.localtime(self.start_time))
+
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, name + ".ecg")
+        self.index_path = os.path.join(directory, name + ".idx.jsonl")
+
+        self.header = {
+            "version": 1,
+            "sample_rate": sample_rate,
+            "leads": {str(k): v for k, v in self.lead_labels.items()},
+            "start_time": self.start_time,
+            "start_iso": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.start_time)),
+            "record_dtype": RECORD_DTYPE.descr,
+            "lead_starts": {},
+        }
+
+        self._file = open(self.path, "w+b")
+        self._index_file = open(self.index_path, "w")
+        self._memmap = None
+        self._capacity = 0
+        self.n_records = 0
+        self._write_header()
+        self._grow(0)
+
+        self.blocks = queue.Queue(maxsize=max_queue)
+        self._pending = []
+        self._pending_records = 0
+        self._pending_index = []
+        self._next_record = 0          # records assigned (written + pending)
+        self._last_index_time = None
+        self._mux = None
+
+        # Producer side: first sample index of each lead, and gaps left by
+        # blocks dropped on a full queue (written by the next flush)
+        self.lead_starts = {}
+        self._dropped_gaps = deque()
+        self._announced = set()
+
+        # Metrics
+        self.dropped_blocks = 0
+        self.dropped_samples = 0
+        self.flushes = 0
+        self.write_time = 0.0
+
+    # =========================================================
+    # ---------------- PRODUCER SIDE --------------------------
+    # =========================================================
+
+    def _put(self, item, n_samples=0):
+        if not self.running:
+            return False
+        try:
+            self.blocks.put_nowait(item)
+        except queue.Full:
+            # Disk too slow: drop instead of stalling the caller
+            self.dropped_blocks += 1
+            self.dropped_samples += n_samples
+            PERF.count("recorder.dropped_samples", n_samples)
+            return False
+        return True
+
+    def record(self, lead, start, raw, filtered, skipped=0):
+        """
+        Queues one block of a derivation: samples [start, start + n) of
+        raw and filtered (copied, the caller may reuse its buffers).
+        """
+        if not self.running:
+            return
+        raw = np.array(raw, dtype=np.float32)
+        filtered = np.array(filtered, dtype=np.float32)
+        self.lead_starts.setdefault(lead, start - skipped)
+
+        t = time.time()
+        if not self._put((_BLOCK, t, lead, start, raw, filtered, skipped), len(raw)):
+            # Sin filas para este bloque: hueco en el índice para no desalinear la derivación
+            self._dropped_gaps.append(
+                {"type": "gap", "t": t - self.start_time, "lead": lead,
+                 "index": start - skipped, "samples": skipped + len(raw)}
+            )
+
+    def record_peaks(self, lead, peaks, end):
+        """
+        Queues R peaks (lead sample indices); `end` is the lead's write index.
+        """
+        self._put((_PEAKS, time.time(), lead, [int(p) for p in peaks], end))
+
+    def note_mux(self, state):
+        """
+        Logs a MUX switch (no-op if the state did not change).
+        """
+        if state != self._mux:
+            self._mux = state
+            self._put((_MUX, time.time(), state))
+
+    def close(self):
+        """
+        Stops recording, writes what is queued and closes the files.
+        """
+        if self.running:
+            self.running = False
+            self.blocks.put((_STOP,))
+        if self.is_alive():
+            self.join()
+        elif not self._file.closed:
+            self._finalize()
+
+    # =========================================================
+    # ---------------- WRITER THREAD --------------------------
+    # =========================================================
+
+    def run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self.blocks.get(timeout=config.RECORDING_FLUSH_INTERVAL)
+            except queue.Empty:
+                item = None
+
+            if item is not None:
+                if item[0] == _STOP:
+                    break
+                self._handle(item)
+
+            if (self._pending_records >= config.RECORDING_BLOCK_RECORDS
+                    or time.monotonic() - last_flush >= config.RECORDING_FLUSH_INTERVAL):
+                self._flush()
+                last_flush = time.monotonic()
+
+        # Lo que quede en la cola se escribe antes de cerrar
+        while True:
+            try:
+                item = self.blocks.get_nowait()
+            except queue.Empty:
+                break
+            if item[0] != _STOP:
+                self._handle(item)
+        self._finalize()
+
+    def _handle(self, item):
+        kind, t = item[0], item[1] - self.start_time
+
+        if kind == _BLOCK:
+            _, _, lead, start, raw, filtered, skipped = item
+            if skipped:
+                self._pending_index.append(
+                    {"type": "gap", "t": t, "lead": lead, "index": start - skipped, "samples": skipped}
+                )
+
+            if self._last_index_time is None or t - self._last_index_time >= config.RECORDING_INDEX_INTERVAL:
+                self._pending_index.append({"type": "time", "t": t, "record": self._next_record})
+                self._last_index_time = t
+
+            rows = np.empty(len(raw), dtype=RECORD_DTYPE)
+            rows["raw"] = raw
+            rows["filtered"] = filtered
+            rows["lead"] = lead
+            self._pending.append(rows)
+            self._pending_records += len(rows)
+            self._next_record += len(rows)
+
+        elif kind == _PEAKS:
+            _, _, lead, peaks, end = item
+            for peak in peaks:
+                self._pending_index.append({
+                    "type": "peak",
+                    "t": t - (end - peak) / self.sample_rate,
+                    "lead": lead,
+                    "index": peak,
+                })
+
+        elif kind == _MUX:
+            state = item[2]
+            self._pending_index.append({
+                "type": "mux",
+                "t": t,
+                "record": self._next_record,
+                "state": state,
+                "label": self.lead_labels.get(state),
+            })
+
+    def _flush(self):
+        new_leads = self._index_producer_events()
+        if not self._pending and not self._pending_index:
+            return
+
+        t0 = time.perf_counter()
+        if self._pending:
+            data = np.concatenate(self._pending)
+            self._pending = []
+            self._pending_records = 0
+
+            n = self.n_records
+            if n + len(data) > self._capacity:
+                self._grow(n + len(data))
+            self._memmap[n:n + len(data)] = data
+            self._memmap.flush()
+            self.n_records = n + len(data)
+            self._write_header()
+        elif new_leads:
+            self._write_header()
+
+        if self._pending_index:
+            self._index_file.write("".join(json.dumps(e) + "\n" for e in self._pending_index))
+            self._index_file.flush()
+            self._pending_index = []
+
+        self.flushes += 1
+        self.write_time += time.perf_counter() - t0
+
+    def _index_producer_events(self):
+        """
+        Moves lead start indices and dropped-block gaps into the index.
+        Returns True if a lead start was added (header to rewrite).
+        """
+        new_leads = False
+        for lead, index in list(self.lead_starts.items()):
+            if lead not in self._announced:
+                self._announced.add(lead)
+                new_leads = True
+                self.header["lead_starts"][str(lead)] = index
+                self._pending_index.append({
+                    "type": "start", "t": time.time() - self.start_time, "lead": lead, "index": index,
+                })
+        while self._dropped_gaps:
+            self._pending_index.append(self._dropped_gaps.popleft())
+        return new_leads
+
+    def _grow(self, min_records):
+        """
+        Extends the file (and remaps it) to hold at least min_records.
+        """
+        step = config.RECORDING_PREALLOC_SECONDS * self.sample_rate
+        capacity = max(min_records, self._capacity + step)
+
+        if self._memmap is not None:
+            self._memmap.flush()
+            self._memmap = None
+
+        self._file.truncate(HEADER_SIZE + capacity * RECORD_DTYPE.itemsize)
+        self._memmap = np.memmap(self._file, dtype=RECORD_DTYPE, mode="r+",
+                                 offset=HEADER_SIZE, shape=(capacity,))
+        self._capacity = capacity
+
+    def _write_header(self):
+        meta = json.dumps(self.header).encode()
+        if _HEADER_FIELDS.size + len(meta) > HEADER_SIZE:
+            raise ValueError("recording header too large")
+
+        self._file.seek(0)
+        self._file.write(_HEADER_FIELDS.pack(MAGIC, self.n_records, len(meta)) + meta)
+        self._file.flush()
+
+    def _finalize(self):
+        self._flush()
+        self._memmap = None
+        # Se libera el espacio preasignado que no se usó
+        self._file.truncate(HEADER_SIZE + self.n_records * RECORD_DTYPE.itemsize)
+        self._file.close()
+        self._index_file.close()
+
+    # =========================================================
+    # ---------------- METRICS --------------------------------
+    # =========================================================
+
+    def stats(self):
+        return {
+            "records": self.n_records,
+            "bytes": HEADER_SIZE + self.n_records * RECORD_DTYPE.itemsize,
+            "queued_blocks": self.blocks.qsize(),
+            "dropped_blocks": self.dropped_blocks,
+            "dropped_samples": self.dropped_samples,
+            "flushes": self.flushes,
+            "write_time": self.write_time,
+        }
+
+
+# =========================================================
+# ---------------- READING ---------------------------------
+# =========================================================
+
+def load_session(path):
+    """
+    Opens a recording read-only.
+
+    Returns:
+        (header dict, records memmap of RECORD_DTYPE)
+    """
+    with open(path, "rb") as f:
+        magic, n_records, meta_len = _HEADER_FIELDS.unpack(f.read(_HEADER_FIELDS.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not an ECG recording")
+        header = json.loads(f.read(meta_len))
+
+    header["leads"] = {int(k): v for k, v in header["leads"].items()}
+    header["lead_starts"] = {int(k): v for k, v in header.get("lead_starts", {}).items()}
+    if n_records == 0:
+        return header, np.empty(0, dtype=RECORD_DTYPE)
+
+    records = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_SIZE, shape=(n_records,))
+    return header, records
+
+
+def load_index(path):
+    """
+    Reads a sidecar index (.idx.jsonl) into a list of dicts.
+    """
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def index_path_for(path):
+    return os.path.splitext(path)[0] + ".idx.jsonl"
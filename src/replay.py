@@ -0,0 +1,462 @@
+"""
+Replay of recorded ECG data.
+
+ReplayReader has the same interface as SerialReader / FakeSerialReader
+(start, stop, send_command, send_mux_command, send_pace_command) and feeds
+AppState in blocks, at N x real time or as fast as the analysis worker can
+keep up ("max"), so the whole pipeline can be benchmarked on real data.
+
+Supported inputs (open_source picks one by extension):
+    .ecg        session recorded by recorder.SessionRecorder (memory-mapped;
+                MUX switches, seek points, lead start indices and gaps
+                come from the sidecar index)
+    .hea/.dat   WFDB record, format 16, optional byte offset (memory-mapped)
+    .csv/.txt   one column per derivation, optional header with lead names
+                and an optional time column
+
+Every source is a sequence of records in arrival order (value + derivation);
+multi-lead files are interleaved frame by frame (I, II, ..., I, II, ...).
+A session is rebuilt with the lead sample indices of the live one: each
+lead starts at its recorded start index and skips the recorded gaps.
+
+Usage:
+    python main.py --replay recordings/session_x.ecg --speed 10
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+
+from . import config
+from .recorder import load_session, load_index, index_path_for
+
+
+# Duración de señal entregada por bloque (segundos)
+REPLAY_BLOCK_SECONDS = 0.02
+
+# Registros por bloque en modo "max"
+REPLAY_MAX_BLOCK = 4096
+
+LEAD_NAMES = {"I": 0, "II": 1, "III": 2, "AVR": 3, "AVL": 4, "AVF": 5}
+TIME_COLUMNS = ("t", "time", "seconds", "elapsed time")
+
+
+# =========================================================
+# ---------------- SOURCES --------------------------------
+# =========================================================
+
+class SessionSource:
+    """
+    A recording made by SessionRecorder.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.header, self.records = load_session(path)
+        self.sample_rate = self.header["sample_rate"]
+        self.n_records = len(self.records)
+
+        index_path = index_path_for(path)
+        index = load_index(index_path) if os.path.exists(index_path) else []
+
+        times = [(e["t"], e["record"]) for e in index if e["type"] == "time"]
+        self.mux_events = [(e["record"], e["state"]) for e in index if e["type"] == "mux"]
+
+        self.lead_starts = dict(self.header["lead_starts"])
+        for e in index:
+            if e["type"] == "start":
+                self.lead_starts.setdefault(e["lead"], e["index"])
+        self.gaps = _gap_records(self.records["lead"], self.lead_starts,
+                                 [e for e in index if e["type"] == "gap"])
+
+        # Leads present at the start give the records-per-second fallback
+        head = self.records["lead"][:6 * self.sample_rate]
+        rate = self.sample_rate * max(1, len(np.unique(head)))
+        self.seek_times, self.seek_records = _seek_table(times, self.n_records, rate)
+
+    def read(self, start, stop):
+        block = self.records[start:stop]
+        return block["raw"].astype(np.float64), block["lead"]
+
+
+class FrameSource:
+    """
+    Multi-lead frames (n_frames x n_leads) with per-column scaling:
+        volts = (frames - baseline) / gain
+    """
+
+    def __init__(self, path, frames, leads, sample_rate, gain=1.0, baseline=0.0):
+        self.path = path
+        self.frames = frames
+        self.leads = np.asarray(leads, dtype=np.uint8)
+        self.gain = np.asarray(gain, dtype=np.float64)
+        self.baseline = np.asarray(baseline, dtype=np.float64)
+        self.sample_rate = sample_rate
+        self.mux_events = []
+        self.lead_starts = {}
+        self.gaps = []
+
+        self.width = len(self.leads)
+        self.n_records = len(frames) * self.width
+        self.seek_times, self.seek_records = _seek_table([], self.n_records, sample_rate * self.width)
+
+    def read(self, start, stop):
+        k = self.width
+        first, last = start // k, -(-stop // k)
+        block = (self.frames[first:last] - self.baseline) / self.gain
+        offset = start - first * k
+        volts = block.reshape(-1)[offset:offset + stop - start]
+        leads = np.tile(self.leads, last - first)[offset:offset + stop - start]
+        return volts, leads
+
+
+def _seek_table(points, n_records, rate):
+    """
+    (times, records) arrays for np.interp, extended to the last record
+    at `rate` records per second.
+    """
+    points = sorted(points)
+    if not points or points[0][1] > 0:
+        t0 = points[0][0] - points[0][1] / rate if points else 0.0
+        points.insert(0, (t0, 0))
+
+    t_last, r_last = points[-1]
+    if n_records > r_last:
+        points.append((t_last + (n_records - r_last) / rate, n_records))
+
+    times, records = zip(*points)
+    return np.asarray(times, dtype=np.float64), np.asarray(records, dtype=np.float64)
+
+
+def _gap_records(record_leads, starts, gaps):
+    """
+    Places the recorded gaps ({"lead", "index", "samples"}, live lead
+    sample indices) in the record stream.
+
+    Returns:
+        sorted [(record, lead, samples)]: `samples` lead indices are
+        skipped before `record` (n_records for a gap at the end)
+    """
+    placed = []
+    by_lead = {}
+    for gap in gaps:
+        by_lead.setdefault(gap["lead"], []).append(gap)
+
+    for lead, lead_gaps in by_lead.items():
+        rows = np.flatnonzero(record_leads == lead)
+        start = starts.get(lead, 0)
+        missing = 0
+        for gap in sorted(lead_gaps, key=lambda g: g["index"]):
+            # Filas de la derivación grabadas antes del hueco
+            count = gap["index"] - start - missing
+            record = int(rows[count]) if 0 <= count < len(rows) else len(record_leads)
+            placed.append((record, lead, gap["samples"]))
+            missing += gap["samples"]
+    return sorted(placed)
+
+
+def _map_leads(names):
+    """
+    Derivation of each column by name; if no name is a known lead
+    (unnamed columns), columns are taken in order as I, II, III...
+    Returns a list with None for the columns to skip.
+    """
+    # Nombre completo o su última palabra ("ECG lead II" -> II)
+    leads = [LEAD_NAMES.get(name.strip().upper(), LEAD_NAMES.get((name.split() or [""])[-1].upper()))
+             for name in names]
+    if all(lead is None for lead in leads):
+        leads = list(range(len(names)))
+    return [lead if lead is not None and lead < config.TOTAL_DERIVATIONS else None for lead in leads]
+
+
+def _parse_wfdb_format(spec):
+    """
+    Signal format field: format[xsamples_per_frame][:skew][+byte_offset].
+
+    Returns:
+        (format, samples per frame, skew, byte offset) as ints
+    """
+    spec, _, offset = spec.partition("+")
+    spec, _, skew = spec.partition(":")
+    fmt, _, per_frame = spec.partition("x")
+    return int(fmt), int(per_frame or 1), int(skew or 0), int(offset or 0)
+
+
+def load_wfdb(path):
+    """
+    WFDB record (format 16, one sample per frame, no skew; a byte offset
+    is allowed). `path` is the .hea or .dat file.
+    """
+    base = os.path.splitext(path)[0]
+    with open(base + ".hea") as f:
+        # Hasta 9 campos: la descripción (el último) puede tener espacios
+        lines = [line.split(maxsplit=8) for line in f if line.strip() and not line.startswith("#")]
+
+    record_line, signal_lines = lines[0], lines[1:]
+    n_signals = int(record_line[1])
+    sample_rate = float(record_line[2].split("/")[0]) if len(record_line) > 2 else config.SAMPLE_RATE
+
+    gains, baselines, names, offsets = [], [], [], set()
+    for fields in signal_lines[:n_signals]:
+        fmt, per_frame, skew, offset = _parse_wfdb_format(fields[1])
+        if fmt != 16 or per_frame != 1 or skew != 0:
+            raise ValueError(f"{path}: unsupported WFDB signal format {fields[1]!r} "
+                             "(only format 16, one sample per frame, no skew)")
+        offsets.add(offset)
+
+        # gain(baseline)/units
+        adc = fields[2].split("/")[0] if len(fields) > 2 else "200"
+        if "(" in adc:
+            gain, baseline = adc.rstrip(")").split("(")
+        else:
+            gain, baseline = adc, fields[4] if len(fields) > 4 else "0"
+        gains.append(float(gain) or 200.0)
+        baselines.append(float(baseline))
+        names.append(fields[8].strip() if len(fields) > 8 else "")
+
+    if len(offsets) > 1:
+        raise ValueError(f"{path}: signals with different byte offsets are not supported")
+
+    dat_path = os.path.join(os.path.dirname(base), signal_lines[0][0])
+    frames = np.memmap(dat_path, dtype="<i2", mode="r", offset=offsets.pop())
+    frames = frames[:len(frames) - len(frames) % n_signals].reshape(-1, n_signals)
+
+    leads = _map_leads(names)
+    keep = [i for i, lead in enumerate(leads) if lead is not None]
+    if len(keep) < n_signals:
+        frames = frames[:, keep]
+    return FrameSource(
+        path, frames, [leads[i] for i in keep], int(sample_rate),
+        [gains[i] for i in keep], [baselines[i] for i in keep],
+    )
+
+
+def load_csv(path, sample_rate=None):
+    """
+    CSV/TXT file, one column per derivation.
+    """
+    with open(path) as f:
+        first = f.readline()
+
+    delimiter = "," if "," in first else None
+    names = [c.strip().strip('"') for c in first.split(delimiter)]
+    try:
+        [float(c) for c in names]
+        names, skip = None, 0
+    except ValueError:
+        skip = 1
+
+    data = np.loadtxt(path, delimiter=delimiter, skiprows=skip, ndmin=2)
+
+    columns = list(range(data.shape[1]))
+    if names is not None:
+        time_cols = [i for i, name in enumerate(names) if name.lower() in TIME_COLUMNS]
+        if time_cols and sample_rate is None and len(data) > 1:
+            sample_rate = int(round(1.0 / np.median(np.diff(data[:, time_cols[0]]))))
+        columns = [i for i in columns if i not in time_cols]
+
+    leads = _map_leads([names[i] if names is not None else "" for i in columns])
+    keep = [(i, lead) for i, lead in zip(columns, leads) if lead is not None]
+    return FrameSource(path, np.ascontiguousarray(data[:, [i for i, _ in keep]]),
+                       [lead for _, lead in keep], sample_rate or config.SAMPLE_RATE)
+
+
+def open_source(path, sample_rate=None):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".ecg":
+        return SessionSource(path)
+    if ext in (".hea", ".dat"):
+        return load_wfdb(path)
+    if ext in (".csv", ".txt"):
+        return load_csv(path, sample_rate)
+    raise ValueError(f"unsupported replay file: {path}")
+
+
+# =========================================================
+# ---------------- READER ---------------------------------
+# =========================================================
+
+class ReplayReader:
+    """
+    Streams a source into AppState.
+
+    speed: playback rate (1.0 = real time, 10.0, ...) or None for "max";
+    in max mode the reader waits for `analysis` (if given) whenever it falls
+    more than half a buffer behind, so no sample is dropped.
+    """
+
+    def __init__(self, app_state, source, speed=1.0, analysis=None, loop=False):
+        self.app_state = app_state
+        self.source = open_source(source) if isinstance(source, str) else source
+        self.speed = speed
+        self.analysis = analysis
+        self.loop = loop
+
+        self.running = False
+        self.finished = threading.Event()
+        self.position = 0
+        self._seek_to = None
+
+        # Metrics
+        self.start_time = None
+        self.samples_fed = 0
+        self.elapsed = 0.0
+
+    # =========================================================
+    # ---------------- CONTROL --------------------------------
+    # =========================================================
+
+    def start(self):
+        self.running = True
+        self.finished.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        self.app_state.serial_connected = True
+        self.app_state.esp32_connected = True
+        print(f"ReplayReader: {self.source.path} ({self.duration():.0f} s)")
+
+    def stop(self):
+        self.running = False
+        self.app_state.serial_connected = False
+        self.app_state.esp32_connected = False
+
+    def seek(self, seconds):
+        """
+        Jumps to `seconds` from the start of the recording.
+        """
+        self._seek_to = float(seconds)
+
+    def set_speed(self, speed):
+        self.speed = speed
+
+    def send_command(self, command):
+        """
+        "SEEK <s>" and "SPEED <x|MAX>" control playback; anything else
+        (MUX, pacing) is ignored, the recording cannot be changed.
+        """
+        parts = str(command).split()
+        if len(parts) == 2 and parts[0].upper() == "SEEK":
+            self.seek(float(parts[1]))
+        elif len(parts) == 2 and parts[0].upper() == "SPEED":
+            self.set_speed(None if parts[1].upper() == "MAX" else float(parts[1]))
+        else:
+            print(f"[REPLAY] Comando ignorado: {command}")
+
+    def send_mux_command(self, state):
+        self.send_command(f"STATE{state}")
+
+    def send_pace_command(self):
+        self.send_command(config.PACE_COMMAND)
+        return False
+
+    # =========================================================
+    # ---------------- PLAYBACK -------------------------------
+    # =========================================================
+
+    def duration(self):
+        return float(self.source.seek_times[-1] - self.source.seek_times[0])
+
+    def time_of(self, record):
+        return float(np.interp(record, self.source.seek_records, self.source.seek_times))
+
+    def record_at(self, seconds):
+        t = self.source.seek_times[0] + seconds
+        return int(np.interp(t, self.source.seek_times, self.source.seek_records))
+
+    def _run(self):
+        source = self.source
+        t_start = self.start_time = time.perf_counter()
+        wall0, sig0 = time.monotonic(), self.time_of(self.position)
+        pending_mux = mux_events = None
+        pending_gap = gap_events = None
+
+        # Cada derivación empieza en su índice de la sesión en vivo
+        for lead, start in source.lead_starts.items():
+            self.app_state.skip_samples(lead, start)
+
+        while self.running:
+            if self._seek_to is not None:
+                self.position = self.record_at(self._seek_to)
+                self._seek_to = None
+                wall0, sig0 = time.monotonic(), self.time_of(self.position)
+                mux_events = gap_events = None
+
+            if mux_events is None:
+                # Eventos MUX y huecos a partir de la posición actual
+                mux_events = iter([e for e in source.mux_events if e[0] >= self.position])
+                pending_mux = next(mux_events, None)
+            if gap_events is None:
+                gap_events = iter([g for g in source.gaps if g[0] >= self.position])
+                pending_gap = next(gap_events, None)
+
+            speed = self.speed
+            if speed is None:
+                self._wait_for_analysis()
+                stop = self.position + REPLAY_MAX_BLOCK
+            else:
+                target = sig0 + (time.monotonic() - wall0) * speed
+                stop = int(np.interp(target, source.seek_times, source.seek_records))
+                if stop <= self.position:
+                    time.sleep(REPLAY_BLOCK_SECONDS)
+                    continue
+            stop = min(stop, source.n_records)
+
+            # Los huecos se aplican en su registro: el bloque acaba en el siguiente
+            while pending_gap is not None and pending_gap[0] <= self.position:
+                self.app_state.skip_samples(pending_gap[1], pending_gap[2])
+                pending_gap = next(gap_events, None)
+            if pending_gap is not None:
+                stop = min(stop, pending_gap[0])
+
+            while pending_mux is not None and pending_mux[0] < stop:
+                with self.app_state.mux_lock:
+                    self.app_state.current_mux_state = pending_mux[1]
+                pending_mux = next(mux_events, None)
+
+            volts, leads = source.read(self.position, stop)
+            self.app_state.append_samples(volts, leads)
+            self.samples_fed += len(volts)
+            self.position = stop
+
+            if self.position >= source.n_records:
+                if not self.loop:
+                    break
+                self.position = 0
+                mux_events = gap_events = None
+                wall0, sig0 = time.monotonic(), self.time_of(0)
+
+            # Ritmo real: se cambia la velocidad sin saltos
+            if speed != self.speed:
+                wall0, sig0 = time.monotonic(), self.time_of(self.position)
+
+        self.elapsed = time.perf_counter() - t_start
+        self.running = False
+        self.finished.set()
+
+    def _wait_for_analysis(self):
+        if self.analysis is None:
+            time.sleep(0)
+            return
+
+        limit = config.MAX_BUFFER_SIZE // 2
+        while self.running and self.analysis.running:
+            ends = self.app_state.get_lead_write_indices()
+            behind = max(ends[lead] - self.analysis.processed_index[lead] for lead in ends)
+            if behind < limit:
+                return
+            time.sleep(0.001)
+
+    def stats(self):
+        """
+        Samples fed and throughput (samples per second and x real time).
+        """
+        elapsed = self.elapsed or 1e-9
+        signal_seconds = self.time_of(self.position) - self.source.seek_times[0]
+        return {
+            "samples": self.samples_fed,
+            "elapsed": self.elapsed,
+            "samples_per_s": self.samples_fed / elapsed,
+            "x_real_time": signal_seconds / elapsed,
+        }
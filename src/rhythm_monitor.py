@@ -0,0 +1,217 @@
+"""
+Real-time rhythm monitor and pacing trigger.
+
+Runs in its own thread, fed directly by the AnalysisWorker (never by the
+GUI refresh). Each R peak re-arms an escape interval of 60 / PACING_MIN_BPM
+seconds; if the interval expires without a new beat while the signal is
+still being analysed, the monitor classifies the event and sends the
+pace command to the ESP32 through the SerialReader: BRADYCARDIA if the
+expired escape window was opened by an intrinsic beat (the heart beats,
+too slowly), ASYSTOLE if it was opened by a pace or by signal
+(re)acquisition (no beat at all).
+
+Times are time.monotonic() seconds. A beat's time is estimated from the
+arrival time of the chunk that carried it:
+    beat_time = arrival - (end - peak_index) / SAMPLE_RATE
+so RR intervals do not depend on when the worker got to process them.
+
+Accepted beats also feed an HRVEngine (hrv.py): SDNN / RMSSD / pNN50
+trends, ectopic rejection and tachy / brady / pause episodes.
+
+Latency (recorded in LatencyHistogram):
+    beat:   sample arrival -> beat processed by the monitor
+    pace:   arrival of the first sample past the escape deadline -> pacing
+            decision (the serial write is not included)
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+
+from . import config
+from .hrv import HRVEngine
+from .instrumentation import LatencyHistogram
+from .peak_detection import analyze_cardiac_cycle
+
+
+# Beats kept for the rhythm classification
+MAX_BEATS = 16
+
+# How long an alert stays on the display after the last pace (seconds)
+ALERT_HOLD = 2.0
+
+_BEAT = "beat"
+_PROGRESS = "progress"
+
+
+class RhythmMonitor(threading.Thread):
+
+    def __init__(self, serial_reader=None, min_bpm=config.PACING_MIN_BPM):
+        super().__init__(daemon=True)
+        self.serial_reader = serial_reader
+        self.running = True
+
+        self.escape_interval = 60.0 / min_bpm
+        self.min_bpm = min_bpm
+        self.events = queue.Queue()
+
+        self.beat_times = deque(maxlen=MAX_BEATS)
+        self.last_beat = None          # último latido (o estímulo)
+        self.last_data = None          # llegada de la última muestra analizada
+        self.deadline = None
+        self.covered_at = None         # llegada de la primera muestra tras el plazo
+
+        self.paces = 0
+        self.last_pace = None
+        self.last_event = None
+        self.cardiac = analyze_cardiac_cycle([], 1.0)
+        self.hrv = HRVEngine()
+
+        self.beat_latency = LatencyHistogram()
+        self.pace_latency = LatencyHistogram()
+
+    # =========================================================
+    # ---------------- INPUT (analysis thread) ----------------
+    # =========================================================
+
+    def post_beats(self, lead, peaks, end, arrival):
+        """
+        New R peaks of one derivation; `end` is the lead's write index
+        and `arrival` the time its last chunk was published.
+        """
+        for peak in peaks:
+            beat_time = arrival - (end - peak) / config.SAMPLE_RATE
+            self.events.put((_BEAT, beat_time, arrival))
+
+    def post_progress(self, arrival):
+        """
+        The worker has analysed every sample published up to `arrival`.
+        """
+        self.events.put((_PROGRESS, arrival, arrival))
+
+    def stop(self):
+        self.running = False
+        self.events.put((_PROGRESS, None, None))
+
+    # =========================================================
+    # ---------------- MONITOR LOOP ---------------------------
+    # =========================================================
+
+    def run(self):
+        while self.running:
+            timeout = 0.5
+            if self.deadline is not None:
+                # Suelo > 0: esperando datos que cubran el plazo no se hace busy-wait
+                timeout = min(timeout, max(0.01, self.deadline - time.monotonic()))
+
+            try:
+                event = self.events.get(timeout=timeout)
+            except queue.Empty:
+                event = None
+
+            while event is not None:
+                self._handle(event)
+                try:
+                    event = self.events.get_nowait()
+                except queue.Empty:
+                    event = None
+
+            self._check_deadline()
+
+    def _handle(self, event):
+        kind, t, arrival = event
+        if t is None:
+            return
+
+        if kind == _BEAT:
+            # Picos de varias derivaciones del mismo latido: periodo refractario
+            if self.last_beat is None or t - self.last_beat >= config.BEAT_REFRACTORY:
+                self.beat_times.append(t)
+                self.last_beat = t
+                self.cardiac = analyze_cardiac_cycle(
+                    list(self.beat_times), 1.0, self.min_bpm, config.ASYSTOLE_INTERVAL
+                )
+                self.hrv.add_beat(t)
+            self.beat_latency.record(time.monotonic() - arrival)
+
+        else:
+            if self.last_data is None or t - self.last_data > config.SIGNAL_LOSS_TIMEOUT:
+                # Signal (re)acquired: the escape interval starts now
+                self.last_beat = max(self.last_beat or t, t)
+                self.hrv.gap()
+            self.last_data = t
+
+        self._arm(self.last_beat + self.escape_interval)
+        if kind == _PROGRESS and self.covered_at is None and t >= self.deadline:
+            self.covered_at = t
+
+    def _arm(self, deadline):
+        if deadline != self.deadline:
+            self.deadline = deadline
+            self.covered_at = None
+
+    def _check_deadline(self):
+        """
+        Paces when the escape interval has expired and the analysed signal
+        covers it (a beat still in the pipeline would have been seen).
+        """
+        if self.deadline is None or self.last_data is None:
+            return
+
+        now = time.monotonic()
+        if now < self.deadline:
+            return
+        if now - self.last_data > config.SIGNAL_LOSS_TIMEOUT:
+            # Signal lost: no pacing; the next progress event re-arms it
+            self.deadline = None
+            return
+        if self.last_data < self.deadline:
+            return
+
+        # Latido propio dentro de la ventana de escape que acaba de vencer
+        window_start = self.deadline - self.escape_interval
+        had_beat = bool(self.beat_times) and self.beat_times[-1] >= window_start
+        self._pace("BRADYCARDIA" if had_beat else "ASYSTOLE", now)
+
+    def _pace(self, event, now):
+        self.pace_latency.record(now - (self.covered_at if self.covered_at is not None else self.last_data))
+
+        if config.ENABLE_PACING and self.serial_reader is not None:
+            self.serial_reader.send_pace_command()
+
+        self.paces += 1
+        self.last_pace = time.monotonic()
+        self.last_event = event
+
+        # Estimulación a frecuencia mínima mientras no haya latidos propios
+        self.last_beat = now
+        self._arm(now + self.escape_interval)
+
+    # =========================================================
+    # ---------------- STATUS ---------------------------------
+    # =========================================================
+
+    def status(self):
+        """
+        Rhythm state for the GUI: NO SIGNAL, NORMAL, BRADYCARDIA or ASYSTOLE.
+        """
+        now = time.monotonic()
+        if self.last_data is None or now - self.last_data > config.SIGNAL_LOSS_TIMEOUT:
+            state = "NO SIGNAL"
+        elif self.last_pace is not None and now - self.last_pace < ALERT_HOLD:
+            state = self.last_event
+        elif self.cardiac["bradycardia"]:
+            state = "BRADYCARDIA"
+        else:
+            state = "NORMAL"
+
+        return {
+            "state": state,
+            "paces": self.paces,
+            "bpm": self.cardiac["bpm"],
+            "pacing_enabled": config.ENABLE_PACING,
+            "beat_latency": self.beat_latency.summary(),
+            "pace_latency": self.pace_latency.summary(),
+            "hrv": self.hrv.summary(),
+        }
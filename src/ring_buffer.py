@@ -0,0 +1,150 @@
+"""
+Fixed-capacity ring buffer backed by a preallocated NumPy array.
+
+Storage is mirrored (every sample is written twice, at slot and slot + capacity),
+so the last N samples are always one contiguous slice: reading them is a
+zero-copy view, no matter where the write head is.
+
+Threading model (single producer, single consumer, no lock):
+    - One writer. It copies data into free slots with stage() and then
+      publishes them with commit(), which only moves the index (one
+      attribute assignment, atomic in CPython).
+    - Readers take a snapshot of write_index and call latest(n, end) with it.
+      The only race left is a reader more than a buffer behind: the writer
+      may be reusing those slots, which overwritten() reports.
+"""
+
+import numpy as np
+
+
+class RingBuffer:
+
+    def __init__(self, capacity, dtype=np.float64, storage=None):
+        """
+        storage: optional preallocated array of 2 * capacity elements
+        (e.g. a view of shared memory); it is used as is, not cleared.
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+
+        self.capacity = int(capacity)
+        self.dtype = np.dtype(dtype)
+        if storage is None:
+            self._data = np.zeros(2 * self.capacity, dtype=self.dtype)
+        else:
+            if storage.shape != (2 * self.capacity,) or storage.dtype != self.dtype:
+                raise ValueError("storage must hold 2 * capacity elements of dtype")
+            self._data = storage
+
+        # Total samples ever written (monotonic, never wraps)
+        self.write_index = 0
+        self._staged = 0
+
+    def __len__(self):
+        return min(self.write_index, self.capacity)
+
+    # =========================================================
+    # ---------------- WRITE ----------------------------------
+    # =========================================================
+
+    def stage(self, values):
+        """
+        Copies values into the slots after the write index (and after any
+        sample staged before) without publishing them.
+        Returns the number of samples that commit() must publish.
+        """
+        values = np.asarray(values, dtype=self.dtype).reshape(-1)
+        n = len(values)
+        if n == 0:
+            return 0
+
+        cap = self.capacity
+        skip = max(0, n - cap)
+        if skip:
+            values = values[skip:]
+
+        m = len(values)
+        pos = (self.write_index + self._staged + skip) % cap
+        self._staged += n
+        first = min(m, cap - pos)
+
+        self._data[pos:pos + first] = values[:first]
+        self._data[pos + cap:pos + cap + first] = values[:first]
+
+        rest = m - first
+        if rest:
+            self._data[:rest] = values[first:]
+            self._data[cap:cap + rest] = values[first:]
+
+        return n
+
+    def commit(self, n=None):
+        """
+        Publishes n staged samples (default: all) to readers.
+        """
+        if n is None:
+            n = self._staged
+        self.write_index += n
+        self._staged -= n
+
+    def append_many(self, values):
+        self.commit(self.stage(values))
+
+    def advance(self, n):
+        """
+        Moves the write index by n samples without data (gap).
+        The skipped slots are zeroed.
+        """
+        cap = self.capacity
+        pos = (self.write_index + self._staged) % cap
+        m = min(n, cap)
+        first = min(m, cap - pos)
+        self._data[pos:pos + first] = 0
+        self._data[pos + cap:pos + cap + first] = 0
+        self._data[:m - first] = 0
+        self._data[cap:cap + m - first] = 0
+        self.write_index += n
+
+    def append(self, value):
+        cap = self.capacity
+        pos = (self.write_index + self._staged) % cap
+        self._data[pos] = value
+        self._data[pos + cap] = value
+        self.write_index += 1
+
+    def clear(self):
+        self.write_index = 0
+        self._staged = 0
+
+    # =========================================================
+    # ---------------- READ -----------------------------------
+    # =========================================================
+
+    def latest(self, n=None, end=None):
+        """
+        Returns a read-only, contiguous view of the last n samples
+        ending at write index `end` (defaults to the current write_index).
+        """
+        if end is None:
+            end = self.write_index
+
+        available = min(end, self.capacity)
+        n = available if n is None else max(0, min(int(n), available))
+
+        stop = end % self.capacity + self.capacity
+        view = self._data[stop - n:stop]
+        view.flags.writeable = False
+        return view
+
+    def overwritten(self, start):
+        """
+        Number of samples from absolute index `start` on that the writer
+        may already have reused (check after copying them out).
+        """
+        return max(0, self.write_index + self._staged - self.capacity - start)
+
+    def to_array(self):
+        """
+        Returns a copy of the buffered samples, oldest first.
+        """
+        return self.latest().copy()
@@ -1,8 +1,10 @@
 """
 Serial communication handler for ESP32 ECG acquisition.
 Handles:
-    - Binary packet decoding
-    - Signal processing pipeline
+    - Binary packet decoding (and legacy ASCII lines)
+    - Bulk chunked reads: one parse and one lock acquisition per chunk
+    - Hand-off of raw, lead-tagged samples to AppState
+      (filtering and detection run in analysis.AnalysisWorker)
     - Automatic / Manual derivation switching
 """
 
@@ -15,6 +17,44 @@ from collections import deque
 #print(serial.__file__)
 #print(dir(serial))
 from . import config
+from .packet_protocol import FrameDecoder, LineDecoder
+from .instrumentation import PERF
+
+
+class ReaderStats:
+    """
+    Throughput counters of the acquisition loop.
+    """
+
+    def __init__(self):
+        self.bytes_total = 0
+        self.samples_total = 0
+        self.chunks_total = 0
+        self.lock_hold_time = 0.0
+        self._last_time = time.monotonic()
+        self._last_bytes = 0
+        self._last_samples = 0
+        self.bytes_per_s = 0.0
+        self.samples_per_s = 0.0
+
+    def add_chunk(self, n_bytes, n_samples, lock_time):
+        self.bytes_total += n_bytes
+        self.samples_total += n_samples
+        self.chunks_total += 1
+        self.lock_hold_time += lock_time
+
+    def update_rates(self):
+        """
+        Recomputes bytes/s and samples/s since the previous call.
+        """
+        now = time.monotonic()
+        elapsed = now - self._last_time
+        if elapsed > 0:
+            self.bytes_per_s = (self.bytes_total - self._last_bytes) / elapsed
+            self.samples_per_s = (self.samples_total - self._last_samples) / elapsed
+        self._last_time = now
+        self._last_bytes = self.bytes_total
+        self._last_samples = self.samples_total
 
 
 class SerialReader(threading.Thread):
@@ -27,14 +67,25 @@ class SerialReader(threading.Thread):
         #serial.Serial(config.SERIAL_PORT, config.BAUDRATE)
         self.running = True
         
+        # Protocolo: "ASCII" (firmware antiguo) o "BINARY"
+        self.protocol = config.SERIAL_PROTOCOL
+        self.frame_decoder = FrameDecoder()
+        self.line_decoder = LineDecoder()
+        self.stats = ReaderStats()
+        
+        # GUI (MUX) y monitor de ritmo (estimulación) escriben en el puerto
+        self.write_lock = threading.Lock()
+        
         #self.read_thread = None
-        #self.auto_thread = None
+        self.auto_thread = None
     
     def run(self):
         while self.running:
-            if self.serial_port and self.serial_port.in_waiting:
-                line = self.serial_port.readline().decode().strip()
-                self.app_state.add_sample(line)
+            if self.serial_port and self.serial_port.is_open:
+                self.read_serial()
+            else:
+                # Sin puerto: esperar sin consumir CPU
+                time.sleep(0.1)
 
     def send_mux_command(self, state):
         command = f"STATE_{state}\n"
@@ -60,21 +111,18 @@ class SerialReader(threading.Thread):
             self.app_state.serial_connected = True
             self.app_state.esp32_connected = True
             
-            self.running = True
-            
-            # Thread lectura ECG
-            self.read_thread = threading.Thread(
-                target=self.read_serial,
-                daemon=True
-            )
-            self.read_thread.start()
+            # Lectura ECG: un solo hilo para todas las conexiones; run()
+            # lee del puerto en cuanto está abierto y espera si no lo está
+            if self.ident is None:
+                self.start()
             
-            # Thread modo automático
-            self.auto_thread = threading.Thread(
-                target=self.auto_mode_loop,
-                daemon=True
-            )
-            self.auto_thread.start()
+            # Thread modo automático (también sobrevive a disconnect())
+            if self.auto_thread is None or not self.auto_thread.is_alive():
+                self.auto_thread = threading.Thread(
+                    target=self.auto_mode_loop,
+                    daemon=True
+                )
+                self.auto_thread.start()
             
             print("ESP32 connected successfully")
             
@@ -88,15 +136,27 @@ class SerialReader(threading.Thread):
     # =========================================================
     
     def disconnect(self):
-        self.running = False
-        
-        if self.serial_port and self.serial_port.is_open:
-            self.serial_port.close()
+        """
+        Closes the port; the read thread stays idle until connect()
+        (stop() ends it).
+        """
+        self._close_port()
+        print("Disconnected")
+
+    def _close_port(self):
+        # Bajo write_lock: ningún comando escribe en un puerto a medio cerrar
+        with self.write_lock:
+            if self.serial_port and self.serial_port.is_open:
+                try:
+                    self.serial_port.close()
+                except (serial.SerialException, OSError):
+                    pass
+            # Sin referencia: run() deja de leer aunque el puerto siga
+            # diciendo is_open
+            self.serial_port = None
         
         self.app_state.serial_connected = False
         self.app_state.esp32_connected = False
-        
-        print("Disconnected")
 
     # =========================================================
     # ----------------- READ ECG DATA -------------------------
@@ -104,24 +164,70 @@ class SerialReader(threading.Thread):
     
     def read_serial(self):
         """
-        Reads ECG values from ESP32.
-        Expected format: one value per line (e.g., 1.234)
+        Reads ECG data from ESP32 in bulk chunks.
+
+        Blocks on read(max(1, in_waiting)) (bounded by SERIAL_TIMEOUT), so an
+        idle port costs no CPU. Each chunk is split into complete records by
+        the decoder (the partial tail is carried over), parsed as one batch and
+        appended to AppState with a single lock acquisition.
+
+        Expected format: one value per line (e.g., 1.234),
+        or binary frames when protocol is "BINARY".
         """
-        while self.running:
+        decoder = self.frame_decoder if self.protocol == "BINARY" else self.line_decoder
+        decoder.reset()
+
+        # disconnect()/connect() pueden cambiar self.serial_port mientras se lee
+        port = self.serial_port
+        while self.running and port is self.serial_port:
             try:
-                if self.serial_port.in_waiting:
-                    line = self.serial_port.readline().decode().strip()
-                    
-                    if line:
-                        voltage = float(line)
-                        
-                        with self.app_state.data_lock:
-                            self.app_state.voltage_buffer.append(voltage)
-                            self.app_state.sample_count += 1
-                            
-            except:
+                waiting = port.in_waiting
+                data = port.read(max(1, waiting))
+            except (serial.SerialException, OSError, TypeError) as e:
+                # Puerto cerrado o desconectado (pyserial puede seguir
+                # diciendo is_open tras desenchufar el USB): se cierra, y
+                # run() espera a un nuevo connect() en vez de reintentar
+                if self.running and port is self.serial_port:
+                    print("Serial read error:", e)
+                    self._close_port()
+                break
+
+            if not data:
                 continue
 
+            # ASCII no trae derivación: se usa la seleccionada en el MUX
+            with PERF.timer("serial.decode"):
+                volts, mux = decoder.feed(data)
+            with PERF.timer("serial.append"):
+                lock_time = self.app_state.append_samples(volts, mux)
+            self.stats.add_chunk(len(data), len(volts), lock_time)
+
+            if PERF.enabled:
+                # Backlog: bytes esperando en el driver antes de esta lectura
+                PERF.observe("serial.backlog", waiting)
+                PERF.count("serial.bytes", len(data))
+                PERF.gauge("serial.parse_errors", self.line_decoder.parse_errors)
+                PERF.gauge("serial.crc_errors", self.frame_decoder.crc_errors)
+                PERF.gauge("serial.dropped_frames", self.frame_decoder.dropped_frames)
+
+    def get_stats(self):
+        """
+        Returns acquisition counters (rates since the previous call).
+        """
+        self.stats.update_rates()
+        decoder = self.frame_decoder if self.protocol == "BINARY" else self.line_decoder
+        stats = {
+            "bytes_per_s": self.stats.bytes_per_s,
+            "samples_per_s": self.stats.samples_per_s,
+            "bytes_total": self.stats.bytes_total,
+            "samples_total": self.stats.samples_total,
+            "lock_hold_time": self.stats.lock_hold_time,
+            "parse_errors": self.line_decoder.parse_errors,
+            "crc_errors": self.frame_decoder.crc_errors,
+        }
+        stats.update(decoder.stats())
+        return stats
+
     # =========================================================
     # ----------------- SEND MUX COMMAND ----------------------
     # =========================================================
@@ -131,9 +237,31 @@ class SerialReader(threading.Thread):
         Sends derivation index (0–5) to ESP32.
         ESP32 must decode and control CD4051.
         """
-        if self.serial_port and self.serial_port.is_open:
-            command = f"STATE{state}\n"
-            self.serial_port.write(command.encode())
+        command = f"STATE{state}\n"
+        try:
+            # Comprobación y escritura bajo el mismo lock que _close_port
+            with self.write_lock:
+                if self.serial_port and self.serial_port.is_open:
+                    self.serial_port.write(command.encode())
+        except (serial.SerialException, OSError) as e:
+            print("MUX command error:", e)
+
+    def send_pace_command(self):
+        """
+        Sends the pacing command to the ESP32 (called by the rhythm monitor).
+
+        Returns:
+            bool: True if the command was written
+        """
+        try:
+            with self.write_lock:
+                if not (self.serial_port and self.serial_port.is_open):
+                    return False
+                self.serial_port.write(f"{config.PACE_COMMAND}\n".encode())
+        except (serial.SerialException, OSError) as e:
+            print("Pace command error:", e)
+            return False
+        return True
 
     # =========================================================
     # ----------------- AUTO MODE LOOP ------------------------
@@ -150,7 +278,7 @@ class SerialReader(threading.Thread):
             # Verificar si debe entrar en modo AUTO
             self.app_state.check_auto_mode()
             
-            if self.app_state.operation_mode.get() == "AUTO":
+            if self.app_state.settings.operation_mode == config.MODE_AUTO:
                 
                 if time.time() - last_switch_time >= config.AUTO_SWITCH_INTERVAL:
                     
@@ -0,0 +1,437 @@
+"""
+Streaming network API for remote viewers.
+
+StreamServer publishes the analysed signal of every derivation, the R
+peaks and the rhythm status over TCP, from its own asyncio loop thread.
+It only reads what the AnalysisWorker published (snapshot ends and the
+lead ring buffers), so acquisition and analysis never wait for clients.
+
+Wire format (little-endian), server -> client, one message:
+    header   MESSAGE_HEADER: magic b"EC", type (u8), lead (u8), payload bytes (u32)
+    HELLO    JSON: sample rate, lead labels, protocol version
+    SAMPLES  SAMPLES_HEADER: start index (u64), decimation (u16), then float32
+             values. decimation 1: consecutive samples from `start`;
+             decimation k > 1: (min, max) pairs of the k-sample buckets
+             starting at `start` (R peaks survive the downsampling).
+             A start beyond the previous batch's end is a gap.
+    PEAKS    int64 R-peak indices (lead sample indices)
+    STATUS   JSON: rhythm state, paces, BPM, HRV summary, connection, MUX
+
+Client -> server: one JSON object per line, any time:
+    {"decimation": 4, "leads": [0, 1]}
+
+Backpressure: a client whose unsent data exceeds high_water
+(STREAM_CLIENT_HIGH_WATER) gets no new samples until it drains; one that
+falls more than max_lag (STREAM_MAX_LAG) seconds behind skips to the
+present (counted as dropped).
+A slow viewer therefore never delays the others nor the acquisition.
+"""
+
+import asyncio
+import json
+import socket
+import struct
+import threading
+import time
+
+import numpy as np
+
+from . import config
+from .decimation import minmax_decimate
+
+
+PROTOCOL_VERSION = 1
+MAGIC = b"EC"
+MESSAGE_HEADER = struct.Struct("<2sBBI")
+SAMPLES_HEADER = struct.Struct("<QH")
+
+HELLO = 0
+SAMPLES = 1
+PEAKS = 2
+STATUS = 3
+
+MAX_DECIMATION = 1000
+
+
+def encode_message(kind, lead, payload):
+    return MESSAGE_HEADER.pack(MAGIC, kind, lead, len(payload)) + payload
+
+
+def _json_message(kind, value):
+    return encode_message(kind, 0, json.dumps(value).encode())
+
+
+class _Client:
+    """
+    Per-connection state: subscription, cursors and counters.
+    """
+
+    def __init__(self, writer, leads):
+        self.writer = writer
+        self.peer = writer.get_extra_info("peername")
+        self.decimation = 1
+        self.leads = list(leads)
+        self.cursors = {}               # lead -> next sample index to send
+        self.last_peak = {lead: -1 for lead in leads}
+        self.last_status = None
+
+        self.bytes_sent = 0
+        self.samples_sent = 0
+        self.dropped_samples = 0
+        self.throttled_ticks = 0
+
+    @property
+    def backlog(self):
+        return self.writer.transport.get_write_buffer_size()
+
+    def send(self, data):
+        self.writer.write(data)
+        self.bytes_sent += len(data)
+
+
+class StreamServer:
+
+    def __init__(self, app_state, analysis, rhythm_monitor=None,
+                 host=config.STREAM_HOST, port=config.STREAM_PORT,
+                 interval=config.STREAM_INTERVAL, sample_rate=config.SAMPLE_RATE,
+                 high_water=config.STREAM_CLIENT_HIGH_WATER, max_lag=config.STREAM_MAX_LAG):
+        self.app_state = app_state
+        self.analysis = analysis
+        self.rhythm_monitor = rhythm_monitor
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.sample_rate = sample_rate
+        self.high_water = high_water
+        self.max_lag = max_lag
+        self.leads = list(app_state.mux_state_label)
+
+        self.loop = None
+        self.thread = None
+        self.running = False
+        self.clients = set()
+        self._server = None
+        self._handlers = set()
+        self._ready = threading.Event()
+
+        # Metrics
+        self.ticks = 0
+        self.tick_time = 0.0
+        self.connections = 0
+
+    # =========================================================
+    # ---------------- CONTROL --------------------------------
+    # =========================================================
+
+    def start(self):
+        self.running = True
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, daemon=True, name="stream-server")
+        self.thread.start()
+        self._ready.wait()
+        print(f"Streaming on {self.host}:{self.port}")
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+    def stats(self):
+        clients = [
+            {
+                "peer": client.peer,
+                "decimation": client.decimation,
+                "bytes_sent": client.bytes_sent,
+                "samples_sent": client.samples_sent,
+                "dropped_samples": client.dropped_samples,
+                "throttled_ticks": client.throttled_ticks,
+                "backlog": client.backlog,
+            }
+            for client in list(self.clients)
+        ]
+        return {
+            "clients": clients,
+            "connections": self.connections,
+            "ticks": self.ticks,
+            "tick_ms": 1e3 * self.tick_time / self.ticks if self.ticks else 0.0,
+        }
+
+    # =========================================================
+    # ---------------- LOOP THREAD ----------------------------
+    # =========================================================
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self._server = self.loop.run_until_complete(
+            asyncio.start_server(self._handle_client, self.host, self.port)
+        )
+        # Puerto 0: el sistema elige uno libre
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ticker = self.loop.create_task(self._tick_loop())
+        self._ready.set()
+
+        self.loop.run_forever()
+        self.loop.close()
+
+    async def _shutdown(self):
+        self._ticker.cancel()
+        self._server.close()
+        # Los clientes reciben el cierre (EOF) antes de parar el loop;
+        # sus tareas terminan solas al ver el fin de la conexión
+        clients = list(self.clients)
+        for client in clients:
+            client.writer.close()
+        await asyncio.gather(self._ticker, return_exceptions=True)
+        if self._handlers:
+            await asyncio.wait(self._handlers, timeout=1.0)
+        for client in clients:
+            # Un cliente que no lee no deja vaciar el buffer: se corta
+            client.writer.transport.abort()
+        if self._handlers:
+            await asyncio.wait(self._handlers, timeout=1.0)
+
+    async def _handle_client(self, reader, writer):
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, config.STREAM_SOCKET_SNDBUF)
+
+        client = _Client(writer, self.leads)
+        client.send(_json_message(HELLO, {
+            "version": PROTOCOL_VERSION,
+            "sample_rate": self.sample_rate,
+            "leads": {str(k): v for k, v in self.app_state.mux_state_label.items()},
+        }))
+        self.clients.add(client)
+        self.connections += 1
+        task = asyncio.current_task()
+        self._handlers.add(task)
+
+        try:
+            while self.running:
+                line = await reader.readline()
+                if not line:
+                    break
+                self._apply_request(client, line)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.clients.discard(client)
+            self._handlers.discard(task)
+            writer.close()
+
+    def _apply_request(self, client, line):
+        """
+        Applies {"decimation": n, "leads": [...]}; malformed requests are
+        ignored (the client keeps its current settings).
+        """
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                return
+            decimation, leads = client.decimation, client.leads
+            if "decimation" in request:
+                decimation = max(1, min(MAX_DECIMATION, int(request["decimation"])))
+            if "leads" in request:
+                if not isinstance(request["leads"], list):
+                    return
+                # Solo enteros reales (no bool ni float) de una derivación existente
+                leads = [
+                    lead for lead in request["leads"]
+                    if type(lead) is int and 0 <= lead < config.TOTAL_DERIVATIONS
+                    and lead in self.leads
+                ]
+        except (ValueError, TypeError, OverflowError):
+            return
+        client.decimation, client.leads = decimation, leads
+
+    # =========================================================
+    # ---------------- PUBLISHING -----------------------------
+    # =========================================================
+
+    async def _tick_loop(self):
+        next_tick = time.monotonic()
+        while True:
+            t0 = time.perf_counter()
+            if self.clients:
+                self._publish()
+            self.ticks += 1
+            self.tick_time += time.perf_counter() - t0
+
+            next_tick += self.interval
+            await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
+
+    def _publish(self):
+        snapshot = self.analysis.latest
+        if snapshot is None:
+            return
+
+        max_lag = int(self.max_lag * self.sample_rate)
+        status = self._status() if self.rhythm_monitor is not None else None
+        # Lotes ya codificados en este tick, compartidos entre clientes
+        batches = {}
+
+        for client in list(self.clients):
+            try:
+                self._publish_client(client, snapshot, max_lag, status, batches)
+            except Exception as e:
+                # Un cliente roto no detiene el loop de los demás
+                print(f"Stream client {client.peer} dropped: {e}")
+                self.clients.discard(client)
+                client.writer.transport.abort()
+
+    def _publish_client(self, client, snapshot, max_lag, status, batches):
+        throttled = client.backlog > self.high_water
+        client.throttled_ticks += throttled
+
+        for lead in client.leads:
+            end = snapshot.ends[lead]
+            start = client.cursors.get(lead, end)
+            if end - start > max_lag:
+                client.dropped_samples += end - max_lag - start
+                start = client.cursors[lead] = end - max_lag
+            if throttled:
+                continue
+
+            key = (lead, start, end, client.decimation)
+            if key not in batches:
+                batches[key] = self._encode_samples(lead, start, end, client.decimation)
+            message, next_start, n_values = batches[key]
+            if message:
+                client.send(message)
+                client.samples_sent += n_values
+            client.cursors[lead] = next_start
+
+            peaks = snapshot.peaks[lead]
+            new = peaks[peaks > client.last_peak[lead]]
+            if len(new):
+                client.send(encode_message(PEAKS, lead, new.astype("<i8").tobytes()))
+                client.last_peak[lead] = int(new[-1])
+
+        if throttled:
+            return
+        if status is not None and (
+                client.last_status is None
+                or status["state"] != client.last_status["state"]
+                or status["time"] - client.last_status["time"] >= config.STREAM_STATUS_INTERVAL):
+            client.send(_json_message(STATUS, status))
+            client.last_status = status
+
+    def _encode_samples(self, lead, start, end, decimation):
+        """
+        SAMPLES message for [start, end) of a lead.
+
+        Returns:
+            (bytes or None, next start, samples covered)
+        """
+        if decimation > 1:
+            # Cubetas alineadas al índice absoluto: solo las completas
+            first = -(-start // decimation) * decimation
+            last = end - end % decimation
+            if last <= first:
+                return None, start, 0
+            values = self.app_state.get_lead_signal(lead, last - first, last)
+            mins, maxs = minmax_decimate(values, decimation)
+            payload = np.empty(2 * len(mins), dtype="<f4")
+            payload[0::2] = mins
+            payload[1::2] = maxs
+            start, end = first, last
+        else:
+            if end <= start:
+                return None, start, 0
+            payload = self.app_state.get_lead_signal(lead, end - start, end).astype("<f4")
+
+        header = SAMPLES_HEADER.pack(start, decimation)
+        return encode_message(SAMPLES, lead, header + payload.tobytes()), end, end - start
+
+    def _status(self):
+        status = self.rhythm_monitor.status()
+        return {
+            "time": time.time(),
+            "state": status["state"],
+            "paces": status["paces"],
+            "bpm": status["bpm"],
+            "pacing_enabled": status["pacing_enabled"],
+            "esp32_connected": bool(self.app_state.esp32_connected),
+            "mux_state": self.app_state.current_mux_state,
+            "hrv": status.get("hrv"),
+        }
+
+
+# =========================================================
+# ---------------- CLIENT ---------------------------------
+# =========================================================
+
+class StreamClient:
+    """
+    Blocking client: iterate over messages() to receive
+    (type, lead, value) tuples, where value is a dict (HELLO / STATUS),
+    a (start, decimation, float32 array) tuple (SAMPLES) or an int64
+    array (PEAKS).
+    """
+
+    def __init__(self, host=config.STREAM_HOST, port=config.STREAM_PORT, decimation=1, leads=None, timeout=5.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self.sock.makefile("rb")
+        request = {"decimation": decimation}
+        if leads is not None:
+            request["leads"] = list(leads)
+        self.request(**request)
+
+    def request(self, **fields):
+        self.sock.sendall((json.dumps(fields) + "\n").encode())
+
+    def close(self):
+        self._file.close()
+        self.sock.close()
+
+    def read_message(self):
+        header = self._file.read(MESSAGE_HEADER.size)
+        if len(header) < MESSAGE_HEADER.size:
+            return None
+        magic, kind, lead, length = MESSAGE_HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError("stream out of sync")
+        payload = self._file.read(length)
+        return kind, lead, decode_payload(kind, payload)
+
+    def messages(self):
+        while True:
+            message = self.read_message()
+            if message is None:
+                return
+            yield message
+
+
+def decode_payload(kind, payload):
+    if kind == SAMPLES:
+        start, decimation = SAMPLES_HEADER.unpack_from(payload)
+        return start, decimation, np.frombuffer(payload, dtype="<f4", offset=SAMPLES_HEADER.size)
+    if kind == PEAKS:
+        return np.frombuffer(payload, dtype="<i8")
+    return json.loads(payload)
+
+
+if __name__ == "__main__":
+    # Visor mínimo de consola: muestras/s recibidas y estado del ritmo
+    import argparse
+    parser = argparse.ArgumentParser(description="ECG stream client")
+    parser.add_argument("address", nargs="?", default=f"{config.STREAM_HOST}:{config.STREAM_PORT}")
+    parser.add_argument("--decimation", type=int, default=1)
+    args = parser.parse_args()
+
+    host, port = args.address.rsplit(":", 1)
+    client = StreamClient(host, int(port), args.decimation)
+    received, last = 0, time.monotonic()
+    for kind, lead, value in client.messages():
+        if kind == SAMPLES:
+            received += len(value[2])
+        elif kind in (HELLO, STATUS):
+            print(value)
+        if time.monotonic() - last >= 1.0:
+            print(f"{received / (time.monotonic() - last):.0f} values/s")
+            received, last = 0, time.monotonic()
@@ -0,0 +1,79 @@
+"""
+Tk binding for the AppState settings.
+
+AppState keeps its settings in StateVar fields (plain Python, usable from
+any thread). TkStateBinding mirrors each one in a Tk variable of the
+matching type, so widgets can use `variable=` / `textvariable=`:
+
+    widget -> Tk variable -> StateVar      immediately (Tk trace)
+    StateVar -> Tk variable                immediately when set from the
+                                           GUI thread; from other threads
+                                           queued until flush()
+
+Tk must only be touched from the GUI thread: changes made by worker
+threads (e.g. AUTO mode) are applied by flush(), called from the GUI
+refresh loop.
+"""
+
+import threading
+import tkinter as tk
+
+
+_TK_TYPES = {
+    bool: tk.BooleanVar,
+    int: tk.IntVar,
+    float: tk.DoubleVar,
+    str: tk.StringVar,
+}
+
+
+class TkStateBinding:
+
+    def __init__(self, master, app_state):
+        self.state_vars = app_state.state_vars()
+        self.tk_vars = {}
+        self._gui_thread = threading.get_ident()
+        self._pending = {}
+
+        for name, state_var in self.state_vars.items():
+            tk_var = _TK_TYPES[state_var.kind](master, value=state_var.get())
+            tk_var.trace_add("write", lambda *_, name=name: self._from_tk(name))
+            state_var.subscribe(lambda value, name=name: self._from_state(name, value))
+            self.tk_vars[name] = tk_var
+
+    def __getattr__(self, name):
+        # binding.ecg_gain -> tk.DoubleVar enlazada a app_state.ecg_gain
+        try:
+            return self.__dict__["tk_vars"][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def _from_tk(self, name):
+        try:
+            value = self.tk_vars[name].get()
+        except (tk.TclError, ValueError):
+            # Texto a medio escribir en un Entry/Spinbox
+            return
+        self.state_vars[name].set(value)
+
+    def _from_state(self, name, value):
+        if threading.get_ident() == self._gui_thread:
+            self._set_tk(name, value)
+        else:
+            self._pending[name] = value
+
+    def _set_tk(self, name, value):
+        tk_var = self.tk_vars[name]
+        try:
+            if tk_var.get() == value:
+                return
+        except (tk.TclError, ValueError):
+            pass
+        tk_var.set(value)
+
+    def flush(self):
+        """
+        Applies changes made by other threads (GUI thread only).
+        """
+        for name in list(self._pending):
+            self._set_tk(name, self._pending.pop(name))
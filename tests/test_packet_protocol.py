@@ -0,0 +1,259 @@
+"""
+FrameDecoder must return exactly the encoded samples whatever the byte
+split, resynchronize after garbage and corrupted frames, and count CRC
+failures and sequence gaps; LineDecoder must parse complete lines only
+and count unparseable ones.
+"""
+
+import numpy as np
+import pytest
+
+from src.packet_protocol import (
+    FrameDecoder, LineDecoder, SYNC_WORD, HEADER_SIZE,
+    crc16_ccitt, crc16_ccitt_rows, encode_block, encode_frame,
+)
+
+
+K = 4
+SCALE = 0.001
+
+
+def random_block(n, leads=6, seed=0):
+    """
+    (n, leads) volts already on the int16 grid, so decoding is exact.
+    """
+    rng = np.random.default_rng(seed)
+    return np.round(rng.normal(0, 1.0, (n, leads)) / SCALE) * SCALE
+
+
+def encoded_frames(n_frames, seq=0, seed=0):
+    """
+    n_frames consecutive frames as separate bytes objects
+    (lead = frame % 6, sequence numbers from seq).
+    """
+    block = random_block(n_frames // 6 * K + K, seed=seed)
+    data, _ = encode_block(seq, block, K, SCALE)
+    size = len(encode_frame(0, 0, np.zeros(K)))
+    return [data[i:i + size] for i in range(0, len(data), size)][:n_frames]
+
+
+def decode_all(decoder, chunks):
+    volts, mux = [], []
+    for chunk in chunks:
+        v, m = decoder.feed(chunk)
+        volts.append(v)
+        mux.append(m)
+    return np.concatenate(volts), np.concatenate(mux)
+
+
+def expected_output(frames):
+    decoder = FrameDecoder(K, SCALE)
+    return decoder.feed(b"".join(frames))
+
+
+# =========================================================
+# ---------------- CRC / ENCODING -------------------------
+# =========================================================
+
+def test_crc_reference_vector():
+    # CRC-16/CCITT-FALSE("123456789")
+    assert crc16_ccitt(b"123456789") == 0x29B1
+
+
+def test_crc_rows_match_scalar():
+    rng = np.random.default_rng(0)
+    rows = rng.integers(0, 256, (50, 13), dtype=np.uint8)
+    assert crc16_ccitt_rows(rows).tolist() == [crc16_ccitt(bytes(row)) for row in rows]
+
+
+def test_round_trip_values_and_mux():
+    block = random_block(8 * K)
+    data, next_seq = encode_block(7, block, K, SCALE)
+    assert next_seq == 7 + 8 * 6
+
+    decoder = FrameDecoder(K, SCALE)
+    volts, mux = decoder.feed(data)
+
+    # Cada trama lleva K muestras de una derivación; las 6 derivaciones por grupo
+    expected = block.reshape(-1, K, 6).transpose(0, 2, 1).reshape(-1)
+    assert np.allclose(volts, expected)
+    assert mux.tolist() == np.repeat(np.tile(np.arange(6), 8), K).tolist()
+    assert decoder.frames_ok == 48
+    assert decoder.crc_errors == decoder.dropped_frames == decoder.discarded_bytes == 0
+
+
+# =========================================================
+# ---------------- SPLIT FRAMES ---------------------------
+# =========================================================
+
+@pytest.mark.parametrize("seed", range(50))
+def test_random_splits_match_whole_stream(seed):
+    rng = np.random.default_rng(seed)
+    frames = encoded_frames(int(rng.integers(1, 60)), seed=seed)
+    data = b"".join(frames)
+    volts_ref, mux_ref = expected_output(frames)
+
+    cuts = np.sort(rng.integers(0, len(data) + 1, int(rng.integers(0, 40))))
+    chunks = [data[a:b] for a, b in zip(np.r_[0, cuts], np.r_[cuts, len(data)])]
+
+    decoder = FrameDecoder(K, SCALE)
+    volts, mux = decode_all(decoder, chunks)
+    assert np.array_equal(volts, volts_ref)
+    assert np.array_equal(mux, mux_ref)
+    assert decoder.frames_ok == len(frames)
+    assert decoder.crc_errors == decoder.dropped_frames == decoder.discarded_bytes == 0
+
+
+def test_byte_by_byte():
+    frames = encoded_frames(12)
+    data = b"".join(frames)
+    decoder = FrameDecoder(K, SCALE)
+    volts, _ = decode_all(decoder, [data[i:i + 1] for i in range(len(data))])
+    assert np.array_equal(volts, expected_output(frames)[0])
+    assert decoder.frames_ok == 12
+
+
+def test_lone_sync_byte_kept_for_next_feed():
+    frame = encoded_frames(1)[0]
+    decoder = FrameDecoder(K, SCALE)
+    first, _ = decoder.feed(frame[:1])
+    second, _ = decoder.feed(frame[1:])
+    assert len(first) == 0
+    assert len(second) == K
+    assert decoder.discarded_bytes == 0
+
+
+# =========================================================
+# ---------------- RESYNC / ERRORS ------------------------
+# =========================================================
+
+def test_resync_after_garbage():
+    frames = encoded_frames(12)
+    # Basura sin palabra de sincronía: se descarta byte a byte
+    garbage = bytes(range(1, 40))
+    data = garbage + b"".join(frames[:6]) + garbage + b"".join(frames[6:])
+
+    decoder = FrameDecoder(K, SCALE)
+    volts, mux = decoder.feed(data)
+    volts_ref, mux_ref = expected_output(frames)
+    assert np.array_equal(volts, volts_ref)
+    assert np.array_equal(mux, mux_ref)
+    assert decoder.discarded_bytes == 2 * len(garbage)
+    assert decoder.crc_errors == 0
+    assert decoder.dropped_frames == 0
+
+
+def test_false_sync_in_garbage():
+    frames = encoded_frames(6)
+    # Una falsa cabecera: su CRC falla y se resincroniza en la trama real
+    garbage = SYNC_WORD + bytes(range(1, 20))
+    decoder = FrameDecoder(K, SCALE)
+    volts, _ = decoder.feed(garbage + b"".join(frames))
+    assert np.array_equal(volts, expected_output(frames)[0])
+    assert decoder.frames_ok == 6
+    assert decoder.crc_errors >= 1
+
+
+@pytest.mark.parametrize("bad", [0, 3, 5])
+def test_corrupted_frame_is_dropped(bad):
+    frames = encoded_frames(6)
+    corrupted = bytearray(frames[bad])
+    corrupted[HEADER_SIZE] ^= 0xFF           # primer byte de muestras
+    data = b"".join(frames[:bad]) + bytes(corrupted) + b"".join(frames[bad + 1:])
+
+    decoder = FrameDecoder(K, SCALE)
+    volts, mux = decoder.feed(data)
+    good = frames[:bad] + frames[bad + 1:]
+    assert np.array_equal(volts, expected_output(good)[0])
+    assert decoder.crc_errors == 1
+    assert decoder.frames_ok == 5
+    # Hueco de secuencia solo si hay tramas buenas antes y después
+    assert decoder.dropped_frames == (1 if 0 < bad < 5 else 0)
+
+
+def test_wrong_sample_count_is_rejected():
+    frames = encoded_frames(2)
+    # Mismo tamaño que una trama válida, pero count = K - 1
+    short = encode_frame(1, 1, np.zeros(K - 1)) + b"\x00\x00"
+    decoder = FrameDecoder(K, SCALE)
+    volts, _ = decoder.feed(frames[0] + short)
+    assert len(volts) == K
+    assert decoder.crc_errors == 1
+
+
+# =========================================================
+# ---------------- SEQUENCE -------------------------------
+# =========================================================
+
+def test_sequence_gaps_are_counted():
+    frames = encoded_frames(30)
+    kept = [frame for i, frame in enumerate(frames) if i not in (3, 4, 17)]
+    decoder = FrameDecoder(K, SCALE)
+    decode_all(decoder, kept)
+    assert decoder.dropped_frames == 3
+    assert decoder.frames_ok == 27
+
+
+def test_sequence_gap_across_feeds():
+    frames = encoded_frames(12)
+    decoder = FrameDecoder(K, SCALE)
+    decoder.feed(b"".join(frames[:5]))
+    decoder.feed(b"".join(frames[8:]))
+    assert decoder.dropped_frames == 3
+
+
+def test_sequence_wraps_without_gap():
+    frames = encoded_frames(12, seq=65530)
+    decoder = FrameDecoder(K, SCALE)
+    decoder.feed(b"".join(frames))
+    assert decoder.dropped_frames == 0
+    assert decoder.frames_ok == 12
+
+
+def test_reset_forgets_sequence_and_tail():
+    frames = encoded_frames(12)
+    decoder = FrameDecoder(K, SCALE)
+    decoder.feed(b"".join(frames[:3]) + frames[3][:5])
+    decoder.reset()
+    volts, _ = decoder.feed(b"".join(frames[9:]))
+    assert len(volts) == 3 * K
+    assert decoder.dropped_frames == 0
+
+
+# =========================================================
+# ---------------- ASCII LINES ----------------------------
+# =========================================================
+
+def test_lines_split_across_feeds():
+    decoder = LineDecoder()
+    first, mux = decoder.feed(b"0.5\n1.25\n-0.")
+    second, _ = decoder.feed(b"75\n2\r\n")
+    assert mux is None
+    assert first.tolist() == [0.5, 1.25]
+    assert second.tolist() == [-0.75, 2.0]
+    assert decoder.lines_ok == 4
+    assert decoder.parse_errors == 0
+
+
+def test_partial_line_is_not_parsed():
+    decoder = LineDecoder()
+    volts, _ = decoder.feed(b"1.0\n2.0")
+    assert volts.tolist() == [1.0]
+    volts, _ = decoder.feed(b"")
+    assert len(volts) == 0
+
+
+def test_garbage_lines_are_counted():
+    decoder = LineDecoder()
+    volts, _ = decoder.feed(b"1.0\nabc\n2.0\n\xff\xfe\n3.0\n")
+    assert volts.tolist() == [1.0, 2.0, 3.0]
+    assert decoder.parse_errors == 2
+    assert decoder.lines_ok == 3
+
+
+def test_reset_drops_partial_line():
+    decoder = LineDecoder()
+    decoder.feed(b"1.0\n12")
+    decoder.reset()
+    volts, _ = decoder.feed(b"3\n")
+    assert volts.tolist() == [3.0]
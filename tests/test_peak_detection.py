@@ -0,0 +1,120 @@
+"""
+detect_r_peaks (vectorized) must give exactly the peaks of the reference
+loop, and StreamingPeakDetector fed in chunks must match detect_r_peaks
+over the whole signal.
+"""
+
+import numpy as np
+import pytest
+
+from src.peak_detection import detect_r_peaks, _detect_r_peaks_loop, StreamingPeakDetector
+
+
+def synthetic_ecg(n, fs=500, bpm=75, noise=0.05, seed=0):
+    """
+    Narrow gaussian QRS per beat, a T wave and noise.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(n) / fs
+    phase = (t * bpm / 60.0) % 1.0
+    qrs = 1.2 * np.exp(-((phase - 0.5) ** 2) / 0.0008)
+    t_wave = 0.3 * np.exp(-((phase - 0.75) ** 2) / 0.004)
+    return qrs + t_wave + rng.normal(0, noise, n)
+
+
+def assert_same_as_loop(signal_data, threshold, distance):
+    expected = _detect_r_peaks_loop(list(signal_data), threshold, distance)
+    got = detect_r_peaks(np.asarray(signal_data, dtype=np.float64), threshold, distance)
+    assert got.tolist() == expected
+
+
+# =========================================================
+# ---------------- VECTORIZED vs LOOP ---------------------
+# =========================================================
+
+@pytest.mark.parametrize("kind", ["noise", "plateaus", "ecg"])
+@pytest.mark.parametrize("seed", range(100))
+def test_random_signals_match_loop(kind, seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(0, 3000))
+    if kind == "noise":
+        signal_data = rng.normal(0, 1, n)
+    elif kind == "plateaus":
+        # Señal cuantizada: muchos vecinos iguales
+        signal_data = np.round(rng.normal(0, 1, n) * 2) / 2
+    else:
+        signal_data = synthetic_ecg(n, seed=seed)
+
+    assert_same_as_loop(signal_data, float(rng.uniform(-0.5, 1.5)), int(rng.integers(0, 400)))
+
+
+@pytest.mark.parametrize("signal_data", [[], [1.0], [0.0, 2.0], [0.0, 2.0, 0.0]])
+def test_short_signals(signal_data):
+    assert_same_as_loop(signal_data, 0.5, 10)
+
+
+def test_empty_signal_returns_int_array():
+    peaks = detect_r_peaks(np.empty(0), 0.5, 10)
+    assert len(peaks) == 0
+    assert np.issubdtype(peaks.dtype, np.integer)
+
+
+@pytest.mark.parametrize("signal_data", [
+    [0, 1, 1, 0],             # meseta de dos muestras: no es máximo estricto
+    [0, 1, 1, 1, 0, 2, 0],
+    [0, 2, 2, 0, 2, 0],
+    [1, 1, 1, 1, 1],
+])
+def test_plateaus(signal_data):
+    assert_same_as_loop(signal_data, 0.5, 1)
+
+
+@pytest.mark.parametrize("distance", [0, 1, 2, 3, 5, 1000])
+def test_distance_edges(distance):
+    # Picos cada 2 muestras: la distancia decide cuáles sobreviven
+    signal_data = np.tile([0.0, 1.0], 20)
+    assert_same_as_loop(signal_data, 0.5, distance)
+
+
+def test_negative_distance_keeps_all_candidates():
+    signal_data = np.tile([0.0, 1.0], 20)
+    assert_same_as_loop(signal_data, 0.5, -5)
+
+
+def test_all_below_threshold():
+    signal_data = synthetic_ecg(2000)
+    assert detect_r_peaks(signal_data, 10.0, 100).tolist() == []
+    assert_same_as_loop(signal_data, 10.0, 100)
+
+
+# =========================================================
+# ---------------- STREAMING ------------------------------
+# =========================================================
+
+@pytest.mark.parametrize("seed", range(100))
+def test_streaming_chunks_match_whole_signal(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(0, 5000))
+    signal_data = synthetic_ecg(n, seed=seed)
+    threshold = float(rng.uniform(0.0, 1.2))
+    distance = int(rng.integers(0, 400))
+
+    detector = StreamingPeakDetector(threshold, distance)
+    chunks = []
+    i = 0
+    while i < n:
+        k = int(rng.integers(1, 64))
+        chunks.append(detector.feed(signal_data[i:i + k], i))
+        i += k
+
+    got = np.concatenate(chunks) if chunks else np.empty(0, dtype=np.intp)
+    assert got.tolist() == detect_r_peaks(signal_data, threshold, distance).tolist()
+
+
+def test_streaming_peak_on_chunk_boundary():
+    # El máximo cae en la última muestra de un bloque: se confirma con el siguiente
+    detector = StreamingPeakDetector(0.5, 1)
+    first = detector.feed(np.array([0.0, 0.2, 1.0]), 0)
+    second = detector.feed(np.array([0.1, 0.0]), 3)
+    assert first.tolist() == []
+    assert second.tolist() == [2]
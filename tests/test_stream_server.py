@@ -0,0 +1,158 @@
+"""
+Loopback tests of the headless stream server: several concurrent clients
+get every sample without gaps, a client that never reads is throttled
+and loses samples without slowing the others, and malformed requests
+are ignored.
+"""
+
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from src import config
+from src.analysis import AnalysisWorker
+from src.data_model import AppState
+from src.fake_serial import FakeSerialReader
+from src.rhythm_monitor import RhythmMonitor
+from src.stream_server import StreamServer, StreamClient, SAMPLES, HELLO
+
+
+FS = 2000
+SECONDS = 3.0
+
+
+@pytest.fixture
+def server(monkeypatch):
+    # Buffers pequeños: el cliente bloqueado se nota en segundos, no minutos
+    monkeypatch.setattr(config, "STREAM_SOCKET_SNDBUF", 4096)
+
+    app_state = AppState()
+    reader = FakeSerialReader(app_state, fs=FS, seed=0)
+    monitor = RhythmMonitor(reader)
+    analysis = AnalysisWorker(app_state, rhythm_monitor=monitor)
+    server = StreamServer(app_state, analysis, monitor, "127.0.0.1", 0,
+                          sample_rate=FS, high_water=16 * 1024)
+
+    monitor.start()
+    analysis.start()
+    reader.start()
+    server.start()
+    yield server
+    server.stop()
+    reader.stop()
+    analysis.stop()
+    monitor.stop()
+
+
+def _consume(port, decimation, stop, result):
+    client = StreamClient("127.0.0.1", port, decimation)
+    samples, gaps, ends = 0, 0, {}
+    while not stop.is_set():
+        message = client.read_message()
+        if message is None:
+            break
+        kind, lead, value = message
+        if kind == SAMPLES:
+            start, d, data = value
+            n = len(data) if d == 1 else len(data) // 2 * d
+            if lead in ends and start != ends[lead]:
+                gaps += 1
+            ends[lead] = start + n
+            samples += n
+    client.close()
+    result.update(samples=samples, gaps=gaps, ends=ends)
+
+
+def _stalled_client(port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    sock.connect(("127.0.0.1", port))
+    sock.sendall(b'{"decimation": 1}\n')
+    return sock
+
+
+def test_concurrent_clients_throughput_and_backpressure(server):
+    stalled = _stalled_client(server.port)
+    stop = threading.Event()
+    results = [{} for _ in range(6)]
+    threads = [
+        threading.Thread(target=_consume, args=(server.port, (1, 4, 10)[k % 3], stop, results[k]))
+        for k in range(len(results))
+    ]
+
+    produced_start = server.app_state.sample_count
+    for thread in threads:
+        thread.start()
+    time.sleep(SECONDS)
+    produced = server.app_state.sample_count - produced_start
+    stop.set()
+    stats = server.stats()
+    for thread in threads:
+        thread.join(timeout=5)
+    stalled.close()
+
+    assert produced > 0.8 * SECONDS * FS * config.TOTAL_DERIVATIONS
+    for result in results:
+        assert result["gaps"] == 0
+        # Cada cliente rápido recibe casi todo lo producido mientras estaba conectado
+        assert result["samples"] >= 0.8 * produced
+
+    slow = max(stats["clients"], key=lambda c: c["throttled_ticks"])
+    assert slow["throttled_ticks"] > 0
+    assert slow["dropped_samples"] > 0
+    fast = [c for c in stats["clients"] if c is not slow]
+    assert all(c["dropped_samples"] == 0 for c in fast)
+
+
+@pytest.mark.parametrize("request_line", [
+    b'{"decimation": "x"}\n',
+    b'{"leads": 5}\n',
+    b'{"leads": [[0]]}\n',
+    b'{"leads": [1.0]}\n',
+    b'{"leads": [true]}\n',
+    b'{"decimation": 1e999}\n',
+    b'5\n',
+    b'"text"\n',
+    b'not json\n',
+])
+def test_malformed_request_is_ignored(server, request_line):
+    client = StreamClient("127.0.0.1", server.port, decimation=4)
+    try:
+        client.sock.sendall(request_line)
+        # Varios ticks con la petición aplicada antes de corregirla
+        time.sleep(20 * server.interval)
+        # La conexión sigue viva y con los ajustes anteriores
+        client.request(leads=[0])
+        kind, _, hello = client.read_message()
+        assert kind == HELLO and "sample_rate" in hello
+
+        deadline = time.monotonic() + 5.0
+        while time.monotonic() < deadline:
+            kind, lead, value = client.read_message()
+            if kind == SAMPLES and lead == 0:
+                assert value[1] == 4
+                break
+        else:
+            pytest.fail("no samples after a malformed request")
+        assert server.stats()["clients"][0]["decimation"] == 4
+    finally:
+        client.close()
+
+
+def test_request_changes_decimation_and_leads(server):
+    client = StreamClient("127.0.0.1", server.port, decimation=1)
+    try:
+        client.sock.sendall((json.dumps({"decimation": 10, "leads": [2, 99]}) + "\n").encode())
+        deadline = time.monotonic() + 5.0
+        while time.monotonic() < deadline:
+            client_stats = server.stats()["clients"]
+            if client_stats and client_stats[0]["decimation"] == 10:
+                break
+            time.sleep(0.05)
+        else:
+            pytest.fail("request not applied")
+    finally:
+        client.close()